@@ -5,9 +5,9 @@ os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
 # Allow OAuth over HTTP for local development
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse
+from fastapi.responses import JSONResponse, RedirectResponse, HTMLResponse, StreamingResponse
 from groq import Groq
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 # Try to import from new langchain-huggingface package, fall back to deprecated location
@@ -36,9 +36,14 @@ from typing import List, Optional
 import traceback
 import io
 import base64
+import zipfile
+import itertools
+import uuid
+import hashlib
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, parse_qs
-import pandas as pd
 
 # Google OAuth and Drive imports
 from google.oauth2.credentials import Credentials
@@ -49,13 +54,35 @@ from googleapiclient.http import MediaIoBaseDownload
 # Import from local modules
 from text_extraction import (
     extract_text_by_mimetype, 
-    extract_text_from_file,
     extract_pdf_with_tables,
     extract_docx_with_tables,
     is_tesseract_available as extraction_tesseract_available,
     TESSERACT_AVAILABLE as EXTRACTION_TESSERACT_AVAILABLE
 )
 from whatsapp import WhatsAppScraper, is_tesseract_available as whatsapp_tesseract_available
+from ocr_service import get_ocr_cache
+from excel_query_planner import answer_query, EXCEL_FAST_PATH
+from excel_result_cache import get_excel_result_cache
+from excel_plan_cache import get_plan_cache
+from excel_frame_store import ExcelFrameStore, workbook_hash
+from excel_profile import profile_frame, describe_columns
+from excel_parse_pool import parse_in_pool, EXCEL_PARSE_WORKERS
+from excel_sql import ExcelSQLEngine, SQLQueryError, DUCKDB_AVAILABLE, extract_sql, format_result
+from extraction_budget import extract_text_with_budget
+from archive_ingest import iter_archive_members, is_archive, ArchiveLimitError
+from ingestion_jobs import get_ingestion_queue, FINISHED_STATES
+from upload_storage import (
+    save_upload_stream,
+    UploadTooLargeError,
+    UPLOAD_MAX_FILE_BYTES,
+    UPLOAD_MAX_REQUEST_BYTES,
+)
+from resumable_uploads import (
+    get_upload_session_store,
+    UploadSessionNotFoundError,
+    UploadSessionError,
+    UploadIncompleteError,
+)
 
 # Import MCP client for Google Drive and Gmail integration (unified client)
 from mcp_client import get_mcp_client, MCPDriveClient
@@ -98,6 +125,11 @@ os.makedirs(WHATSAPP_DOWNLOAD_DIR, exist_ok=True)
 os.makedirs(WHATSAPP_IMAGES_DIR, exist_ok=True)
 os.makedirs(GOOGLE_DRIVE_DOWNLOAD_DIR, exist_ok=True)
 
+# Server-sent job events: how often the stream checks for new events, and
+# how long it may stay silent before sending a keepalive comment
+JOB_EVENTS_POLL_S = 0.5
+JOB_EVENTS_KEEPALIVE_S = 15
+
 # Google OAuth Configuration
 CLIENT_ID = os.getenv('CLIENT_ID')
 CLIENT_SECRET = os.getenv('CLIENT_SECRET')
@@ -121,7 +153,9 @@ selected_groups: List[str] = []
 
 # Thread locks for concurrent access safety
 _rag_lock = threading.Lock()  # Lock for RAG system / vector store operations
-_excel_lock = threading.Lock()  # Lock for Excel agent operations
+_excel_lock = threading.Lock()  # Guards creating the shared ExcelAgentSystem (workbooks lock per file)
+_rag_system_lock = threading.Lock()  # Guards creating the shared RAGSystem (concurrent jobs)
+_whatsapp_scrape_lock = threading.Lock()  # One scrape at a time per browser session
 
 # Global embeddings instance - pre-loaded at startup for faster first query
 _global_embeddings = None
@@ -336,6 +370,26 @@ def _convert_text_table_to_markdown(table_lines: list) -> str:
     return '\n'.join(md_lines)
 
 
+# Agent step limit; runs that hit it are not stored in the plan cache
+EXCEL_AGENT_MAX_ITERATIONS = 10
+# Pandas agents are built on a file's first agent query and dropped after this long unused
+EXCEL_AGENT_IDLE_S = float(os.getenv("EXCEL_AGENT_IDLE_S", "1800"))
+
+EXCEL_SQL_PROMPT = """Write one DuckDB SQL SELECT query that answers the question using these tables.
+Each table is one spreadsheet file.
+
+Tables:
+{schema}
+
+Rules:
+- Use only the tables and columns listed; always double-quote column names
+- Join or UNION tables when the question spans several files
+- Return only the SQL, no explanation
+
+Question: {question}
+"""
+
+
 class ExcelAgentSystem:
     """
     System for handling Excel-specific queries using a pandas dataframe agent.
@@ -354,45 +408,121 @@ class ExcelAgentSystem:
         'excel', 'spreadsheet', 'sheet', 'worksheet'
     ]
     
+    # Phrases that ask about several workbooks at once; answered with SQL over all of them
+    CROSS_FILE_KEYWORDS = [
+        'across files', 'all files', 'both files', 'each file', 'every file',
+        'across workbooks', 'all workbooks', 'both workbooks', 'each workbook',
+        'across spreadsheets', 'all spreadsheets', 'both spreadsheets', 'each spreadsheet',
+        'join'
+    ]
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.dataframes: dict = {}  # {filename: DataFrame}
-        self.agents: dict = {}  # {filename: pandas_agent}
+        # {filename: DataFrame}, kept as memory-mapped Arrow files and loaded on demand
+        self.dataframes = ExcelFrameStore()
+        self.agents: dict = {}  # {filename: pandas_agent}, built lazily by _get_agent
+        self._agent_last_used: dict = {}  # {filename: time of last agent query}
+        # Reentrant: building an agent can evict another file's frame, whose
+        # listener drops that agent from the same thread
+        self._agents_lock = threading.RLock()
+        self._file_locks: dict = {}  # {filename: lock held while that file loads}
+        self._file_locks_lock = threading.Lock()
+        self.file_hashes: dict = {}  # {filename: sha256 of the loaded workbook}
+        self.fingerprints: dict = {}  # {filename: DataFrame content fingerprint, keys the result cache}
+        self.memory_reports: dict = {}  # {filename: dtype optimization report}
+        # {filename: column profile}, computed once at parse time (see excel_profile)
+        self.profiles: dict = {}
+        # Every loaded workbook as a table, for questions spanning several files
+        self.sql_engine = ExcelSQLEngine() if DUCKDB_AVAILABLE else None
+        # Agents hold a copy of their frame; evicting the frame drops the agent
+        self.dataframes.add_evict_listener(self._drop_agent)
         self.llm = None
         if LANGCHAIN_AGENT_AVAILABLE:
             self.llm = ChatGroq(model_name="llama-3.3-70b-versatile", temperature=0)
     
-    def add_excel_file(self, file_path: str) -> bool:
-        """Load an Excel file and create a pandas agent for it. Thread-safe for concurrent uploads."""
+    def add_excel_file(self, file_path: str, source=None, content_hash: str = None) -> bool:
+        """
+        Load an Excel file for querying. Thread-safe for concurrent uploads.
+
+        The pandas agent is not built here but on the first query that needs
+        it (see _get_agent), so loading a batch of workbooks stays fast.
+
+        Args:
+            file_path: Path of the workbook; only its name is used when source is given
+            source: Optional in-memory workbook (bytes-like), e.g. a ZIP archive member
+            content_hash: sha256 of the workbook if already known; a workbook
+                converted before under the same hash is not parsed again
+        """
         if not LANGCHAIN_AGENT_AVAILABLE:
             print("[WARNING] LangChain agent not available. Cannot process Excel file with agent.")
             return False
         
-        # Use lock for thread-safe Excel agent operations
-        with _excel_lock:
+        filename = os.path.basename(file_path)
+        # Only loads of the same file name wait for each other; parsing runs
+        # in the parse pool and the frame store publishes finished entries
+        with self._file_lock(filename):
             try:
-                filename = os.path.basename(file_path)
+                content_hash = content_hash or workbook_hash(source if source is not None else file_path)
                 
-                # Read Excel file - handle multiple sheets by concatenating
-                excel_data = pd.read_excel(file_path, sheet_name=None)
-                
-                if len(excel_data) == 1:
-                    # Single sheet
-                    df = list(excel_data.values())[0]
+                if self.dataframes.adopt(filename, content_hash):
+                    print(f"[INFO] Reusing converted frame for {filename}, skipping Excel parsing")
                 else:
-                    # Multiple sheets - add sheet name as column and concatenate
-                    dfs = []
-                    for sheet_name, sheet_df in excel_data.items():
-                        sheet_df = sheet_df.copy()
-                        sheet_df['_sheet_name'] = sheet_name
-                        dfs.append(sheet_df)
-                    df = pd.concat(dfs, ignore_index=True)
+                    started = time.perf_counter()
+                    parsed = parse_in_pool(
+                        filename, source if source is not None else file_path,
+                        content_hash, self.dataframes.store_dir,
+                    )
+                    memory_report = parsed["report"]
+                    if parsed["stored"]:
+                        self.dataframes.adopt(filename, content_hash)
+                    else:
+                        self.dataframes.put(filename, parsed["df"], content_hash,
+                                            metadata={"dtype_report": memory_report,
+                                                      "profile": parsed["profile"]})
+                    print(f"[INFO] Parsed {filename} in {time.perf_counter() - started:.2f} s, dtypes "
+                          f"{memory_report['bytes_before'] / (1024 * 1024):.1f} MB -> "
+                          f"{memory_report['bytes_after'] / (1024 * 1024):.1f} MB")
+                info = self.dataframes.info(filename)
+                self.memory_reports[filename] = info["metadata"].get("dtype_report")
+                profile = info["metadata"].get("profile")
+                if profile is None:
+                    # Converted before profiles were stored with the frame
+                    profile = profile_frame(self.dataframes.original(filename))
+                self.profiles[filename] = profile
+                
+                # Cached results for the previous content of this file are stale now
+                fingerprint = info["fingerprint"]
+                previous = self.fingerprints.get(filename)
+                if previous and previous != fingerprint:
+                    get_excel_result_cache().invalidate(previous)
+                self.fingerprints[filename] = fingerprint
                 
-                self.dataframes[filename] = df
+                # A new version of the file needs a new agent
+                self._drop_agent(filename)
+                
+                print(f"[INFO] Excel file loaded: {filename} ({info['rows']} rows, {info['columns']} columns)")
+                return True
                 
-                # Custom prefix to clarify the agent has access to the ENTIRE dataframe
-                # This fixes the issue where the LLM incorrectly assumes only the sample head is available
-                custom_prefix = f"""You are working with a pandas dataframe in Python. The dataframe name is `df`.
+            except Exception as e:
+                print(f"[ERROR] Failed to load Excel file {file_path}: {e}")
+                traceback.print_exc()
+                return False
+    
+    def _file_lock(self, filename: str) -> threading.Lock:
+        """Lock serializing loads of one file name."""
+        with self._file_locks_lock:
+            return self._file_locks.setdefault(filename, threading.Lock())
+    
+    def _create_agent(self, filename: str):
+        """Build the pandas agent for a loaded file."""
+        # Stored frames are read-only memory maps with narrowed dtypes; the
+        # agent's code may assign into df and expects the workbook's dtypes
+        df = self.dataframes.writable_copy(filename)
+        profile = self.profiles.get(filename) or profile_frame(df)
+        
+        # Custom prefix to clarify the agent has access to the ENTIRE dataframe
+        # This fixes the issue where the LLM incorrectly assumes only the sample head is available
+        custom_prefix = f"""You are working with a pandas dataframe in Python. The dataframe name is `df`.
 
 IMPORTANT RULES:
 1. You have access to the ENTIRE dataframe with {len(df)} rows and {len(df.columns)} columns.
@@ -429,30 +559,53 @@ EXAMPLES:
 - To show table with multiple columns: print(df[df['Rating'] == 5][['TITLE', 'Rating']].to_markdown(index=False))
 - To show grouped percentages: print(city_percentages.to_markdown())
 
-Column names: {', '.join(df.columns.tolist())}
+Columns (type; distinct values; range):
+{describe_columns(profile)}
 """
-                
-                # Create a pandas agent for this dataframe with custom prefix
-                pandas_agent = create_pandas_dataframe_agent(
-                    self.llm,
-                    df,
-                    verbose=True,
-                    allow_dangerous_code=True,
-                    handle_parsing_errors=True,
-                    prefix=custom_prefix,
-                    max_iterations=10,
-                    early_stopping_method="generate"
-                )
-                
-                self.agents[filename] = pandas_agent
-                
-                print(f"[INFO] Excel agent created for: {filename} ({len(df)} rows, {len(df.columns)} columns)")
-                return True
-                
-            except Exception as e:
-                print(f"[ERROR] Failed to create Excel agent for {file_path}: {e}")
-                traceback.print_exc()
-                return False
+        
+        # Create a pandas agent for this dataframe with custom prefix
+        return create_pandas_dataframe_agent(
+            self.llm,
+            df,
+            verbose=True,
+            allow_dangerous_code=True,
+            handle_parsing_errors=True,
+            prefix=custom_prefix,
+            max_iterations=EXCEL_AGENT_MAX_ITERATIONS,
+            early_stopping_method="generate",
+            # The code it ran is kept in the plan cache for replay
+            return_intermediate_steps=True,
+        )
+    
+    def _drop_agent(self, filename: str):
+        with self._agents_lock:
+            self.agents.pop(filename, None)
+            self._agent_last_used.pop(filename, None)
+        self.dataframes.release_copy(filename)
+    
+    def _get_agent(self, filename: str):
+        """
+        Get the pandas agent for a file, building it on first use.
+
+        Agents unused for EXCEL_AGENT_IDLE_S are dropped here, which frees
+        their copies of the frame.
+        """
+        with self._agents_lock:
+            now = time.time()
+            for name, last_used in list(self._agent_last_used.items()):
+                if name != filename and now - last_used > EXCEL_AGENT_IDLE_S:
+                    self._drop_agent(name)
+                    print(f"[INFO] Evicted idle Excel agent for: {name}")
+            
+            agent = self.agents.get(filename)
+            if agent is None:
+                started = time.perf_counter()
+                agent = self._create_agent(filename)
+                self.agents[filename] = agent
+                print(f"[INFO] Excel agent created for: {filename} "
+                      f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+            self._agent_last_used[filename] = now
+            return agent
     
     def is_excel_query(self, query: str) -> bool:
         """Determine if a query should be routed to the Excel agent."""
@@ -464,72 +617,198 @@ Column names: {', '.join(df.columns.tolist())}
                 return True
         
         # Check if query mentions specific Excel file names
-        for filename in self.dataframes.keys():
-            if filename.lower().replace('.xlsx', '').replace('.xls', '') in query_lower:
-                return True
-        
-        return False
+        return bool(self._mentioned_files(query))
+    
+    def _mentioned_files(self, query: str) -> list:
+        """Loaded files whose name (without extension) appears in the query."""
+        query_lower = query.lower()
+        return [
+            fname for fname in self.dataframes.keys()
+            if fname.lower().replace('.xlsx', '').replace('.xls', '') in query_lower
+        ]
+    
+    def _select_file(self, query: str) -> str:
+        """
+        Pick the loaded file a query is about: the one it names, else the one
+        whose column names it mentions most, else the most recent.
+        """
+        filenames = list(self.dataframes.keys())
+        if len(filenames) > 1:
+            mentioned = self._mentioned_files(query)
+            if mentioned:
+                return mentioned[0]
+            query_lower = query.lower()
+            scores = {
+                fname: sum(
+                    1 for column in self.dataframes.info(fname)["column_names"]
+                    if len(column) > 2 and column.lower() in query_lower
+                )
+                for fname in filenames
+            }
+            best = max(scores.values())
+            if best:
+                return [fname for fname in filenames if scores[fname] == best][-1]
+        return filenames[-1]
+    
+    def _is_cross_file(self, query: str) -> bool:
+        """True for questions about several loaded workbooks (needs DuckDB)."""
+        if self.sql_engine is None or len(self.dataframes) < 2:
+            return False
+        query_lower = query.lower()
+        return len(self._mentioned_files(query)) > 1 or any(k in query_lower for k in self.CROSS_FILE_KEYWORDS)
+    
+    def _query_fingerprint(self, query: str) -> str:
+        """Result cache key for the data a query reads: one file, or all of them for cross-file questions."""
+        if self._is_cross_file(query):
+            combined = "".join(sorted(self.fingerprints.values()))
+            return hashlib.sha256(combined.encode("ascii")).hexdigest()
+        return self.fingerprints.get(self._select_file(query))
+    
+    def run_sql(self, sql: str):
+        """
+        Run a SELECT over every loaded workbook (one table per file).
+
+        Returns:
+            Tuple of (result DataFrame, truncated flag)
+
+        Raises:
+            SQLQueryError: If the SQL is rejected or fails
+        """
+        if self.sql_engine is None:
+            raise SQLQueryError("SQL queries need duckdb (pip install duckdb)")
+        self.sql_engine.sync(self.dataframes, dict(self.fingerprints))
+        return self.sql_engine.execute(sql)
+    
+    def _answer_with_sql(self, query: str):
+        """
+        Answer a question spanning several workbooks with one SQL query
+        written by the LLM. A failing query is sent back once for correction.
+
+        Returns:
+            Answer text, or None if no working query was produced
+        """
+        self.sql_engine.sync(self.dataframes, dict(self.fingerprints))
+        prompt = EXCEL_SQL_PROMPT.format(schema=self.sql_engine.describe(), question=query)
+        for attempt in range(2):
+            sql = extract_sql(self.llm.invoke(prompt).content)
+            try:
+                started = time.perf_counter()
+                result, truncated = self.sql_engine.execute(sql)
+            except SQLQueryError as e:
+                print(f"[WARNING] Excel SQL query failed (attempt {attempt + 1}): {e}")
+                prompt += f"\nThis query failed:\n{sql}\nError: {e}\nWrite a corrected query.\n"
+                continue
+            print(f"[INFO] Excel SQL answered across {len(self.dataframes)} files "
+                  f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+            return f"SQL: {sql}\n\n{format_result(result, truncated)}"
+        return None
     
     def run_query(self, query: str) -> str:
-        """Run a query against the Excel data using the pandas agent."""
+        """
+        Run a query against the Excel data.
+
+        Simple aggregate/filter/group-by/top-N questions are answered directly
+        in pandas (see excel_query_planner.py); everything else goes through
+        the pandas agent. Results are cached per (data fingerprint, query),
+        and the code the agent ran is kept per (schema, question template) so
+        similar questions later replay it instead of running the agent.
+        """
         if not LANGCHAIN_AGENT_AVAILABLE:
             return "Excel agent is not available. Please install langchain-groq and langchain-experimental."
         
-        if not self.agents:
+        if not self.dataframes:
             return "No Excel files have been loaded. Please upload an Excel file first."
         
         try:
-            # If we have multiple files, we need to determine which one the user is asking about
-            # For simplicity, we'll use the first (or most recently added) agent
-            # You could enhance this with more sophisticated file selection logic
+            filename = self._select_file(query)
+            fingerprint = self._query_fingerprint(query)
+            result_cache = get_excel_result_cache()
             
-            if len(self.agents) == 1:
-                agent = list(self.agents.values())[0]
-                filename = list(self.agents.keys())[0]
-            else:
-                # Try to detect which file the query is about
-                agent = None
-                filename = None
-                for fname in self.agents.keys():
-                    if fname.lower().replace('.xlsx', '').replace('.xls', '') in query.lower():
-                        agent = self.agents[fname]
-                        filename = fname
-                        break
-                
-                # If no specific file mentioned, use the most recent one (last added)
-                if agent is None:
-                    filename = list(self.agents.keys())[-1]
-                    agent = self.agents[filename]
+            cached = result_cache.get_analysis(fingerprint, query)
+            if cached is not None:
+                print(f"[INFO] Excel result cache hit on {filename}")
+                return cached
+            
+            # Questions about several files go to SQL over all of them; if no
+            # working query comes back, fall through to the selected file
+            if self._is_cross_file(query):
+                answer = self._answer_with_sql(query)
+                if answer is not None:
+                    analysis = f"[Analysis across {', '.join(self.dataframes.keys())}]\n{answer}"
+                    result_cache.put_analysis(fingerprint, query, analysis)
+                    return analysis
+            
+            if EXCEL_FAST_PATH:
+                started = time.perf_counter()
+                answer, plan = answer_query(query, self.dataframes[filename])
+                if answer is not None:
+                    print(f"[INFO] Excel fast path ({plan['op']}) answered on {filename} "
+                          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+                    analysis = f"[Analysis from {filename}]\n{answer}"
+                    result_cache.put_analysis(fingerprint, query, analysis)
+                    return analysis
+            
+            # Plans are agent code: they run on the workbook's own dtypes
+            df = self.dataframes.original(filename)
+            plan_cache = get_plan_cache()
+            started = time.perf_counter()
+            replayed = plan_cache.replay(df, query)
+            if replayed is not None:
+                print(f"[INFO] Replayed cached Excel plan on {filename} "
+                      f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+                analysis = f"[Analysis from {filename}]\n{replayed}"
+                result_cache.put_analysis(fingerprint, query, analysis)
+                return analysis
             
             print(f"[INFO] Running Excel agent query on: {filename}")
             
             # Run the query through the pandas agent
-            result = agent.run(query)
+            response = self._get_agent(filename).invoke({"input": query})
+            result = response["output"]
+            steps = response.get("intermediate_steps", [])
+            # Runs cut off by the iteration limit did not necessarily solve the question
+            if len(steps) < EXCEL_AGENT_MAX_ITERATIONS and plan_cache.store(df, query, steps):
+                print(f"[INFO] Stored Excel plan for: {query}")
             
-            return f"[Analysis from {filename}]\n{result}"
+            analysis = f"[Analysis from {filename}]\n{result}"
+            result_cache.put_analysis(fingerprint, query, analysis)
+            return analysis
             
         except Exception as e:
             print(f"[ERROR] Excel agent query failed: {e}")
             traceback.print_exc()
             return f"Error analyzing Excel data: {str(e)}"
     
+    def get_cached_response(self, query: str, context: str = ""):
+        """Final chat response cached for this query and prompt context, or None."""
+        if not self.fingerprints:
+            return None
+        fingerprint = self._query_fingerprint(query)
+        return get_excel_result_cache().get_response(fingerprint, query, context) if fingerprint else None
+    
+    def cache_response(self, query: str, response: str, context: str = ""):
+        """Cache the final chat response built from this query's (cached) analysis."""
+        fingerprint = self._query_fingerprint(query) if self.fingerprints else None
+        if fingerprint:
+            get_excel_result_cache().put_response(fingerprint, query, response, context)
+    
     def get_excel_context_for_rag(self) -> str:
         """Generate a summary context of Excel data for the RAG system."""
-        if not self.dataframes:
+        if not self.profiles:
             return ""
         
         context_parts = []
-        for filename, df in self.dataframes.items():
+        for filename, profile in list(self.profiles.items()):
+            columns = profile["columns"]
             summary = f"\n[Excel File: {filename}]\n"
-            summary += f"Columns: {', '.join(df.columns.tolist())}\n"
-            summary += f"Total Rows: {len(df)}\n"
+            summary += f"Columns: {', '.join(c['name'] for c in columns)}\n"
+            summary += f"Total Rows: {profile['rows']}\n"
             
-            # Add sample data (first 3 rows)
+            # Add sample data (header and first 3 rows of the profile's sample)
             summary += "Sample Data:\n"
-            summary += df.head(3).to_string(index=False) + "\n"
+            summary += "\n".join(profile["sample"].splitlines()[:4]) + "\n"
             
-            # Add basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+            numeric_cols = [c["name"] for c in columns if c["kind"] == "numeric"]
             if numeric_cols:
                 summary += f"Numeric columns: {', '.join(numeric_cols)}\n"
             
@@ -541,49 +820,49 @@ Column names: {', '.join(df.columns.tolist())}
         """
         Create LangChain Document objects from Excel data for the RAG system.
         This feeds Excel structure and sample data into the vector store.
+        Built from the column profiles, so no frame is scanned again.
         """
         documents = []
         
-        for filename, df in self.dataframes.items():
+        for filename, profile in list(self.profiles.items()):
+            columns = profile["columns"]
             # Create a comprehensive summary document for each Excel file
             content_parts = []
             
             # Basic info
             content_parts.append(f"Excel File: {filename}")
-            content_parts.append(f"Total Rows: {len(df)}")
-            content_parts.append(f"Total Columns: {len(df.columns)}")
-            content_parts.append(f"Column Names: {', '.join(df.columns.tolist())}")
+            content_parts.append(f"Total Rows: {profile['rows']}")
+            content_parts.append(f"Total Columns: {len(columns)}")
+            content_parts.append(f"Column Names: {', '.join(c['name'] for c in columns)}")
             
             # Column types
             content_parts.append("\nColumn Types:")
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                content_parts.append(f"  - {col}: {dtype}")
+            for column in columns:
+                content_parts.append(f"  - {column['name']}: {column['dtype']}")
             
             # Sample data (first 5 rows)
             content_parts.append("\nSample Data (first 5 rows):")
-            content_parts.append(df.head(5).to_string(index=False))
+            content_parts.append(profile["sample"])
             
             # Basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+            numeric_cols = [c for c in columns if c["kind"] == "numeric" and c.get("mean") is not None]
             if numeric_cols:
                 content_parts.append("\nNumeric Column Statistics:")
-                for col in numeric_cols:
-                    content_parts.append(f"  {col}:")
-                    content_parts.append(f"    - Min: {df[col].min()}")
-                    content_parts.append(f"    - Max: {df[col].max()}")
-                    content_parts.append(f"    - Mean: {df[col].mean():.2f}")
+                for column in numeric_cols:
+                    content_parts.append(f"  {column['name']}:")
+                    content_parts.append(f"    - Min: {column['min']}")
+                    content_parts.append(f"    - Max: {column['max']}")
+                    content_parts.append(f"    - Mean: {column['mean']:.2f}")
             
             # Unique value counts for categorical columns (first 10 unique values)
-            categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+            categorical_cols = [c for c in columns if c["kind"] in ("text", "category")]
             if categorical_cols:
                 content_parts.append("\nCategorical Column Unique Values:")
-                for col in categorical_cols[:5]:  # Limit to first 5 categorical columns
-                    unique_count = df[col].nunique()
-                    content_parts.append(f"  {col}: {unique_count} unique values")
-                    if unique_count <= 10:
-                        unique_vals = df[col].dropna().unique().tolist()[:10]
-                        content_parts.append(f"    Values: {unique_vals}")
+                for column in categorical_cols[:5]:  # Limit to first 5 categorical columns
+                    approx = "~" if column["distinct_approx"] else ""
+                    content_parts.append(f"  {column['name']}: {approx}{column['distinct']} unique values")
+                    if column.get("values"):
+                        content_parts.append(f"    Values: {column['values']}")
             
             content = "\n".join(content_parts)
             
@@ -592,8 +871,8 @@ Column names: {', '.join(df.columns.tolist())}
                 metadata={
                     "source": filename,
                     "file_type": "excel_summary",
-                    "rows": len(df),
-                    "columns": len(df.columns)
+                    "rows": profile["rows"],
+                    "columns": len(columns)
                 }
             )
             documents.append(doc)
@@ -604,7 +883,15 @@ Column names: {', '.join(df.columns.tolist())}
     def clear(self):
         """Clear all loaded Excel data and agents."""
         self.dataframes.clear()
-        self.agents.clear()
+        with self._agents_lock:
+            self.agents.clear()
+            self._agent_last_used.clear()
+        self.file_hashes.clear()
+        self.fingerprints.clear()
+        self.memory_reports.clear()
+        self.profiles.clear()
+        if self.sql_engine is not None:
+            self.sql_engine.sync(self.dataframes, {})
 
 
 class AgenticRouter:
@@ -683,7 +970,7 @@ class AgenticRouter:
             print("[WARNING] LangChain not available. Cannot setup Excel tool.")
             return None
             
-        if not excel_agent_system or not excel_agent_system.agents:
+        if not excel_agent_system or not excel_agent_system.dataframes:
             print("[WARNING] Excel agent system not available or no Excel files loaded.")
             return None
         
@@ -731,7 +1018,7 @@ class AgenticRouter:
                 self.tools.append(rag_tool)
         
         # Setup Excel tool if Excel agent is available
-        if excel_agent_system and excel_agent_system.agents:
+        if excel_agent_system and excel_agent_system.dataframes:
             excel_tool = self.setup_excel_tool(excel_agent_system)
             if excel_tool:
                 self.tools.append(excel_tool)
@@ -846,17 +1133,66 @@ class RAGSystem:
                 print("[INFO] Using pre-loaded embeddings")
         self.vector_store = None
         self.chat_history = []
+        # content hash -> {"name": source name, "chunk_ids": [FAISS ids]}, for upload dedup
+        self.indexed_files = {}
+
+    def find_indexed_file(self, content_hash=None, name=None):
+        """
+        Look up an indexed file by content hash, or by source name.
+
+        Returns:
+            Tuple of (content_hash, {"name", "chunk_ids"}) or (None, None)
+        """
+        with _rag_lock:
+            if content_hash is not None:
+                entry = self.indexed_files.get(content_hash)
+                return (content_hash, entry) if entry else (None, None)
+            for indexed_hash, entry in self.indexed_files.items():
+                if entry["name"] == name:
+                    return indexed_hash, entry
+        return None, None
+
+    def remove_indexed_file(self, content_hash):
+        """Delete a file's chunks from the vector store. Returns the number of chunks removed."""
+        with _rag_lock:
+            entry = self.indexed_files.pop(content_hash, None)
+            if not entry or self.vector_store is None or not entry["chunk_ids"]:
+                return 0
+            self.vector_store.delete(entry["chunk_ids"])
+            return len(entry["chunk_ids"])
 
     def load_documents(self, file_paths):
         """
         Load documents from file paths using centralized text extraction.
-        Uses extract_text_from_file from text_extraction module.
+        Uses extract_text from text_extraction module.
+        """
+        return self.load_sources([(os.path.basename(file_path), file_path) for file_path in file_paths])
+
+    def load_sources(self, sources, reports=None, on_progress=None, content_hashes=None):
+        """
+        Load documents from (file_name, source) pairs, where source is a file
+        path, an in-memory buffer (bytes, memoryview, mmap) or a file object.
+        In-memory sources are extracted directly, without a disk round trip.
+
+        Each file is extracted within its format's time/memory budget (see
+        extraction_budget.py). Files that hit a budget keep whatever partial
+        text was recovered, with the outcome recorded in document metadata.
+
+        Args:
+            sources: List of (file_name, source) pairs
+            reports: Optional list, extended with one extraction report per
+                file (file name, status, reason, partial, elapsed time)
+            on_progress: Optional callback(file_name, report) called after each
+                file; report is its extraction report, or None if the file was
+                skipped. Exceptions it raises (e.g. job cancellation) stop loading.
+            content_hashes: Optional {file_name: sha256}, recorded in document
+                metadata so indexed files can be recognized on re-upload
         """
         documents = []
 
-        for file_path in file_paths:
+        for file_name, source in sources:
+            report = None
             try:
-                file_name = os.path.basename(file_path)
                 suffix = Path(file_name).suffix.lower()
                 
                 # Skip Excel files - they are processed exclusively by the Excel Agent
@@ -864,33 +1200,73 @@ class RAGSystem:
                     print(f"[INFO] Skipping {file_name} in RAG - Excel files are processed by Excel Agent only")
                     continue
                 
-                # Use centralized text extraction
-                content, file_type, error = extract_text_from_file(file_path)
+                # Use centralized text extraction, bounded by the format's budget
+                report = {"file": file_name}
+                content, file_type, error = extract_text_with_budget(source, file_name=file_name, report=report)
+                if reports is not None:
+                    reports.append(report)
                 
                 if error:
                     print(f"[WARNING] {error}")
                     continue
                 
-                if content and content.strip():
-                    # For images, add prefix
-                    if file_type == "ocr_image":
-                        content = f"[Image: {file_name}]\n{content}"
-                        print(f"✓ OCR text extracted from {file_name} ({len(content)} characters)")
-                    
-                    doc = Document(
-                        page_content=content,
-                        metadata={"source": file_name, "file_type": file_type},
-                    )
-                    documents.append(doc)
-                else:
-                    print(f"[INFO] No text content extracted from {file_name}")
+                document = self._make_document(file_name, content, file_type, report)
+                if document:
+                    if content_hashes and file_name in content_hashes:
+                        document.metadata["content_hash"] = content_hashes[file_name]
+                    documents.append(document)
                     
             except Exception as e:
-                print(f"Error loading {file_path}: {e}")
+                print(f"Error loading {file_name}: {e}")
+                continue
+            finally:
+                if on_progress is not None:
+                    on_progress(file_name, report)
+
+        return documents
+
+    def load_extracted_files(self, extracted_files):
+        """
+        Load documents from files whose text was already extracted
+        (e.g. Google Drive results from the MCP client), skipping re-extraction.
+        
+        Args:
+            extracted_files: List of dicts with 'name', 'content' and 'file_type'
+                keys, plus an optional 'extraction' budget report
+        """
+        documents = []
+
+        for item in extracted_files:
+            file_name = item['name']
+            if Path(file_name).suffix.lower() in (".xlsx", ".xls"):
                 continue
+            document = self._make_document(
+                file_name, item.get('content'), item.get('file_type'), item.get('extraction')
+            )
+            if document:
+                documents.append(document)
 
         return documents
 
+    def _make_document(self, file_name, content, file_type, extraction_report=None):
+        """Build a RAG Document from extracted text, or None if it is empty."""
+        if not content or not content.strip():
+            print(f"[INFO] No text content extracted from {file_name}")
+            return None
+        
+        # For images, add prefix
+        if file_type == "ocr_image":
+            content = f"[Image: {file_name}]\n{content}"
+            print(f"✓ OCR text extracted from {file_name} ({len(content)} characters)")
+        
+        metadata = {"source": file_name, "file_type": file_type}
+        if extraction_report and extraction_report.get("status", "ok") != "ok":
+            metadata["extraction_status"] = extraction_report["status"]
+            metadata["extraction_reason"] = extraction_report["reason"]
+            metadata["extraction_partial"] = extraction_report["partial"]
+
+        return Document(page_content=content, metadata=metadata)
+
     def load_whatsapp_messages(self, messages):
         """Load WhatsApp messages as documents"""
         documents = []
@@ -1048,49 +1424,87 @@ Date: {date}
         table_text = "\n".join(all_rows)
         return f"----- TABLE -----\n{table_text}\n----- END TABLE -----"
 
-    def create_vector_store(self, documents):
-        """Create or update vector store with documents. Thread-safe for concurrent uploads."""
+    def create_vector_store(self, documents, on_file=None):
+        """
+        Create or update vector store with documents. Thread-safe for concurrent uploads.
+
+        Files are chunked and embedded one at a time outside the lock; only
+        adding the finished vectors to the index holds it, so chat retrieval
+        is not blocked while a large upload is embedded.
+
+        Args:
+            documents: Documents to index
+            on_file: Optional callback(file_name, stage, elapsed_s, **details)
+                called as each file is chunked, embedded and indexed
+
+        Returns:
+            Number of chunks added
+        """
         processed_documents = self._merge_and_split_sequential_tables(documents)
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=2000,
             chunk_overlap=200,
         )
 
-        all_chunks = []
+        # Chunks grouped by source file, in upload order
+        chunks_by_file = {}
+        chunk_seconds = {}
         for doc in processed_documents:
-            splits = text_splitter.split_documents([doc])
-            all_chunks.extend(splits)
-        print(f"[DEBUG] Preparing to index {len(all_chunks)} chunks from {len(documents)} documents.")
-
-        if not all_chunks:
+            started = time.perf_counter()
+            source = doc.metadata.get("source", "Unknown")
+            chunks_by_file.setdefault(source, []).extend(text_splitter.split_documents([doc]))
+            chunk_seconds[source] = chunk_seconds.get(source, 0.0) + time.perf_counter() - started
+        num_chunks = sum(len(chunks) for chunks in chunks_by_file.values())
+        print(f"[DEBUG] Preparing to index {num_chunks} chunks from {len(documents)} documents.")
+
+        if not num_chunks:
             print("[ERROR] No valid chunks found in documents, nothing to index!")
             raise ValueError("No valid chunks found in documents.")
 
-        # Use lock for thread-safe vector store operations
-        with _rag_lock:
-            if self.vector_store is None:
-                print("[DEBUG] Initializing new FAISS vector store.")
-                self.vector_store = FAISS.from_documents(
-                    all_chunks,
-                    self.embeddings,
-                    distance_strategy=DistanceStrategy.COSINE,
-                    normalize_L2=True,
-                )
-            else:
-                print(f"[DEBUG] Adding {len(all_chunks)} chunks to existing vector store.")
-                # Add to existing vector store
-                self.vector_store.add_documents(all_chunks)
+        for source, chunks in chunks_by_file.items():
+            if on_file is not None:
+                on_file(source, "chunked", chunk_seconds[source], chunks=len(chunks))
+            if not chunks:
+                continue
 
-            print(f"[DEBUG] Vector store now contains documents from these sources: ")
-            # Attempt to print short list of sources for inspection
-            try:
-                if hasattr(self.vector_store, 'docs'):
-                    sources = [doc.metadata.get("source", "Unknown") for doc in self.vector_store.docs]
-                    print(f"[DEBUG] Current sources: {sources}")
-            except Exception as e:
-                print(f"[DEBUG] Unable to enumerate sources in vector store: {e}")
+            started = time.perf_counter()
+            texts = [chunk.page_content for chunk in chunks]
+            vectors = self.embeddings.embed_documents(texts)
+            if on_file is not None:
+                on_file(source, "embedded", time.perf_counter() - started, chunks=len(chunks))
+
+            # Explicit ids let the chunks of a file be deleted when it is replaced
+            chunk_ids = [uuid.uuid4().hex for _ in chunks]
+            metadatas = [chunk.metadata for chunk in chunks]
+
+            started = time.perf_counter()
+            # Use lock for thread-safe vector store operations
+            with _rag_lock:
+                if self.vector_store is None:
+                    print("[DEBUG] Initializing new FAISS vector store.")
+                    self.vector_store = FAISS.from_embeddings(
+                        list(zip(texts, vectors)),
+                        self.embeddings,
+                        metadatas=metadatas,
+                        ids=chunk_ids,
+                        distance_strategy=DistanceStrategy.COSINE,
+                        normalize_L2=True,
+                    )
+                else:
+                    print(f"[DEBUG] Adding {len(chunks)} chunks from {source} to existing vector store.")
+                    self.vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=chunk_ids)
+
+                for chunk, chunk_id in zip(chunks, chunk_ids):
+                    content_hash = chunk.metadata.get("content_hash")
+                    if content_hash:
+                        entry = self.indexed_files.setdefault(
+                            content_hash, {"name": chunk.metadata.get("source"), "chunk_ids": []}
+                        )
+                        entry["chunk_ids"].append(chunk_id)
+            if on_file is not None:
+                on_file(source, "indexed", time.perf_counter() - started, chunks=len(chunks))
 
-        return len(all_chunks)
+        return num_chunks
 
     def retrieve_context(self, query, k=5):
         """Retrieve context from vector store. Thread-safe for concurrent access.
@@ -1200,6 +1614,21 @@ class GoogleAuthRequest(BaseModel):
     credentials: Optional[dict] = None
 
 
+class ResumableUploadRequest(BaseModel):
+    filename: str
+    size: int
+    sha256: Optional[str] = None
+    chunk_size: Optional[int] = None
+
+
+class CompleteUploadRequest(BaseModel):
+    replace_changed: bool = True
+
+
+class ExcelSQLRequest(BaseModel):
+    sql: str
+
+
 # ==================== Google OAuth2 Authentication ====================
 
 @app.get("/auth/google")
@@ -1366,14 +1795,16 @@ async def drive_auth_url():
     """
     return await google_auth()
 
-@app.post("/api/drive/files")
+@app.post("/api/drive/files", status_code=202)
 async def get_drive_files(payload: GoogleAuthRequest):
     """
     Fetch and extract text from Google Drive files using MCP client.
     Files are fed into RAG system and Excel agent.
+
+    Credentials are validated during the request; downloading, extraction
+    and indexing run as a background ingestion job whose result has the
+    same shape this endpoint used to return. Poll /api/jobs/{job_id}.
     """
-    global rag_system, excel_agent_system
-    
     try:
         # Get credentials from payload to save token.json if needed
         access_token = payload.access_token
@@ -1428,138 +1859,161 @@ async def get_drive_files(payload: GoogleAuthRequest):
                 detail="Not authenticated. Please authenticate with Google first via /auth/google"
             )
         
-        # Initialize RAG system if not already initialized
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not found in environment variables")
         
-        if not rag_system:
-            rag_system = RAGSystem(api_key)
-        
-        # Use MCP client to get all files with content
-        print("[INFO] Using MCP client to fetch Google Drive files...")
-        file_results = mcp_client.get_all_files_with_content(GOOGLE_DRIVE_DOWNLOAD_DIR)
-        
-        extracted_files = []
-        downloaded_file_paths = []
-        
-        for file_data in file_results:
-            if file_data.get('error'):
-                extracted_files.append({
-                    'id': file_data.get('id'),
-                    'name': file_data.get('name'),
-                    'type': file_data.get('type'),
-                    'size': 'Unknown',
-                    'extractedText': file_data.get('extractedText', 'Error processing file'),
-                    'error': True
-                })
-            else:
-                extracted_files.append({
-                    'id': file_data.get('id'),
-                    'name': file_data.get('name'),
-                    'type': file_data.get('type'),
-                    'size': file_data.get('size'),
-                    'modified': file_data.get('modified'),
-                    'extractedText': file_data.get('extractedText'),
-                })
-                if file_data.get('path'):
-                    downloaded_file_paths.append(file_data['path'])
-        
-        # Separate Excel files from other files
-        excel_file_paths = [p for p in downloaded_file_paths if p.lower().endswith(('.xlsx', '.xls'))]
-        
-        # Load Excel files into Excel Agent (not RAG)
-        excel_agents_created = 0
-        if excel_file_paths and LANGCHAIN_AGENT_AVAILABLE:
-            if not excel_agent_system:
-                excel_agent_system = ExcelAgentSystem(api_key)
-            
-            for excel_path in excel_file_paths:
-                if excel_agent_system.add_excel_file(excel_path):
-                    excel_agents_created += 1
-                    print(f"[INFO] Excel agent created for Google Drive file: {os.path.basename(excel_path)}")
-        
-        # Load non-Excel files into RAG system only
-        num_chunks = 0
-        if downloaded_file_paths:
-            try:
-                documents = rag_system.load_documents(downloaded_file_paths)
-                
-                if documents:
-                    num_chunks = rag_system.create_vector_store(documents)
-                    print(f"[DEBUG] Loaded {len(documents)} non-Excel documents from Google Drive into RAG system, created {num_chunks} chunks")
-                else:
-                    print("[INFO] No non-Excel documents could be loaded from Google Drive files")
-            except Exception as e:
-                print(f"[ERROR] Error loading Google Drive files into RAG system: {str(e)}")
-                traceback.print_exc()
+        job = get_ingestion_queue().submit("drive_sync", _run_drive_sync_job, mcp_client, api_key)
+        return {"job_id": job.id, "status": job.status}
         
-        # ==================== Gmail Email Fetching ====================
-        # Fetch latest 5 emails from Gmail and load into RAG system
-        email_count = 0
-        extracted_emails = []
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_details = traceback.format_exc()
+        print(f"Error in get_drive_files: {error_details}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _run_drive_sync_job(job, mcp_client, api_key):
+    """Ingestion job for /api/drive/files: Drive files, Excel agents, Gmail emails."""
+    rag = _get_rag_system(api_key)
+    
+    # Use MCP client to get all files with content
+    print("[INFO] Using MCP client to fetch Google Drive files...")
+    job.start_stage("download_extract")
+    file_results = mcp_client.get_all_files_with_content(
+        GOOGLE_DRIVE_DOWNLOAD_DIR,
+        on_file=lambda done, total: job.advance("download_extract", total=total),
+        on_file_stage=job.file_event,
+    )
+    job.finish_stage("download_extract")
+    
+    extracted_files = []
+    downloaded_file_paths = []
+    extracted_contents = []  # already-extracted text, fed to RAG without re-reading files
+    
+    for file_data in file_results:
+        if file_data.get('error'):
+            extracted_files.append({
+                'id': file_data.get('id'),
+                'name': file_data.get('name'),
+                'type': file_data.get('type'),
+                'size': 'Unknown',
+                'extractedText': file_data.get('extractedText', 'Error processing file'),
+                'error': True
+            })
+        else:
+            extracted_files.append({
+                'id': file_data.get('id'),
+                'name': file_data.get('name'),
+                'type': file_data.get('type'),
+                'size': file_data.get('size'),
+                'modified': file_data.get('modified'),
+                'extractedText': file_data.get('extractedText'),
+            })
+            if file_data.get('path'):
+                downloaded_file_paths.append(file_data['path'])
+            extracted_contents.append({
+                'name': file_data['fileName'],
+                'content': file_data.get('content'),
+                'file_type': file_data.get('fileType'),
+                'extraction': file_data.get('extraction'),
+            })
+    
+    # Separate Excel files from other files
+    excel_file_paths = [p for p in downloaded_file_paths if p.lower().endswith(('.xlsx', '.xls'))]
+    
+    # Load Excel files into Excel Agent (not RAG)
+    excel_agents_created = 0
+    if excel_file_paths and LANGCHAIN_AGENT_AVAILABLE:
+        excel_system = _get_excel_agent_system(api_key)
+        
+        job.start_stage("excel", total=len(excel_file_paths))
+        for excel_path, loaded in _load_excel_files(excel_system, [(path, None, None) for path in excel_file_paths], job):
+            if loaded:
+                excel_agents_created += 1
+                print(f"[INFO] Excel file loaded from Google Drive: {os.path.basename(excel_path)}")
+        job.finish_stage("excel")
+    
+    # Load non-Excel files into RAG system only
+    num_chunks = 0
+    job.start_stage("embed")
+    if extracted_contents:
         try:
-            print("[INFO] Fetching latest 5 emails from Gmail...")
-            # Use the same mcp_client for Gmail (it now handles both Drive and Gmail)
-            mcp_client.reset_service()  # Clear cached service to use new credentials
+            documents = rag.load_extracted_files(extracted_contents)
             
-            # Fetch emails formatted for RAG
-            emails = mcp_client.get_emails_for_rag(max_results=5)
-            
-            if emails:
-                # Store email data for response
-                for email in emails:
-                    extracted_emails.append({
-                        'id': email.get('id'),
-                        'subject': email.get('subject'),
-                        'from': email.get('from'),
-                        'date': email.get('date'),
-                        'extractedText': email.get('extractedText'),
-                        'type': 'email'
-                    })
-                
-                # Load emails into RAG system
-                email_docs = rag_system.load_gmail_emails(emails)
-                if email_docs:
-                    email_chunks = rag_system.create_vector_store(email_docs)
-                    email_count = len(emails)
-                    print(f"[INFO] Successfully loaded {email_count} emails into RAG system with {email_chunks} chunks")
-                else:
-                    print("[INFO] No email documents could be created")
+            if documents:
+                num_chunks = rag.create_vector_store(documents, on_file=_track_indexing(job, "embed"))
+                print(f"[DEBUG] Loaded {len(documents)} non-Excel documents from Google Drive into RAG system, created {num_chunks} chunks")
             else:
-                print("[INFO] No emails found in Gmail inbox")
-                
+                print("[INFO] No non-Excel documents could be loaded from Google Drive files")
         except Exception as e:
-            print(f"[WARNING] Error fetching Gmail emails: {str(e)}")
-            print("[INFO] Gmail integration failed - continuing with Drive files only")
+            print(f"[ERROR] Error loading Google Drive files into RAG system: {str(e)}")
             traceback.print_exc()
+    job.finish_stage("embed")
+    job.check_cancelled()
+    
+    # ==================== Gmail Email Fetching ====================
+    # Fetch latest 5 emails from Gmail and load into RAG system
+    email_count = 0
+    extracted_emails = []
+    job.start_stage("emails")
+    try:
+        print("[INFO] Fetching latest 5 emails from Gmail...")
+        # Use the same mcp_client for Gmail (it now handles both Drive and Gmail)
+        mcp_client.reset_service()  # Clear cached service to use new credentials
         
-        return JSONResponse({
-            'files': extracted_files,
-            'total': len(extracted_files),
-            'loaded_to_rag': num_chunks,
-            'excel_agents_created': excel_agents_created,
-            'excel_agent_available': excel_agent_system is not None and len(excel_agent_system.agents) > 0 if excel_agent_system else False,
-            'emails': extracted_emails,
-            'emails_loaded': email_count,
-            'message': f'Successfully processed {len(extracted_files)} files from Google Drive and {email_count} emails from Gmail',
-            'mcp_enabled': True,
-            'gmail_enabled': True
-        })
-        
-    except HTTPException:
-        raise
+        # Fetch emails formatted for RAG
+        emails = mcp_client.get_emails_for_rag(max_results=5)
+        
+        if emails:
+            # Store email data for response
+            for email in emails:
+                extracted_emails.append({
+                    'id': email.get('id'),
+                    'subject': email.get('subject'),
+                    'from': email.get('from'),
+                    'date': email.get('date'),
+                    'extractedText': email.get('extractedText'),
+                    'type': 'email'
+                })
+            
+            # Load emails into RAG system
+            email_docs = rag.load_gmail_emails(emails)
+            if email_docs:
+                email_chunks = rag.create_vector_store(email_docs)
+                email_count = len(emails)
+                print(f"[INFO] Successfully loaded {email_count} emails into RAG system with {email_chunks} chunks")
+            else:
+                print("[INFO] No email documents could be created")
+        else:
+            print("[INFO] No emails found in Gmail inbox")
+            
     except Exception as e:
-        error_details = traceback.format_exc()
-        print(f"Error in get_drive_files: {error_details}")
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"[WARNING] Error fetching Gmail emails: {str(e)}")
+        print("[INFO] Gmail integration failed - continuing with Drive files only")
+        traceback.print_exc()
+    job.finish_stage("emails")
+    
+    return {
+        'files': extracted_files,
+        'total': len(extracted_files),
+        'loaded_to_rag': num_chunks,
+        'excel_agents_created': excel_agents_created,
+        'excel_agent_available': excel_agent_system is not None and len(excel_agent_system.dataframes) > 0 if excel_agent_system else False,
+        'emails': extracted_emails,
+        'emails_loaded': email_count,
+        'message': f'Successfully processed {len(extracted_files)} files from Google Drive and {email_count} emails from Gmail',
+        'mcp_enabled': True,
+        'gmail_enabled': True
+    }
 
 
 @app.get("/api/drive/files")
 async def get_drive_files_using_saved_token():
     """
     GET variant of /api/drive/files for compatibility with the documented API.
-    Uses the saved token.json (no request body needed).
+    Uses the saved token.json (no request body needed). Returns a job id.
     """
     empty_payload = GoogleAuthRequest(access_token=None, credentials=None)
     return await get_drive_files(empty_payload)
@@ -1929,11 +2383,14 @@ def get_whatsapp_groups():
         print(f"[WhatsApp] Error listing groups: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/whatsapp/scrape")
+@app.post("/api/whatsapp/scrape", status_code=202)
 def scrape_whatsapp(payload: GroupsRequest):
-    """Scrape messages from WhatsApp groups."""
-    global whatsapp_driver, rag_system
-    
+    """
+    Scrape messages from WhatsApp groups.
+
+    Runs as a background ingestion job; returns the job id to poll at
+    /api/jobs/{job_id}.
+    """
     if not whatsapp_driver or not whatsapp_connected:
         raise HTTPException(status_code=400, detail="WhatsApp not connected. Please scan QR code first.")
     
@@ -1942,17 +2399,32 @@ def scrape_whatsapp(payload: GroupsRequest):
     if not groups:
         raise HTTPException(status_code=400, detail="No groups selected")
     
-    try:
+    job = get_ingestion_queue().submit("whatsapp_scrape", _run_whatsapp_scrape_job, groups)
+    return {"job_id": job.id, "status": job.status}
+
+
+def _run_whatsapp_scrape_job(job, groups):
+    """Ingestion job for /api/whatsapp/scrape: scrape each group, then index."""
+    # One browser session: scrapes from concurrent jobs must not interleave
+    with _whatsapp_scrape_lock:
+        if not whatsapp_driver or not whatsapp_connected:
+            raise RuntimeError("WhatsApp was disconnected before the scrape started")
+        
         api_key = os.getenv("GROQ_API_KEY")
-        if not rag_system:
-            rag_system = RAGSystem(api_key)
+        rag = _get_rag_system(api_key)
         
         all_messages = []
         all_pdfs = []
         all_ocr_texts = []
+        images_skipped_no_text = 0
+        images_duplicates_skipped = 0
+        ocr_cache_hits = 0
+        seen_image_texts = {}  # OCR text by image hash: forwarded images are read once per scrape
         
+        job.start_stage("scrape", total=len(groups))
         for group_name in groups:
             print(f"[WhatsApp] Opening group: {group_name}")
+            group_started = time.perf_counter()
             success = whatsapp_driver.open_group(group_name)
             if success:
                 # Extract messages
@@ -1966,139 +2438,609 @@ def scrape_whatsapp(payload: GroupsRequest):
                 print(f"[WhatsApp] Downloaded {len(pdfs)} PDFs from {group_name}")
                 
                 # Download images and perform OCR
-                ocr_results = whatsapp_driver.download_images_and_ocr()
+                ocr_results = whatsapp_driver.download_images_and_ocr(seen_texts=seen_image_texts)
                 all_ocr_texts.extend(ocr_results)
+                images_skipped_no_text += whatsapp_driver.ocr_stats['skipped_low_text_likelihood']
+                images_duplicates_skipped += whatsapp_driver.ocr_stats['duplicates_skipped']
+                ocr_cache_hits += whatsapp_driver.ocr_stats['cache_hits']
                 print(f"[WhatsApp] Processed {len(ocr_results)} images from {group_name}")
+                job.file_event(
+                    group_name, "downloaded", time.perf_counter() - group_started,
+                    messages=len(messages), pdfs=len(pdfs), images=len(ocr_results),
+                )
             else:
                 print(f"[WhatsApp] Could not open group: {group_name}")
-        
-        # Load messages into RAG
-        if all_messages:
-            msg_docs = rag_system.load_whatsapp_messages(all_messages)
-            rag_system.create_vector_store(msg_docs)
-            print(f"[WhatsApp] Loaded {len(all_messages)} messages into RAG system")
-        
-        # Load PDFs into RAG
-        if all_pdfs:
-            pdf_docs = rag_system.load_documents(all_pdfs)
-            if pdf_docs:
-                rag_system.create_vector_store(pdf_docs)
-                print(f"[WhatsApp] Loaded {len(all_pdfs)} PDFs into RAG system")
-        
-        # Load OCR texts from images into RAG
-        if all_ocr_texts:
-            ocr_docs = rag_system.load_ocr_texts(all_ocr_texts)
-            if ocr_docs:
-                rag_system.create_vector_store(ocr_docs)
-                print(f"[WhatsApp] Loaded {len(all_ocr_texts)} OCR results into RAG system")
-        
-        return {
-            "message": "WhatsApp data scraped successfully",
-            "messages": len(all_messages),
-            "pdfs": len(all_pdfs),
-            "images_processed": len(all_ocr_texts),
-            "images_with_text": sum(1 for x in all_ocr_texts if x.get('text', '').strip()),
-        }
-    except Exception as e:
-        print(f"[WhatsApp] Scraping error: {str(e)}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+            job.advance("scrape")
+        job.finish_stage("scrape")
+    
+    job.start_stage("index", total=3)
+    # Load messages into RAG
+    if all_messages:
+        msg_docs = rag.load_whatsapp_messages(all_messages)
+        rag.create_vector_store(msg_docs, on_file=job.file_event)
+        print(f"[WhatsApp] Loaded {len(all_messages)} messages into RAG system")
+    job.advance("index")
+    
+    # Load PDFs into RAG
+    if all_pdfs:
+        pdf_docs = rag.load_documents(all_pdfs)
+        if pdf_docs:
+            rag.create_vector_store(pdf_docs, on_file=job.file_event)
+            print(f"[WhatsApp] Loaded {len(all_pdfs)} PDFs into RAG system")
+    job.advance("index")
+    
+    # Load OCR texts from images into RAG
+    if all_ocr_texts:
+        ocr_docs = rag.load_ocr_texts(all_ocr_texts)
+        if ocr_docs:
+            rag.create_vector_store(ocr_docs, on_file=job.file_event)
+            print(f"[WhatsApp] Loaded {len(all_ocr_texts)} OCR results into RAG system")
+    job.finish_stage("index")
+    
+    return {
+        "message": "WhatsApp data scraped successfully",
+        "messages": len(all_messages),
+        "pdfs": len(all_pdfs),
+        "images_processed": len(all_ocr_texts),
+        "images_with_text": sum(1 for x in all_ocr_texts if x.get('text', '').strip()),
+        "images_skipped_no_text": images_skipped_no_text,
+        "images_duplicates_skipped": images_duplicates_skipped,
+        "ocr_cache_hits": ocr_cache_hits,
+        "ocr_cache": get_ocr_cache().stats(),
+    }
+
+
+# API Routes - Ingestion Jobs
+@app.get("/api/jobs")
+def list_jobs():
+    """List known ingestion jobs, newest first."""
+    return {"jobs": [job.to_dict() for job in get_ingestion_queue().list_jobs()]}
+
+
+@app.get("/api/jobs/latency")
+def job_latency():
+    """Per-file latency of each ingestion step (downloaded, extracted, chunked, embedded, indexed) by job kind."""
+    return {"latency": get_ingestion_queue().latency_stats()}
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get the status, per-stage progress and result of an ingestion job."""
+    job = get_ingestion_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Stream a job's progress as server-sent events.
+
+    Events are "status", "stage", "progress" and per-file "file" events
+    (file, stage, elapsed_s). The stream ends with an "end" event carrying
+    the final job state. Reconnecting clients resume after Last-Event-ID.
+    """
+    job = get_ingestion_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    async def event_stream():
+        last_seq = int(last_event_id) if (last_event_id or "").isdigit() else 0
+        idle_s = 0.0
+        while True:
+            # Read the status first: the final status event is logged together
+            # with the status change, so it is part of this batch if finished
+            finished = job.status in FINISHED_STATES
+            events = job.events_since(last_seq)
+            for event in events:
+                last_seq = event["seq"]
+                yield f"id: {last_seq}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                yield f"event: end\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if await request.is_disconnected():
+                return
+            idle_s = 0.0 if events else idle_s + JOB_EVENTS_POLL_S
+            if idle_s >= JOB_EVENTS_KEEPALIVE_S:
+                yield ": keepalive\n\n"
+                idle_s = 0.0
+            await asyncio.sleep(JOB_EVENTS_POLL_S)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancel a queued or running ingestion job (running jobs stop at the next file/stage)."""
+    queue = get_ingestion_queue()
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if not queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already {job.status}")
+    return job.to_dict()
+
+
+@app.get("/api/excel/cache")
+def excel_cache_stats():
+    """Get Excel result cache and plan cache sizes and hit rates (since the backend started)."""
+    return {
+        "results": get_excel_result_cache().stats(),
+        "plans": get_plan_cache().stats(),
+    }
+
+
+@app.get("/api/excel/memory")
+def excel_memory():
+    """Get per-file memory saved by dtype optimization and the frame store's residency."""
+    if not excel_agent_system:
+        return {"files": {}, "frames": None}
+    return {
+        "files": dict(excel_agent_system.memory_reports),
+        "frames": excel_agent_system.dataframes.stats(),
+    }
+
+
+@app.get("/api/excel/profile")
+def excel_profile(filename: Optional[str] = None):
+    """Get the column profile (types, null and distinct counts, ranges, sample) of one or all loaded workbooks."""
+    profiles = dict(excel_agent_system.profiles) if excel_agent_system else {}
+    if filename is None:
+        return {"files": profiles}
+    if filename not in profiles:
+        raise HTTPException(status_code=404, detail=f"Excel file not loaded: {filename}")
+    return {"file": filename, "profile": profiles[filename]}
+
+
+@app.get("/api/excel/tables")
+def excel_tables():
+    """Get the SQL table name and columns of every loaded workbook."""
+    if not excel_agent_system or not excel_agent_system.dataframes:
+        return {"tables": {}}
+    if excel_agent_system.sql_engine is None:
+        raise HTTPException(status_code=503, detail="SQL queries need duckdb (pip install duckdb)")
+    excel_agent_system.sql_engine.sync(excel_agent_system.dataframes, dict(excel_agent_system.fingerprints))
+    return {"tables": excel_agent_system.sql_engine.tables()}
+
+
+@app.post("/api/excel/sql")
+def excel_sql(request: ExcelSQLRequest):
+    """Run a SELECT across all loaded workbooks (one table per file, see /api/excel/tables)."""
+    if not excel_agent_system or not excel_agent_system.dataframes:
+        raise HTTPException(status_code=400, detail="No Excel files have been loaded")
+    if excel_agent_system.sql_engine is None:
+        raise HTTPException(status_code=503, detail="SQL queries need duckdb (pip install duckdb)")
+    try:
+        result, truncated = excel_agent_system.run_sql(request.sql)
+    except SQLQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    payload = json.loads(result.to_json(orient="split", index=False, date_format="iso"))
+    return {"columns": payload["columns"], "rows": payload["data"], "truncated": truncated}
+
+
+@app.get("/api/ocr/stats")
+def ocr_stats():
+    """Get OCR result cache size and hit rate (since the backend started)."""
+    return get_ocr_cache().stats()
 
 
 @app.post("/api/whatsapp/disconnect")
 def disconnect_whatsapp():
-    """Disconnect WhatsApp and close browser."""
+    """Disconnect WhatsApp and close browser, after cancelling scrape jobs that use it."""
     global whatsapp_driver, whatsapp_connected
     
-    try:
-        if whatsapp_driver:
-            whatsapp_driver.close()
+    queue = get_ingestion_queue()
+    for job in queue.list_jobs():
+        if job.kind == "whatsapp_scrape" and queue.cancel(job.id):
+            print(f"[WhatsApp] Cancelling scrape job {job.id} before disconnecting")
+    
+    # A running scrape stops at its next group; wait for it to release the browser
+    with _whatsapp_scrape_lock:
+        try:
+            if whatsapp_driver:
+                whatsapp_driver.close()
+                whatsapp_driver = None
+            whatsapp_connected = False
+            print("[WhatsApp] Disconnected successfully")
+            return {"message": "WhatsApp disconnected"}
+        except Exception as e:
+            print(f"[WhatsApp] Error disconnecting: {str(e)}")
+            # Still mark as disconnected even if close fails
             whatsapp_driver = None
-        whatsapp_connected = False
-        print("[WhatsApp] Disconnected successfully")
-        return {"message": "WhatsApp disconnected"}
-    except Exception as e:
-        print(f"[WhatsApp] Error disconnecting: {str(e)}")
-        # Still mark as disconnected even if close fails
-        whatsapp_driver = None
-        whatsapp_connected = False
-        return {"message": "WhatsApp disconnected (with errors)", "error": str(e)}
+            whatsapp_connected = False
+            return {"message": "WhatsApp disconnected (with errors)", "error": str(e)}
 
 
 # API Routes - File Upload
-@app.post("/api/upload")
-async def upload_files(files: List[UploadFile] = File(...)):
-    """Upload files to the RAG system."""
-    global rag_system, excel_agent_system
+@app.post("/api/upload", status_code=202)
+async def upload_files(files: List[UploadFile] = File(...), replace_changed: bool = Form(True)):
+    """
+    Upload files to the RAG system.
+
+    Files are streamed to disk during the request; extraction, embedding and
+    Excel agent creation run as a background ingestion job. Returns the job
+    id to poll at /api/jobs/{job_id}.
+
+    Files whose content is already indexed are skipped (reported in the job
+    result as skipped_duplicates). With replace_changed, a file uploaded
+    under an indexed name but with new content replaces the old version.
+    """
     
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
     
     saved_paths = []
-    excel_paths = []
+    saved_files = []  # name, size and content hash of every saved upload
+    request_bytes = 0
     
     for file in files:
         if file.filename:
             filepath = os.path.join(UPLOAD_FOLDER, file.filename)
+            # Stream to disk in chunks; never hold a whole upload in memory
+            request_remaining = UPLOAD_MAX_REQUEST_BYTES - request_bytes
             try:
-                content = await file.read()
-                with open(filepath, "wb") as f:
-                    f.write(content)
-                saved_paths.append(filepath)
-                
-                # Track Excel files separately
-                if file.filename.lower().endswith(('.xlsx', '.xls')):
-                    excel_paths.append(filepath)
+                size, sha256 = await save_upload_stream(
+                    file, filepath, max_bytes=min(UPLOAD_MAX_FILE_BYTES, request_remaining)
+                )
+            except UploadTooLargeError as e:
+                # Discard the files already saved by this rejected request
+                for path in saved_paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+                if request_remaining < UPLOAD_MAX_FILE_BYTES:
+                    detail = f"Upload exceeds the request limit of {UPLOAD_MAX_REQUEST_BYTES // (1024 * 1024)} MB"
+                else:
+                    detail = str(e)
+                raise HTTPException(status_code=413, detail=detail)
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Error saving file {file.filename}: {str(e)}")
+            finally:
+                await file.close()
+            
+            request_bytes += size
+            saved_paths.append(filepath)
+            saved_files.append({"name": file.filename, "size": size, "sha256": sha256})
+    
+    return _submit_upload_job(saved_files, saved_paths, replace_changed)
+
+
+def _submit_upload_job(saved_files, saved_paths, replace_changed=True):
+    """
+    Queue an ingestion job for files already saved to the upload folder.
+
+    Args:
+        saved_files: List of {name, size, sha256} per saved file
+        saved_paths: Paths of the saved files, in the same order
+        replace_changed: Replace indexed files that were re-uploaded with new content
+
+    Returns:
+        The 202 response body with the job id
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not found in environment variables")
+    
+    excel_paths = []
+    document_sources = []  # (file_name, path) extracted straight from the saved file
+    archives = []  # (file_name, path) of ZIP uploads, ingested member by member
+    for saved, filepath in zip(saved_files, saved_paths):
+        if is_archive(saved["name"]):
+            archives.append((saved["name"], filepath))
+        # Track Excel files separately
+        elif saved["name"].lower().endswith(('.xlsx', '.xls')):
+            excel_paths.append(filepath)
+        else:
+            document_sources.append((saved["name"], filepath))
     
+    content_hashes = {saved["name"]: saved["sha256"] for saved in saved_files}
+    job = get_ingestion_queue().submit(
+        "upload", _run_upload_job, api_key, document_sources, archives, excel_paths,
+        content_hashes, replace_changed,
+    )
+    return {
+        "message": f"Accepted {len(saved_files)} files for ingestion",
+        "job_id": job.id,
+        "status": job.status,
+        "files": saved_files,
+    }
+
+
+# API Routes - Resumable Uploads
+# Large files are sent in numbered chunks so a dropped connection only costs
+# the chunk in flight: POST /api/uploads to start, PUT each chunk, GET the
+# session to see which chunks are missing, POST .../complete to verify the
+# SHA-256 and queue the file for ingestion like /api/upload.
+@app.post("/api/uploads")
+def create_resumable_upload(request: ResumableUploadRequest):
+    """Start a resumable upload; returns the upload id and chunk layout."""
     try:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="GROQ_API_KEY not found in environment variables")
-        
-        if not rag_system:
+        return get_upload_session_store().create_session(
+            request.filename, request.size, request.sha256, request.chunk_size
+        )
+    except UploadSessionError as e:
+        status_code = 413 if request.size > UPLOAD_MAX_FILE_BYTES else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+
+@app.put("/api/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    x_chunk_sha256: Optional[str] = Header(None),
+):
+    """Upload one chunk as the raw request body. Re-sending a chunk overwrites it."""
+    try:
+        return await get_upload_session_store().write_chunk(
+            upload_id, index, request.stream(), chunk_sha256=x_chunk_sha256
+        )
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str):
+    """Get received/missing chunks of a resumable upload."""
+    try:
+        return get_upload_session_store().status(upload_id)
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/api/uploads/{upload_id}/complete", status_code=202)
+def complete_resumable_upload(upload_id: str, request: Optional[CompleteUploadRequest] = None):
+    """
+    Verify an uploaded file and queue it for ingestion.
+
+    Runs in a worker thread: hashing a few hundred MB must not block the
+    event loop. Returns 409 while chunks are missing or another request is
+    finalizing the upload; a hash mismatch discards the upload (422).
+    """
+    try:
+        filepath, size, sha256 = get_upload_session_store().finalize(upload_id, UPLOAD_FOLDER)
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadIncompleteError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    saved_file = {"name": os.path.basename(filepath), "size": size, "sha256": sha256}
+    replace_changed = request.replace_changed if request else True
+    return _submit_upload_job([saved_file], [filepath], replace_changed)
+
+
+@app.delete("/api/uploads/{upload_id}")
+def abort_resumable_upload(upload_id: str):
+    """Abort a resumable upload and delete its partial data."""
+    try:
+        get_upload_session_store().abort(upload_id)
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": f"Upload {upload_id} aborted"}
+
+
+def _run_upload_job(job, api_key, document_sources, archives, excel_paths, content_hashes, replace_changed):
+    """Ingestion job for /api/upload: extract, embed, then build Excel agents."""
+    rag = _get_rag_system(api_key)
+    
+    content_hashes = dict(content_hashes)  # archive members are added while streaming
+    skipped_duplicates = []
+    replacements = []  # (name, previous hash) removed once the new version is indexed
+    
+    # Load non-Excel documents into RAG system (Excel files go to Excel Agent only).
+    # Archive members are decompressed one at a time as the RAG loader consumes them.
+    extraction_reports = []
+    archive_reports = []
+    archive_excel_sources = []
+    sources = itertools.chain(
+        document_sources,
+        _iter_archive_sources(archives, archive_reports, archive_excel_sources),
+    )
+    # Archive member counts are only known while streaming
+    job.start_stage("extract", total=None if archives else len(document_sources))
+    sources = _skip_indexed_sources(
+        rag, sources, content_hashes, skipped_duplicates,
+        replacements if replace_changed else None,
+    )
+    documents = rag.load_sources(
+        sources, reports=extraction_reports, on_progress=_track_extraction(job, "extract"),
+        content_hashes=content_hashes,
+    )
+    job.finish_stage("extract")
+    
+    num_chunks = 0
+    replaced = []
+    job.start_stage("embed", total=len(documents))
+    if documents:
+        num_chunks = rag.create_vector_store(documents, on_file=_track_indexing(job, "embed"))
+        print(f"[INFO] Loaded {len(documents)} documents into RAG system")
+        # Drop the previous versions only now that the new ones are searchable
+        indexed_names = {document.metadata["source"] for document in documents}
+        for file_name, previous_hash in replacements:
+            if file_name in indexed_names:
+                chunks_removed = rag.remove_indexed_file(previous_hash)
+                replaced.append({"name": file_name, "previous_sha256": previous_hash,
+                                 "chunks_removed": chunks_removed})
+                print(f"[INFO] Replaced previous version of {file_name} ({chunks_removed} chunks)")
+    job.finish_stage("embed")
+    
+    # Initialize Excel agent system and load Excel files (uploaded directly or inside archives)
+    excel_agents_created = 0
+    if (excel_paths or archive_excel_sources) and LANGCHAIN_AGENT_AVAILABLE:
+        excel_system = _get_excel_agent_system(api_key)
+        
+        excel_sources = [(path, None) for path in excel_paths] + archive_excel_sources
+        job.start_stage("excel", total=len(excel_sources))
+        to_load = []
+        for excel_path, excel_source in excel_sources:
+            filename = os.path.basename(excel_path)
+            if excel_source is not None:
+                content_hash = hashlib.sha256(excel_source).hexdigest()
+            else:
+                content_hash = content_hashes.get(filename)
+            if content_hash and excel_system.file_hashes.get(filename) == content_hash:
+                skipped_duplicates.append({"name": filename, "sha256": content_hash, "duplicate_of": filename})
+                print(f"[INFO] Skipping {filename} - identical workbook already loaded")
+                job.advance("excel")
+            else:
+                to_load.append((excel_path, excel_source, content_hash))
+        content_hash_by_path = {path: content_hash for path, _, content_hash in to_load}
+        for excel_path, loaded in _load_excel_files(excel_system, to_load, job):
+            if loaded:
+                excel_system.file_hashes[os.path.basename(excel_path)] = content_hash_by_path[excel_path]
+                excel_agents_created += 1
+                print(f"[INFO] Excel file ready for queries: {os.path.basename(excel_path)}")
+        job.finish_stage("excel")
+    
+    return {
+        "message": f"Successfully processed {len(document_sources) + len(archives) + len(excel_paths)} files",
+        "chunks": num_chunks,
+        "excel_agents_created": excel_agents_created,
+        "excel_agent_available": excel_agent_system is not None and len(excel_agent_system.dataframes) > 0 if excel_agent_system else False,
+        # Memory saved by dtype optimization, per loaded workbook
+        "excel_memory": dict(excel_agent_system.memory_reports) if excel_agent_system else {},
+        # Files that hit their extraction time/memory budget
+        "extraction_issues": [r for r in extraction_reports if r.get("status") != "ok"],
+        "archives": archive_reports,
+        "skipped_duplicates": skipped_duplicates,
+        "replaced": replaced,
+    }
+
+
+def _track_extraction(job, stage):
+    """load_sources progress callback: per-file "extracted" events, one step of stage per file"""
+    def on_progress(file_name, report):
+        if report is not None:
+            job.file_event(file_name, "extracted", report.get("elapsed_s"), status=report.get("status"))
+        job.advance(stage)
+    return on_progress
+
+
+def _track_indexing(job, stage):
+    """create_vector_store callback: per-file chunk/embed/index events, one step of stage per indexed file"""
+    def on_file(file_name, step, elapsed_s, **details):
+        job.file_event(file_name, step, elapsed_s, **details)
+        if step == "indexed":
+            job.advance(stage)
+    return on_file
+
+
+def _get_rag_system(api_key):
+    """Shared RAGSystem, created on first use (concurrent jobs get the same one)."""
+    global rag_system
+    with _rag_system_lock:
+        if rag_system is None:
             rag_system = RAGSystem(api_key)
-        
-        # Initialize Excel agent system and load Excel files
-        excel_agents_created = 0
-        if excel_paths and LANGCHAIN_AGENT_AVAILABLE:
-            if not excel_agent_system:
-                excel_agent_system = ExcelAgentSystem(api_key)
-            
-            for excel_path in excel_paths:
-                if excel_agent_system.add_excel_file(excel_path):
-                    excel_agents_created += 1
-                    print(f"[INFO] Excel agent created for: {os.path.basename(excel_path)}")
-        
-        # Load non-Excel documents into RAG system (Excel files go to Excel Agent only)
-        non_excel_paths = [p for p in saved_paths if not p.lower().endswith(('.xlsx', '.xls'))]
-        documents = rag_system.load_documents(non_excel_paths)
-        
-        num_chunks = 0
-        if documents:
-            num_chunks = rag_system.create_vector_store(documents)
-            print(f"[INFO] Loaded {len(documents)} documents into RAG system")
-        
-        return {
-            "message": f"Successfully processed {len(files)} files",
-            "chunks": num_chunks,
-            "excel_agents_created": excel_agents_created,
-            "excel_agent_available": excel_agent_system is not None and len(excel_agent_system.agents) > 0 if excel_agent_system else False,
+        return rag_system
+
+
+def _get_excel_agent_system(api_key):
+    """Shared ExcelAgentSystem, created on first use (concurrent jobs get the same one)."""
+    global excel_agent_system
+    with _excel_lock:
+        if excel_agent_system is None:
+            excel_agent_system = ExcelAgentSystem(api_key)
+        return excel_agent_system
+
+
+def _load_excel_files(system, sources, job):
+    """
+    Load workbooks concurrently; the parsing itself runs in the Excel parse pool.
+
+    Args:
+        system: ExcelAgentSystem to load into
+        sources: List of (path, in-memory workbook or None, sha256 or None)
+        job: Ingestion job whose "excel" stage advances as files finish
+
+    Yields:
+        (path, loaded) for each workbook, in completion order
+    """
+    if not sources:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(EXCEL_PARSE_WORKERS, len(sources))),
+                                  thread_name_prefix="excel-load")
+    try:
+        futures = {
+            executor.submit(system.add_excel_file, path, source=source, content_hash=content_hash): path
+            for path, source, content_hash in sources
         }
-    except HTTPException:
-        raise
-    except Exception as e:
-        error_detail = f"Error processing files: {str(e)}\n{traceback.format_exc()}"
-        raise HTTPException(status_code=500, detail=error_detail)
+        for future in as_completed(futures):
+            job.advance("excel")
+            yield futures[future], future.result()
+    finally:
+        # On cancellation, workbooks not started yet are dropped
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _skip_indexed_sources(rag, sources, content_hashes, skipped, replacements=None):
+    """
+    Filter (file_name, source) pairs down to content not yet indexed.
+
+    Hashes come from content_hashes (computed while the upload was saved);
+    in-memory archive members are hashed here and added to it. Skipped files
+    are appended to skipped. When replacements is a list, files whose name
+    is indexed with different content are recorded as (name, previous hash)
+    so the caller can drop the old chunks after indexing the new version.
+    """
+    seen = {}  # hash -> name, catches duplicates within the same upload
+    for file_name, source in sources:
+        content_hash = content_hashes.get(file_name)
+        if content_hash is None:
+            content_hash = hashlib.sha256(source).hexdigest()
+            content_hashes[file_name] = content_hash
+        
+        _, entry = rag.find_indexed_file(content_hash=content_hash)
+        duplicate_of = entry["name"] if entry else seen.get(content_hash)
+        if duplicate_of:
+            skipped.append({"name": file_name, "sha256": content_hash, "duplicate_of": duplicate_of})
+            print(f"[INFO] Skipping {file_name} - same content as already indexed {duplicate_of}")
+            continue
+        seen[content_hash] = file_name
+        
+        if replacements is not None:
+            previous_hash, _ = rag.find_indexed_file(name=file_name)
+            if previous_hash:
+                replacements.append((file_name, previous_hash))
+        yield file_name, source
+
+
+def _iter_archive_sources(archives, reports, excel_sources):
+    """
+    Yield (member_name, data) for every ingestible member of the uploaded
+    archives. Excel members are set aside in excel_sources for the Excel
+    agent; one report per archive (counts, skipped members, error) is
+    appended to reports.
+    """
+    for archive_name, archive_source in archives:
+        report = {"archive": archive_name}
+        reports.append(report)
+        try:
+            for member_name, data in iter_archive_members(archive_source, archive_name, stats=report):
+                if member_name.lower().endswith(('.xlsx', '.xls')):
+                    excel_sources.append((member_name, data))
+                    continue
+                yield member_name, data
+        except (ArchiveLimitError, zipfile.BadZipFile) as e:
+            report["error"] = str(e)
+            print(f"[WARNING] Stopped ingesting archive {archive_name}: {e}")
+        else:
+            print(f"[INFO] Ingested {report['ingested']} of {report['members']} members from {archive_name}")
 
 
 # API Routes - Chat
 @app.post("/api/chat")
 def chat(payload: ChatRequest):
     """Process chat query using RAG system and/or Excel agent."""
-    global rag_system, excel_agent_system, agentic_router
-    
     query = payload.query or ""
     
     if not query:
@@ -2109,30 +3051,33 @@ def chat(payload: ChatRequest):
         if not api_key:
             raise HTTPException(status_code=500, detail="GROQ_API_KEY not found in environment variables")
         
-        if not rag_system:
-            rag_system = RAGSystem(api_key)
+        rag = _get_rag_system(api_key)
         
         response = ""
         query_type = "general"
         tools_used = []
         
         # Check if we have data sources
-        has_rag = rag_system and rag_system.vector_store is not None
-        has_excel = excel_agent_system is not None and bool(excel_agent_system.agents)
+        has_rag = rag.vector_store is not None
+        has_excel = excel_agent_system is not None and bool(excel_agent_system.dataframes)
         
         # Route query based on available tools
         if has_excel and excel_agent_system.is_excel_query(query):
             # Use Excel agent for quantitative queries - DO NOT mix with RAG
             query_type = "excel"
             tools_used = ["Excel_Data_Analyst"]
-            excel_analysis = excel_agent_system.run_query(query)
             
             # Get the Excel file names that were used
             excel_files = list(excel_agent_system.dataframes.keys())
             excel_sources = ", ".join(excel_files) if excel_files else "Excel data"
             
-            # Generate response with ONLY Excel sources - no RAG context
-            combined_prompt = f"""Answer the user's question using ONLY the Excel data analysis result below.
+            # A repeated question on unchanged data skips the agent and the summary call
+            response = excel_agent_system.get_cached_response(query, excel_sources)
+            if response is None:
+                excel_analysis = excel_agent_system.run_query(query)
+                
+                # Generate response with ONLY Excel sources - no RAG context
+                combined_prompt = f"""Answer the user's question using ONLY the Excel data analysis result below.
 
 User Question: {query}
 
@@ -2146,32 +3091,33 @@ IMPORTANT:
 
 Provide a clear, concise answer based on the Excel data."""
 
-            messages = [{
-                "role": "system", 
-                "content": f"""You are a helpful data analyst. You are answering a question using Excel data.
+                messages = [{
+                    "role": "system", 
+                    "content": f"""You are a helpful data analyst. You are answering a question using Excel data.
                 
 CRITICAL RULES:
 1. ONLY cite Excel file sources: {excel_sources}
 2. Do NOT mention or cite any PDF, DOCX, or other document files
 3. Your answer is based purely on Excel data analysis
 4. End with **Sources:** section listing only the Excel file(s) used"""
-            }]
-            messages.append({"role": "user", "content": combined_prompt})
+                }]
+                messages.append({"role": "user", "content": combined_prompt})
             
-            chat_completion = rag_system.groq_client.chat.completions.create(
-                messages=messages,
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,
-                max_tokens=2048,
-            )
-            response = chat_completion.choices[0].message.content
+                chat_completion = rag.groq_client.chat.completions.create(
+                    messages=messages,
+                    model="llama-3.3-70b-versatile",
+                    temperature=0.3,
+                    max_tokens=2048,
+                )
+                response = chat_completion.choices[0].message.content
+                excel_agent_system.cache_response(query, response, excel_sources)
             
         elif has_rag:
             # Use RAG for document-based queries
             query_type = "rag"
             tools_used = ["PDF_Document_Knowledge_Base"]
-            context, sources = rag_system.retrieve_context(query, k=10)
-            response = rag_system.generate_response(query, context, sources)
+            context, sources = rag.retrieve_context(query, k=10)
+            response = rag.generate_response(query, context, sources)
             
         else:
             # No data sources - use general knowledge
@@ -2181,15 +3127,15 @@ CRITICAL RULES:
             ]
             messages.append({"role": "user", "content": query})
             
-            chat_completion = rag_system.groq_client.chat.completions.create(
+            chat_completion = rag.groq_client.chat.completions.create(
                 messages=messages,
                 model="llama-3.3-70b-versatile",
                 temperature=0.3,
                 max_tokens=2048,
             )
             response = chat_completion.choices[0].message.content
-            rag_system.chat_history.append({"role": "user", "content": query})
-            rag_system.chat_history.append({"role": "assistant", "content": response})
+            rag.chat_history.append({"role": "user", "content": query})
+            rag.chat_history.append({"role": "assistant", "content": response})
         
         # Format tables in response
         formatted_response = format_tables_in_response(response)
@@ -2209,7 +3155,7 @@ def status():
     return {
         "whatsapp_connected": whatsapp_connected,
         "rag_initialized": rag_system is not None and rag_system.vector_store is not None,
-        "excel_agent_initialized": excel_agent_system is not None and len(excel_agent_system.agents) > 0 if excel_agent_system else False,
+        "excel_agent_initialized": excel_agent_system is not None and len(excel_agent_system.dataframes) > 0 if excel_agent_system else False,
         "excel_files_loaded": list(excel_agent_system.dataframes.keys()) if excel_agent_system and excel_agent_system.dataframes else [],
     }
 
@@ -2219,7 +3165,15 @@ def reset_rag():
     """Reset the in-memory RAG system, Excel agent, agentic router, and clear all uploaded files."""
     global rag_system, excel_agent_system, agentic_router
     
+    # Stop pending ingestion so it does not repopulate the reset session
+    ingestion_queue = get_ingestion_queue()
+    for job in ingestion_queue.list_jobs():
+        ingestion_queue.cancel(job.id)
+    
     # Reset in-memory systems
+    get_excel_result_cache().clear()
+    get_plan_cache().clear()
+    ExcelFrameStore().purge_files()
     rag_system = None
     excel_agent_system = None
     agentic_router = None
@@ -2256,6 +3210,9 @@ def reset_rag():
             except Exception as e:
                 print(f"[RESET] Error clearing {dir_path}: {e}")
     
+    # Partial uploads lived under the upload folder; drop their sessions too
+    cleared_counts["resumable_uploads"] = get_upload_session_store().clear()
+    
     print(f"[RESET] Cleared: {cleared_counts}")
     return {
         "message": "RAG system, Excel agent, agentic router, and all uploaded files reset successfully",
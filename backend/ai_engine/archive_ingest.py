@@ -0,0 +1,128 @@
+"""
+Archive Ingestion Module
+
+Streams the members of an uploaded ZIP archive into the extraction pipeline
+one at a time, without unpacking the archive to disk.
+
+Zip bomb protection:
+- Declared sizes and member count are checked against the caps before any
+  member is read.
+- Bytes are counted while decompressing, so a member whose header
+  understates its size is cut off at the cap instead of trusted.
+- Members with an extreme compression ratio are skipped.
+
+Caps are configurable with ARCHIVE_MAX_MEMBERS, ARCHIVE_MAX_MEMBER_MB,
+ARCHIVE_MAX_TOTAL_MB and ARCHIVE_MAX_COMPRESSION_RATIO.
+"""
+
+import os
+import zipfile
+from pathlib import PurePosixPath
+
+from text_extraction import detect_kind, _open_source
+
+ARCHIVE_MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "1000"))
+ARCHIVE_MAX_MEMBER_BYTES = int(os.getenv("ARCHIVE_MAX_MEMBER_MB", "100")) * 1024 * 1024
+ARCHIVE_MAX_TOTAL_BYTES = int(os.getenv("ARCHIVE_MAX_TOTAL_MB", "1024")) * 1024 * 1024
+ARCHIVE_MAX_COMPRESSION_RATIO = float(os.getenv("ARCHIVE_MAX_COMPRESSION_RATIO", "200"))
+
+ARCHIVE_SUFFIXES = (".zip",)
+
+_READ_CHUNK = 1024 * 1024
+
+
+class ArchiveLimitError(Exception):
+    """Raised when an archive exceeds the member count or size caps"""
+
+
+def is_archive(file_name: str) -> bool:
+    """Check if a file name looks like a supported archive"""
+    return file_name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _skip_reason(info):
+    """Why a member should not be ingested, or None"""
+    path = PurePosixPath(info.filename)
+    if info.is_dir():
+        return "directory"
+    # macOS resource forks and hidden files (.DS_Store etc.)
+    if path.parts[0] == "__MACOSX" or path.name.startswith("."):
+        return "hidden"
+    if info.flag_bits & 0x1:
+        return "encrypted"
+    if is_archive(path.name):
+        return "nested archive"
+    if detect_kind(path.name) is None:
+        return "unsupported type"
+    if info.compress_size and info.file_size / info.compress_size > ARCHIVE_MAX_COMPRESSION_RATIO:
+        return "compression ratio too high"
+    if info.file_size > ARCHIVE_MAX_MEMBER_BYTES:
+        return "member too large"
+    return None
+
+
+def _read_member(archive, info, budget):
+    """Decompress a member, never reading more than the member/total caps allow"""
+    limit = min(ARCHIVE_MAX_MEMBER_BYTES, budget)
+    data = bytearray()
+    with archive.open(info) as member:
+        while True:
+            chunk = member.read(_READ_CHUNK)
+            if not chunk:
+                break
+            data += chunk
+            if len(data) > limit:
+                raise ArchiveLimitError(
+                    f"{info.filename} decompresses past the "
+                    f"{'member' if limit == ARCHIVE_MAX_MEMBER_BYTES else 'archive'} size limit"
+                )
+    return data
+
+
+def iter_archive_members(source, archive_name, stats=None):
+    """
+    Yield the ingestible members of a ZIP archive one at a time.
+
+    Args:
+        source: Path, bytes-like buffer or binary file object of the archive
+        archive_name: Name of the archive, used to prefix member names
+        stats: Optional dict, filled with members, ingested, bytes_read and
+            skipped ({member: reason}) as the archive is consumed
+
+    Yields:
+        Tuples of (name, data) where name is "<archive_name>/<member path>"
+        and data is the decompressed member as a bytearray
+
+    Raises:
+        ArchiveLimitError: If the archive has too many members or its
+            declared/actual decompressed size exceeds the caps
+        zipfile.BadZipFile: If the archive is not a valid ZIP file
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"members": 0, "ingested": 0, "bytes_read": 0, "skipped": {}})
+
+    with _open_source(source) as archive_input, zipfile.ZipFile(archive_input) as archive:
+        members = archive.infolist()
+        stats["members"] = len(members)
+        if len(members) > ARCHIVE_MAX_MEMBERS:
+            raise ArchiveLimitError(
+                f"{archive_name} has {len(members)} members (limit {ARCHIVE_MAX_MEMBERS})"
+            )
+        declared_total = sum(info.file_size for info in members)
+        if declared_total > ARCHIVE_MAX_TOTAL_BYTES:
+            raise ArchiveLimitError(
+                f"{archive_name} expands to {declared_total / (1024 * 1024):.0f} MB "
+                f"(limit {ARCHIVE_MAX_TOTAL_BYTES // (1024 * 1024)} MB)"
+            )
+
+        for info in members:
+            reason = _skip_reason(info)
+            if reason:
+                if reason != "directory":
+                    stats["skipped"][info.filename] = reason
+                continue
+
+            data = _read_member(archive, info, ARCHIVE_MAX_TOTAL_BYTES - stats["bytes_read"])
+            stats["bytes_read"] += len(data)
+            stats["ingested"] += 1
+            yield f"{archive_name}/{info.filename}", data
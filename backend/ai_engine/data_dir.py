@@ -0,0 +1,15 @@
+"""
+Data Directory Module
+
+Where the backend keeps the files it generates (OCR cache, converted Excel
+frames, Excel plan cache): outside the source tree, since run.py starts the
+backend inside ai_engine.
+
+Set TOAI_DATA_DIR to move it (default ~/.toai); each file's own setting
+(OCR_DATA_DIR, FRAME_STORE_DIR, EXCEL_PLAN_CACHE_PATH) still takes
+precedence.
+"""
+
+import os
+
+DATA_DIR = os.getenv("TOAI_DATA_DIR", os.path.join(os.path.expanduser("~"), ".toai"))
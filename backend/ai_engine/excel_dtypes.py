@@ -0,0 +1,185 @@
+"""
+Excel Dtype Optimization Module
+
+Load-time pass that shrinks the DataFrames built from Excel workbooks
+before they go into the frame store:
+
+- int64 columns become int32 when the product of any two values still
+  fits, so SQL arithmetic between columns cannot overflow (reductions are
+  computed in 64 bits by numpy and DuckDB)
+- text columns holding only ISO dates ("2024-01-31", "2024-01-31 08:30:00")
+  become datetime64 when formatting them back gives the same text
+- low-cardinality text columns become categoricals (dictionary-encoded
+  columns in the Arrow file)
+
+The narrowed frame is what the store keeps on disk and in memory, and
+what the SQL engine and the fast-path planner query. Code written for the
+workbook's own dtypes, the pandas agent's and replayed plans, changes
+behaviour on narrow columns (int32 wraps, categoricals reject new values,
+datetimes have no .str), so it runs on restore_dtypes(), which converts
+the narrowed columns back exactly.
+
+Float columns are left as float64: float32 would change values and
+aggregates. A column is only converted when that actually saves memory.
+
+Disable with EXCEL_OPTIMIZE_DTYPES=0. EXCEL_CATEGORY_MAX_RATIO is the
+largest distinct/non-null ratio a text column may have to become a
+categorical.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+EXCEL_OPTIMIZE_DTYPES = os.getenv("EXCEL_OPTIMIZE_DTYPES", "1").lower() not in ("0", "false", "no")
+EXCEL_CATEGORY_MAX_RATIO = float(os.getenv("EXCEL_CATEGORY_MAX_RATIO", "0.5"))
+
+_INT32_SQUARE_BOUND = int(np.sqrt(np.iinfo(np.int32).max))
+_ISO_DATE = r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"
+# Formats a parsed date column is written back with; the column is only
+# parsed when one of them reproduces every value
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+
+def _missing_kind(series):
+    """How an object column spells missing values: "none", "nan", or None when mixed"""
+    missing = series[series.isna()]
+    if missing.empty or all(value is None for value in missing):
+        return "none"
+    if all(isinstance(value, float) for value in missing):
+        return "nan"
+    return None
+
+
+def _is_text(series) -> bool:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    if not (isinstance(series.dtype, pd.StringDtype) or series.dtype == object):
+        return False
+    return pd.api.types.infer_dtype(series, skipna=True) == "string"
+
+
+def _downcast_int(series):
+    if series.empty or series.dtype.itemsize <= 4:
+        return None
+    if max(abs(int(series.min())), abs(int(series.max()))) > _INT32_SQUARE_BOUND:
+        return None
+    return series.astype(np.int32)
+
+
+def _parse_dates(series, values):
+    if not values.astype(str).str.fullmatch(_ISO_DATE).all():
+        return None, None
+    parsed = pd.to_datetime(series, format="ISO8601", errors="coerce")
+    if parsed.notna().sum() != len(values):
+        return None, None
+    for date_format in _DATE_FORMATS:
+        if parsed.dropna().dt.strftime(date_format).eq(values.astype(str)).all():
+            return parsed, date_format
+    return None, None
+
+
+def _categorize(series, values):
+    if values.nunique() > EXCEL_CATEGORY_MAX_RATIO * len(values):
+        return None
+    return series.astype("category")
+
+
+def _convert(series):
+    """
+    Smaller lossless version of a column, or None to keep it.
+
+    Returns:
+        Tuple of (converted series or None, date format or None, missing kind)
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return None, None, None
+    if pd.api.types.is_integer_dtype(series) and isinstance(series.dtype, np.dtype):
+        return _downcast_int(series), None, None
+    if not _is_text(series):
+        return None, None, None
+    missing = _missing_kind(series) if series.dtype == object else None
+    if series.dtype == object and missing is None:
+        return None, None, None
+    values = series.dropna()
+    if values.empty:
+        return None, None, None
+    parsed, date_format = _parse_dates(series, values)
+    if parsed is not None:
+        return parsed, date_format, missing
+    return _categorize(series, values), None, missing
+
+
+def _bytes(series) -> int:
+    return int(series.memory_usage(index=False, deep=True))
+
+
+def optimize_dtypes(df: pd.DataFrame):
+    """
+    Shrink a DataFrame's column dtypes without changing its values.
+
+    Args:
+        df: Frame as loaded from the workbook (not modified)
+
+    Returns:
+        Tuple of (optimized DataFrame, report) where report has the frame's
+        bytes before and after, the dtype change of each converted column
+        and what restore_dtypes() needs to undo them
+    """
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    report = {"bytes_before": before, "bytes_after": before, "saved_bytes": 0, "columns": {}, "restore": []}
+    if not EXCEL_OPTIMIZE_DTYPES or df.empty:
+        return df, report
+
+    optimized = None
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        try:
+            converted, date_format, missing = _convert(series)
+        except (TypeError, ValueError, OverflowError) as e:
+            print(f"[WARNING] Keeping dtype of column {series.name!r}: {e}")
+            continue
+        if converted is None or _bytes(converted) >= _bytes(series):
+            continue
+        if optimized is None:
+            optimized = df.copy()
+        # isetitem handles duplicate column names
+        optimized.isetitem(position, converted)
+        report["columns"][str(series.name)] = f"{series.dtype} -> {converted.dtype}"
+        report["restore"].append([position, str(series.dtype), date_format, missing])
+
+    if optimized is None:
+        return df, report
+    after = int(optimized.memory_usage(index=True, deep=True).sum())
+    report["bytes_after"] = after
+    report["saved_bytes"] = before - after
+    return optimized, report
+
+
+def restore_dtypes(df: pd.DataFrame, report: dict) -> pd.DataFrame:
+    """
+    The frame with the dtypes it was loaded with, for code written against
+    those (the pandas agent, replayed plans).
+
+    Args:
+        df: Frame returned by optimize_dtypes() (not modified)
+        report: Its report; frames without one are returned as they are
+
+    Returns:
+        Frame whose narrowed columns are converted back; the other columns
+        are shared with df
+    """
+    restore = (report or {}).get("restore")
+    if not restore:
+        return df
+    restored = df.copy(deep=False)
+    for position, dtype, date_format, missing in restore:
+        series = df.iloc[:, position]
+        if date_format:
+            series = series.dt.strftime(date_format)
+        series = series.astype(dtype)
+        if missing == "none":
+            series = series.where(series.notna(), None)
+        restored.isetitem(position, series)
+    return restored
@@ -0,0 +1,396 @@
+"""
+Excel Frame Store Module
+
+Keeps the Excel agent's DataFrames in columnar files on disk instead of in
+process memory for the life of the backend.
+
+Each workbook is converted once to an uncompressed Arrow IPC (Feather v2)
+file named after the workbook's content hash. Frames are loaded on demand
+by memory-mapping that file, so numeric columns are backed by the page
+cache rather than copied, and an LRU of loaded frames is kept under a byte
+budget (FRAME_STORE_MEMORY_MB). Re-adding a workbook whose converted file
+already exists skips parsing the .xlsx entirely, including after a restart.
+
+Frames are stored as put: with the narrowed dtypes of excel_dtypes, whose
+report is kept in the "dtype_report" metadata. original() and
+writable_copy() convert those columns back for code written against the
+workbook's own dtypes.
+
+Loaded frames are read-only (their columns are views of the map); code that
+assigns into a frame, like the pandas agent's, gets one from writable_copy().
+Those copies count against the budget too, and eviction listeners let their
+holders drop them (and any other reference) when a frame is evicted, so
+the budget bounds what the frames actually keep alive.
+
+The store is a mapping of file name -> DataFrame, so it replaces the plain
+dict ExcelAgentSystem used. Frames that cannot be represented in Arrow
+(mixed-type object columns, duplicate or non-string column names) stay in
+memory as before. Without pyarrow every frame stays in memory.
+
+Files live in FRAME_STORE_DIR (default: excel_frames in the data directory,
+see data_dir).
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from data_dir import DATA_DIR
+from excel_dtypes import restore_dtypes
+from excel_result_cache import dataframe_fingerprint
+
+FRAME_STORE_DIR = os.getenv("FRAME_STORE_DIR", os.path.join(DATA_DIR, "excel_frames"))
+FRAME_STORE_MEMORY_BYTES = int(os.getenv("FRAME_STORE_MEMORY_MB", "1024")) * 1024 * 1024
+
+_FINGERPRINT_KEY = b"excel_frame_store.fingerprint"
+_COLUMNS_KEY = b"excel_frame_store.columns"
+_METADATA_KEY = b"excel_frame_store.metadata"
+_HASH_CHUNK = 1024 * 1024
+
+
+def workbook_hash(source) -> str:
+    """SHA-256 of a workbook given as a path or bytes-like buffer"""
+    if not isinstance(source, (str, os.PathLike)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _frame_bytes(df) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class ExcelFrameStore(MutableMapping):
+    """
+    Mapping of file name -> DataFrame backed by memory-mapped Arrow files.
+
+    Attributes:
+        store_dir: Directory of the converted files
+        memory_budget: Bytes of loaded frames kept before evicting the least
+            recently used one (frames that only exist in memory never count
+            against it, since they cannot be reloaded)
+    """
+
+    def __init__(self, store_dir: str = FRAME_STORE_DIR, memory_budget: int = FRAME_STORE_MEMORY_BYTES):
+        self.store_dir = store_dir
+        self.memory_budget = memory_budget
+        self.loads = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # name -> {path, fingerprint, rows, columns, bytes, copy_bytes, metadata}
+        self._loaded = OrderedDict()  # name -> DataFrame, least recently used first
+        self._pinned = {}  # name -> DataFrame that could not be stored on disk
+        self._evict_listeners = []
+        self._lock = threading.RLock()
+        if PYARROW_AVAILABLE:
+            os.makedirs(store_dir, exist_ok=True)
+
+    # ---- conversion ----
+
+    def _path(self, content_hash):
+        return os.path.join(self.store_dir, f"{content_hash}.arrow")
+
+    def _write(self, df, path, fingerprint, extra):
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_FINGERPRINT_KEY] = fingerprint.encode("ascii")
+        metadata[_COLUMNS_KEY] = str(len(df.columns)).encode("ascii")
+        metadata[_METADATA_KEY] = json.dumps(extra).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+        # Unique per writer: other threads or parse workers may convert the same workbook
+        part_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with pa.OSFile(part_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(part_path, path)
+
+    def put(self, name: str, df, content_hash: str = None, metadata: dict = None):
+        """
+        Store a frame, converting it to an Arrow file named after content_hash
+        (or the frame's fingerprint when no workbook hash is known).
+
+        Args:
+            name: File name the frame is looked up by
+            df: The frame
+            content_hash: sha256 of the source workbook
+            metadata: JSON-serializable details kept with the converted file
+                and returned by info(), also for adopted frames
+        """
+        fingerprint = dataframe_fingerprint(df)
+        entry = {
+            "path": None,
+            "fingerprint": fingerprint,
+            "rows": len(df),
+            "columns": len(df.columns),
+            "column_names": [str(column) for column in df.columns],
+            "bytes": _frame_bytes(df),
+            "copy_bytes": 0,
+            "metadata": metadata or {},
+        }
+        storable = (
+            PYARROW_AVAILABLE
+            and df.columns.is_unique
+            and all(isinstance(column, str) for column in df.columns)
+        )
+        if storable:
+            path = self._path(content_hash or fingerprint)
+            try:
+                if not os.path.exists(path):
+                    self._write(df, path, fingerprint, metadata or {})
+                entry["path"] = path
+            except (pa.ArrowException, ValueError, TypeError) as e:
+                print(f"[WARNING] Keeping {name} in memory, cannot store it as Arrow: {e}")
+
+        evicted = []
+        with self._lock:
+            self._discard(name)
+            self._entries[name] = entry
+            if entry["path"] is None:
+                self._pinned[name] = df
+            else:
+                self._loaded[name] = df
+                evicted = self._evict()
+        self._notify(evicted)
+
+    def adopt(self, name: str, content_hash: str) -> bool:
+        """
+        Register a workbook converted earlier (same content hash) without
+        parsing it again.
+
+        Returns:
+            True if a converted file existed and was registered
+        """
+        if not PYARROW_AVAILABLE:
+            return False
+        path = self._path(content_hash)
+        if not os.path.exists(path):
+            return False
+        try:
+            with pa.memory_map(path, "r") as source:
+                reader = pa.ipc.open_file(source)
+                schema, rows = reader.schema, sum(
+                    reader.get_batch(i).num_rows for i in range(reader.num_record_batches)
+                )
+        except (pa.ArrowException, OSError) as e:
+            print(f"[WARNING] Ignoring unreadable converted workbook {path}: {e}")
+            return False
+        metadata = schema.metadata or {}
+        if _FINGERPRINT_KEY not in metadata or _COLUMNS_KEY not in metadata:
+            return False
+        index_fields = set(
+            name for name in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(name, str)
+        )
+        with self._lock:
+            self._discard(name)
+            self._entries[name] = {
+                "path": path,
+                "fingerprint": metadata[_FINGERPRINT_KEY].decode("ascii"),
+                "rows": rows,
+                "columns": int(metadata[_COLUMNS_KEY]),
+                "column_names": [name for name in schema.names if name not in index_fields],
+                "bytes": None,  # known once loaded
+                "copy_bytes": 0,
+                "metadata": json.loads(metadata.get(_METADATA_KEY, b"{}")),
+            }
+        return True
+
+    # ---- loading / eviction ----
+
+    def _load(self, name, entry):
+        started = time.perf_counter()
+        source = pa.memory_map(entry["path"], "r")
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks keeps columns apart so numeric ones can stay views of the map
+        df = table.to_pandas(split_blocks=True)
+        entry["bytes"] = _frame_bytes(df)
+        self.loads += 1
+        print(f"[INFO] Loaded {name} from {os.path.basename(entry['path'])} "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return df
+
+    def _resident_bytes(self, name):
+        entry = self._entries[name]
+        return (entry["bytes"] or 0) + entry["copy_bytes"]
+
+    def _evict(self):
+        """
+        Drop least recently used frames until the budget holds (keeps the newest).
+
+        Returns:
+            Names evicted; pass them to _notify() once the lock is released
+        """
+        used = sum(self._resident_bytes(name) for name in self._loaded)
+        evicted = []
+        while used > self.memory_budget and len(self._loaded) > 1:
+            name, _ = self._loaded.popitem(last=False)
+            used -= self._resident_bytes(name)
+            self._entries[name]["copy_bytes"] = 0
+            self.evictions += 1
+            evicted.append(name)
+        return evicted
+
+    def _notify(self, evicted):
+        """Tell listeners about evicted frames (outside the lock: they may take their own locks)"""
+        for name in evicted:
+            for listener in list(self._evict_listeners):
+                try:
+                    listener(name)
+                except Exception as e:
+                    print(f"[WARNING] Frame eviction listener failed for {name}: {e}")
+
+    def add_evict_listener(self, listener):
+        """
+        Call listener(name) whenever a frame is evicted. Holders of that
+        frame, or of a writable_copy() of it, drop their reference so the
+        memory is actually freed.
+        """
+        self._evict_listeners.append(listener)
+
+    def _discard(self, name):
+        self._entries.pop(name, None)
+        self._loaded.pop(name, None)
+        self._pinned.pop(name, None)
+
+    # ---- mapping interface ----
+
+    def __getitem__(self, name):
+        with self._lock:
+            if name in self._pinned:
+                return self._pinned[name]
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            entry = self._entries[name]  # KeyError for unknown names
+            df = self._load(name, entry)
+            self._loaded[name] = df
+            evicted = self._evict()
+        self._notify(evicted)
+        return df
+
+    def arrow_table(self, name: str):
+        """
+        The frame as a memory-mapped Arrow table, without building the
+        DataFrame (for engines that scan Arrow, like DuckDB).
+
+        Returns:
+            pyarrow.Table, or None for frames kept only in memory
+        """
+        with self._lock:
+            path = self._entries[name]["path"]  # KeyError for unknown names
+        if path is None:
+            return None
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    def _restore(self, name, df):
+        with self._lock:
+            report = self._entries[name]["metadata"].get("dtype_report")
+        return restore_dtypes(df, report)
+
+    def original(self, name: str):
+        """
+        Read-only frame with the dtypes the workbook was loaded with (columns
+        narrowed by excel_dtypes converted back, the others shared).
+        """
+        return self._restore(name, self[name])
+
+    def writable_copy(self, name: str):
+        """
+        Private, writable copy of a frame for code that assigns into it, with
+        the dtypes the workbook was loaded with (see original()).
+
+        Its bytes count against the memory budget until release_copy(name)
+        or until the frame is evicted (listeners then drop the copy). One
+        copy per name is tracked.
+        """
+        df = self._restore(name, self[name].copy())
+        with self._lock:
+            if name not in self._loaded:
+                return df  # pinned frames never count against the budget
+            self._entries[name]["copy_bytes"] = _frame_bytes(df)
+            evicted = self._evict()
+        self._notify(evicted)
+        return df
+
+    def release_copy(self, name: str):
+        """The writable copy of a frame was dropped"""
+        with self._lock:
+            if name in self._entries:
+                self._entries[name]["copy_bytes"] = 0
+
+    def __setitem__(self, name, df):
+        self.put(name, df)
+
+    def __delitem__(self, name):
+        with self._lock:
+            if name not in self._entries:
+                raise KeyError(name)
+            self._discard(name)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Forget every frame; converted files stay for reuse"""
+        with self._lock:
+            self._entries.clear()
+            self._loaded.clear()
+            self._pinned.clear()
+
+    def purge_files(self) -> int:
+        """Delete every converted file (backend reset); returns how many"""
+        self.clear()
+        removed = 0
+        if os.path.isdir(self.store_dir):
+            for file_name in os.listdir(self.store_dir):
+                if file_name.endswith((".arrow", ".part")):
+                    os.remove(os.path.join(self.store_dir, file_name))
+                    removed += 1
+        return removed
+
+    # ---- metadata ----
+
+    def info(self, name: str) -> dict:
+        """Rows, columns, fingerprint, metadata and residency of a frame, without loading it"""
+        with self._lock:
+            entry = dict(self._entries[name])
+            entry["in_memory"] = name in self._loaded or name in self._pinned
+            entry["on_disk"] = entry.pop("path") is not None
+            return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded_bytes = sum(self._entries[name]["bytes"] or 0 for name in self._loaded)
+            copy_bytes = sum(self._entries[name]["copy_bytes"] for name in self._loaded)
+            pinned_bytes = sum(self._entries[name]["bytes"] or 0 for name in self._pinned)
+            return {
+                "frames": len(self._entries),
+                "loaded": len(self._loaded),
+                "pinned_in_memory": len(self._pinned),
+                "loaded_mb": loaded_bytes / (1024 * 1024),
+                "writable_copies_mb": copy_bytes / (1024 * 1024),
+                "pinned_mb": pinned_bytes / (1024 * 1024),
+                "memory_budget_mb": self.memory_budget / (1024 * 1024),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,123 @@
+"""
+Excel Loader Module
+
+Shared spreadsheet reading for text extraction (RAG) and the Excel agent.
+
+Two access patterns:
+1. iter_sheet_rows(source, max_rows) - streams rows sheet by sheet, stopping
+   after max_rows per sheet. .xlsx files are read with openpyxl in read-only
+   mode, so only the rows actually rendered are ever held in memory.
+2. read_excel_sheets(source) - loads every sheet into a typed DataFrame for
+   the pandas agent, using the native calamine engine when installed
+   (python-calamine) and pandas' default engine (openpyxl / xlrd) otherwise.
+"""
+
+import os
+import zipfile
+import pandas as pd
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# Rust-based reader for xlsx/xls/ods, several times faster than openpyxl
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Rows rendered per sheet when extracting spreadsheet text for RAG.
+# The Excel agent always loads full sheets. 0 disables the cap.
+XLSX_TEXT_MAX_ROWS = int(os.getenv("XLSX_TEXT_MAX_ROWS", "5000"))
+
+EXCEL_ENGINE = "calamine" if CALAMINE_AVAILABLE else None
+
+
+def _is_zip(source) -> bool:
+    """True for OOXML workbooks (.xlsx/.xlsm), False for legacy .xls"""
+    try:
+        return zipfile.is_zipfile(source)
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+
+def _header_names(header_row):
+    """Column names the way pandas names them (blank headers -> 'Unnamed: i')"""
+    return [
+        f"Unnamed: {i}" if value is None else value
+        for i, value in enumerate(header_row)
+    ]
+
+
+def _iter_openpyxl_rows(source, max_rows):
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                yield worksheet.title, [], [], False
+                continue
+
+            data = []
+            truncated = False
+            for row in rows:
+                # pandas skips fully blank rows
+                if all(value is None for value in row):
+                    continue
+                if max_rows and len(data) >= max_rows:
+                    truncated = True
+                    break
+                data.append(row)
+            yield worksheet.title, _header_names(header), data, truncated
+    finally:
+        workbook.close()
+
+
+def _iter_pandas_rows(source, max_rows):
+    # Read one extra row to tell whether the sheet was cut off
+    sheets = pd.read_excel(
+        source, sheet_name=None, engine=EXCEL_ENGINE,
+        nrows=max_rows + 1 if max_rows else None,
+    )
+    for sheet_name, df in sheets.items():
+        truncated = bool(max_rows) and len(df) > max_rows
+        if truncated:
+            df = df.iloc[:max_rows]
+        yield sheet_name, list(df.columns), df.itertuples(index=False, name=None), truncated
+
+
+def iter_sheet_rows(source, max_rows: int = XLSX_TEXT_MAX_ROWS):
+    """
+    Stream the rows of every sheet in a workbook.
+
+    Args:
+        source: File path or seekable binary file object
+        max_rows: Maximum data rows yielded per sheet (0 = no limit)
+
+    Yields:
+        Tuples of (sheet_name, column_names, rows, truncated) where rows is an
+        iterable of value tuples and truncated is True when the sheet had more
+        than max_rows rows
+    """
+    if OPENPYXL_AVAILABLE and _is_zip(source):
+        yield from _iter_openpyxl_rows(source, max_rows)
+    else:
+        yield from _iter_pandas_rows(source, max_rows)
+
+
+def read_excel_sheets(source) -> dict:
+    """
+    Load every sheet of a workbook into a DataFrame.
+
+    Args:
+        source: File path or binary file object
+
+    Returns:
+        Dict of {sheet_name: DataFrame}
+    """
+    return pd.read_excel(source, sheet_name=None, engine=EXCEL_ENGINE)
@@ -0,0 +1,107 @@
+"""
+Excel Parse Pool Module
+
+Parses workbooks for the Excel agent in worker processes, so several
+uploads parse in parallel on separate cores instead of taking turns on the
+GIL (reading .xlsx is pure-Python work with openpyxl).
+
+A worker reads every sheet, builds the agent's DataFrame, profiles its
+columns, narrows its dtypes and writes the frame store's Arrow file itself. Only a small result travels back and the caller
+adopts the file (memory-mapped, nothing copied). Frames that cannot be stored as Arrow come back pickled.
+
+EXCEL_PARSE_WORKERS sets the number of worker processes (default: CPU
+count, at most 4); 0 parses in the calling thread.
+"""
+
+import io
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from excel_loader import read_excel_sheets
+from excel_dtypes import optimize_dtypes
+from excel_profile import profile_frame
+from excel_frame_store import ExcelFrameStore
+
+EXCEL_PARSE_WORKERS = int(os.getenv("EXCEL_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def build_frame(excel_data: dict) -> pd.DataFrame:
+    """One DataFrame per workbook: sheets are concatenated with a _sheet_name column"""
+    if len(excel_data) == 1:
+        return list(excel_data.values())[0]
+    dfs = []
+    for sheet_name, sheet_df in excel_data.items():
+        sheet_df = sheet_df.copy()
+        sheet_df['_sheet_name'] = sheet_name
+        dfs.append(sheet_df)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def parse_workbook(file_name: str, source, content_hash: str, store_dir: str) -> dict:
+    """
+    Parse a workbook and convert it into the frame store directory.
+
+    Args:
+        file_name: Name the frame is stored under
+        source: Workbook path, or its bytes
+        content_hash: sha256 of the workbook (names the Arrow file)
+        store_dir: Frame store directory
+
+    Returns:
+        Dict with stored (True when the Arrow file was written), report
+        (dtype optimization report), profile (column profile, of the
+        workbook's own dtypes) and df (the optimized frame when not stored)
+    """
+    excel_data = read_excel_sheets(source if isinstance(source, (str, os.PathLike)) else io.BytesIO(source))
+    df = build_frame(excel_data)
+    profile = profile_frame(df)
+    df, report = optimize_dtypes(df)
+    store = ExcelFrameStore(store_dir, memory_budget=0)
+    store.put(file_name, df, content_hash, metadata={"dtype_report": report, "profile": profile})
+    stored = store.info(file_name)["on_disk"]
+    return {"stored": stored, "report": report, "profile": profile, "df": None if stored else df}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Shared worker pool (forkserver where available, like the extraction workers)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(
+                max_workers=EXCEL_PARSE_WORKERS, mp_context=multiprocessing.get_context(method),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drop a pool whose worker died so the next parse starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def parse_in_pool(file_name: str, source, content_hash: str, store_dir: str) -> dict:
+    """parse_workbook() in a worker process (in this thread when the pool is disabled)"""
+    if EXCEL_PARSE_WORKERS <= 0:
+        return parse_workbook(file_name, source, content_hash, store_dir)
+    source = os.fspath(source) if isinstance(source, os.PathLike) else source
+    if not isinstance(source, (str, bytes)):
+        source = bytes(source)
+    pool = _get_pool()
+    try:
+        return pool.submit(parse_workbook, file_name, source, content_hash, store_dir).result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
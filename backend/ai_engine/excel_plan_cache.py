@@ -0,0 +1,359 @@
+"""
+Excel Plan Cache Module
+
+Persists the Python the pandas agent ran to answer a question, so the same
+kind of question is answered later by replaying that code instead of
+running the agent loop again.
+
+Entries are keyed by:
+- a schema signature (column names and dtype kinds, not the values), so a
+  plan keeps working when the data is refreshed but not when columns change
+- a question template: the normalized question with numbers and dates
+  replaced by placeholders. Literals that also appear in the generated code
+  become parameters ("top 5 ..." replays as "top 10 ..."); the others must
+  match exactly.
+
+Only code that passes validation is stored: no imports beyond pandas/numpy,
+no private attributes, no file/eval/exec builtins, no pandas/numpy file
+readers or writers, no in-place methods (pop, insert, update, ...), no
+aliases of df and no writes to df. Replays also run on a copy of df
+(shallow under copy-on-write), so whatever slips through cannot change the
+loaded data. A replay that raises or prints nothing is dropped from the cache and
+the caller falls back to the agent.
+
+Stored in SQLite at EXCEL_PLAN_CACHE_PATH (default: in the data directory,
+see data_dir); EXCEL_PLAN_CACHE_MAX_ENTRIES
+caps the number of plans (least recently used pruned first, 0 disables).
+"""
+
+import io
+import os
+import re
+import ast
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from data_dir import DATA_DIR
+from excel_result_cache import normalize_query
+
+EXCEL_PLAN_CACHE_PATH = os.getenv("EXCEL_PLAN_CACHE_PATH", os.path.join(DATA_DIR, "excel_plan_cache.sqlite3"))
+EXCEL_PLAN_CACHE_MAX_ENTRIES = int(os.getenv("EXCEL_PLAN_CACHE_MAX_ENTRIES", "1000"))
+
+AGENT_TOOL_NAME = "python_repl_ast"
+
+_LITERAL = re.compile(r"\d{4}-\d{2}-\d{2}|(?<![\w.-])\d+(?:\.\d+)?(?![\w.])")
+_PARAM = "__PLAN_PARAM_{}__"
+_TOOL_ERROR = re.compile(r"^\w*(?:Error|Exception)\b")
+
+_ALLOWED_IMPORTS = {"pandas", "numpy"}
+_FORBIDDEN_CALLS = {
+    "open", "exec", "eval", "compile", "__import__", "globals", "locals", "vars",
+    "getattr", "setattr", "delattr", "input", "exit", "quit", "breakpoint",
+}
+# Methods that modify their object in place, or read or write files
+_FORBIDDEN_METHODS = {
+    "pop", "insert", "update",
+    "to_csv", "to_excel", "to_pickle", "to_parquet", "to_feather", "to_hdf", "to_sql",
+    "to_stata", "to_json", "to_orc", "to_clipboard", "to_xml", "to_gbq",
+    "load", "save", "savez", "savez_compressed", "savetxt", "loadtxt", "genfromtxt",
+    "fromfile", "tofile", "memmap", "ExcelWriter", "HDFStore",
+}
+# Text renderers that write to a file when given a buffer
+_RENDER_METHODS = {"to_string", "to_markdown", "to_html", "to_latex"}
+
+
+def schema_signature(df: pd.DataFrame) -> str:
+    """Hash of column names and dtype kinds (int/float/object/...), independent of values"""
+    schema = [(str(column), dtype.kind) for column, dtype in df.dtypes.items()]
+    return hashlib.sha256(repr(schema).encode("utf-8")).hexdigest()
+
+
+def question_template(query: str):
+    """
+    Split a question into a template and its literals.
+
+    Returns:
+        Tuple of (template, literals), e.g. "top <p> products by price", ["5"]
+    """
+    normalized = normalize_query(query)
+    literals = _LITERAL.findall(normalized)
+    return _LITERAL.sub("<p>", normalized), literals
+
+
+def _literal_pattern(literal):
+    return re.compile(r"(?<![\w.])" + re.escape(literal) + r"(?![\w.])")
+
+
+def _clean_code(code: str) -> str:
+    """Strip markdown fences the way the agent's python tool does"""
+    code = code.strip().strip("`").strip()
+    if code.startswith("python"):
+        code = code[len("python"):]
+    return code.strip()
+
+
+def _writes_df(target) -> bool:
+    """True for df = ..., df[...] = ..., df.x = ... and nested variants"""
+    while isinstance(target, (ast.Subscript, ast.Attribute)):
+        target = target.value
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return any(_writes_df(element) for element in target.elts)
+    return isinstance(target, ast.Name) and target.id == "df"
+
+
+def _aliases_df(value) -> bool:
+    """True for d = df, a, b = df, x and [df]: names bound to df itself"""
+    if isinstance(value, (ast.Tuple, ast.List)):
+        return any(_aliases_df(element) for element in value.elts)
+    if isinstance(value, ast.Starred):
+        return _aliases_df(value.value)
+    return isinstance(value, ast.Name) and value.id == "df"
+
+
+def _forbidden_call(node) -> bool:
+    if isinstance(node.func, ast.Name):
+        return node.func.id in _FORBIDDEN_CALLS
+    if not isinstance(node.func, ast.Attribute):
+        return False
+    method = node.func.attr
+    if method in _FORBIDDEN_METHODS or method.startswith("read_"):
+        return True
+    return method in _RENDER_METHODS and (node.args or any(k.arg == "buf" for k in node.keywords))
+
+
+def validate_code(code: str) -> bool:
+    """Check generated code only reads df and uses pandas/numpy"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split(".")[0] not in _ALLOWED_IMPORTS for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if (node.module or "").split(".")[0] not in _ALLOWED_IMPORTS:
+                return False
+        elif isinstance(node, ast.Attribute) and node.attr.startswith("_"):
+            return False
+        elif isinstance(node, ast.Name) and node.id.startswith("__"):
+            return False
+        elif isinstance(node, ast.Call) and _forbidden_call(node):
+            return False
+        elif isinstance(node, ast.keyword) and node.arg == "inplace":
+            return False
+        elif isinstance(node, (ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Delete)):
+            targets = node.targets if isinstance(node, (ast.Assign, ast.Delete)) else [node.target]
+            if any(_writes_df(target) for target in targets):
+                return False
+            if not isinstance(node, ast.Delete) and _aliases_df(node.value):
+                return False
+        elif isinstance(node, ast.NamedExpr) and _aliases_df(node.value):
+            return False
+        elif isinstance(node, (ast.For, ast.comprehension)) and isinstance(node.iter, (ast.Tuple, ast.List)) \
+                and _aliases_df(node.iter):
+            # for d in [df]: binds d to df (for column in df: is fine)
+            return False
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            return False
+    return True
+
+
+def _replay_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """df for a replay: a shallow copy under copy-on-write (pandas 3), a deep copy otherwise"""
+    if int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True:
+        return df.copy(deep=False)
+    return df.copy()
+
+
+def run_code(snippets, df: pd.DataFrame) -> str:
+    """
+    Execute snippets in one namespace the way the agent's python tool does:
+    printed output is captured, and a trailing expression's value is shown.
+
+    Returns:
+        Output of the last snippet that produced any (earlier snippets are
+        usually the agent exploring the data)
+    """
+    # Writes through the copy never reach the loaded frame
+    namespace = {"df": _replay_frame(df), "pd": pd, "np": np}
+    outputs = []
+    for code in snippets:
+        tree = ast.parse(code)
+        last = tree.body[-1] if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+        if last is not None:
+            tree.body = tree.body[:-1]
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            exec(compile(tree, "<plan>", "exec"), namespace)
+            if last is not None:
+                value = eval(compile(ast.Expression(last.value), "<plan>", "eval"), namespace)
+                if value is not None:
+                    print(value)
+        outputs.append(buffer.getvalue().strip())
+    return next((output for output in reversed(outputs) if output), "")
+
+
+class ExcelPlanCache:
+    """SQLite-backed store of validated agent code per (schema signature, question template)"""
+
+    def __init__(self, path: str = EXCEL_PLAN_CACHE_PATH, max_entries: int = EXCEL_PLAN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS excel_plans ("
+                " schema_sig TEXT NOT NULL,"
+                " template TEXT NOT NULL,"
+                " literals TEXT NOT NULL,"      # JSON: question literals; null where parameterized
+                " code TEXT NOT NULL,"          # JSON list of snippets with parameter placeholders
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (schema_sig, template, literals))"
+            )
+
+    def store(self, df: pd.DataFrame, query: str, intermediate_steps) -> bool:
+        """
+        Save the code of a successful agent run.
+
+        Args:
+            df: DataFrame the agent worked on
+            query: The question
+            intermediate_steps: Agent (action, observation) pairs, as returned
+                with return_intermediate_steps=True
+
+        Returns:
+            True if a plan was stored
+        """
+        if self.max_entries <= 0:
+            return False
+        snippets = []
+        for action, observation in intermediate_steps or []:
+            if getattr(action, "tool", None) != AGENT_TOOL_NAME:
+                continue
+            if _TOOL_ERROR.match(str(observation).strip()):
+                continue  # failed attempt the agent then corrected
+            code = action.tool_input
+            if isinstance(code, dict):
+                code = code.get("query", "")
+            snippets.append(_clean_code(str(code)))
+        snippets = [code for code in snippets if code]
+        if not snippets or not all(validate_code(code) for code in snippets):
+            return False
+
+        template, literals = question_template(query)
+        stored_literals = []
+        for index, literal in enumerate(literals):
+            pattern = _literal_pattern(literal)
+            if any(pattern.search(code) for code in snippets):
+                snippets = [pattern.sub(_PARAM.format(index), code) for code in snippets]
+                stored_literals.append(None)
+            else:
+                stored_literals.append(literal)
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO excel_plans"
+                " (schema_sig, template, literals, code, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (schema_signature(df), template, json.dumps(stored_literals), json.dumps(snippets), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM excel_plans WHERE rowid NOT IN"
+                " (SELECT rowid FROM excel_plans ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        return True
+
+    def _find(self, schema_sig, template, literals):
+        rows = self._conn.execute(
+            "SELECT literals, code FROM excel_plans WHERE schema_sig = ? AND template = ?",
+            (schema_sig, template),
+        ).fetchall()
+        for stored_json, code_json in rows:
+            stored = json.loads(stored_json)
+            if len(stored) == len(literals) and all(s is None or s == l for s, l in zip(stored, literals)):
+                return stored_json, json.loads(code_json)
+        return None, None
+
+    def replay(self, df: pd.DataFrame, query: str):
+        """
+        Answer a question by replaying a stored plan against df.
+
+        Returns:
+            The plan's output, or None if there is no usable plan
+        """
+        if self.max_entries <= 0:
+            return None
+        schema_sig = schema_signature(df)
+        template, literals = question_template(query)
+        with self._lock:
+            stored_json, snippets = self._find(schema_sig, template, literals)
+            if snippets is None:
+                self.misses += 1
+                return None
+
+        for index, literal in enumerate(literals):
+            snippets = [code.replace(_PARAM.format(index), literal) for code in snippets]
+        try:
+            output = run_code(snippets, df)
+        except Exception as e:
+            output = None
+            print(f"[WARNING] Cached Excel plan failed ({type(e).__name__}: {e}), dropping it")
+        with self._lock, self._conn:
+            if not output:
+                self.misses += 1
+                self._conn.execute(
+                    "DELETE FROM excel_plans WHERE schema_sig = ? AND template = ? AND literals = ?",
+                    (schema_sig, template, stored_json),
+                )
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE excel_plans SET hits = hits + 1, last_used = ?"
+                " WHERE schema_sig = ? AND template = ? AND literals = ?",
+                (time.time(), schema_sig, template, stored_json),
+            )
+        return output
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM excel_plans")
+
+    def stats(self) -> dict:
+        """Plan count and replay hit rate since the process started"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM excel_plans").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> ExcelPlanCache:
+    """Get or create the shared Excel plan cache"""
+    global _plan_cache
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = ExcelPlanCache()
+        return _plan_cache
@@ -0,0 +1,160 @@
+"""
+Excel Profile Module
+
+Column profile of a workbook's DataFrame, computed once when the workbook
+is parsed and stored with its converted Arrow file, so the RAG summary, the
+agent prompt and /api/excel/profile never rescan the frame.
+
+The pass is vectorized: one count() for non-null values and one min(),
+max() and mean() over all numeric/datetime columns at once; distinct counts
+are per column. Columns longer than EXCEL_PROFILE_EXACT_ROWS get an
+approximate distinct count from a k-minimum-values sketch (relative error
+about 1/sqrt(EXCEL_PROFILE_SKETCH_K)); categoricals are always exact.
+
+Profiles are plain JSON-serializable dicts.
+"""
+
+import os
+import math
+
+import numpy as np
+import pandas as pd
+
+EXCEL_PROFILE_EXACT_ROWS = int(os.getenv("EXCEL_PROFILE_EXACT_ROWS", "200000"))
+EXCEL_PROFILE_SKETCH_K = int(os.getenv("EXCEL_PROFILE_SKETCH_K", "4096"))
+
+# Columns with at most this many distinct values list them
+TOP_VALUES = 10
+SAMPLE_ROWS = 5
+
+
+def _json_value(value):
+    """Plain Python value for JSON (numpy scalars, timestamps, NaN)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _kind(dtype) -> str:
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "text"
+
+
+def approximate_distinct(series: pd.Series, k: int = EXCEL_PROFILE_SKETCH_K) -> int:
+    """
+    Distinct count estimate from the k smallest 64-bit value hashes
+    (k-minimum-values sketch); exact when there are fewer than k distinct hashes.
+    """
+    hashes = pd.util.hash_pandas_object(series.dropna(), index=False).to_numpy()
+    if len(hashes) <= k:
+        return int(len(np.unique(hashes)))
+    smallest = np.unique(np.partition(hashes, k)[:k + 1])
+    if len(smallest) <= k:
+        # Heavy duplication: fewer than k distinct among the smallest hashes
+        smallest = np.unique(hashes)
+        if len(smallest) <= k:
+            return int(len(smallest))
+        smallest = smallest[:k + 1]
+    kth = float(smallest[k - 1]) + 1.0
+    return int(round((k - 1) * (2.0 ** 64) / kth))
+
+
+def _distinct(series: pd.Series):
+    """(distinct count, approximate flag)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1))), False
+    if len(series) > EXCEL_PROFILE_EXACT_ROWS:
+        distinct = approximate_distinct(series)
+        # Up to k distinct values the sketch counts exactly
+        return distinct, distinct > EXCEL_PROFILE_SKETCH_K
+    try:
+        return int(series.nunique()), False
+    except TypeError:
+        # Unhashable cells (lists, dicts)
+        return int(series.astype(str).nunique()), False
+
+
+def profile_frame(df: pd.DataFrame) -> dict:
+    """
+    Profile every column of a DataFrame.
+
+    Returns:
+        Dict with rows, columns (one dict per column: name, dtype, kind,
+        non_null, distinct, distinct_approx, min/max/mean where they apply,
+        values for low-cardinality columns) and sample (first rows as text)
+    """
+    non_null = df.count()
+    ordered = [
+        position for position, dtype in enumerate(df.dtypes)
+        if _kind(dtype) in ("numeric", "datetime")
+    ]
+    stats = {}
+    if ordered:
+        # One vectorized pass per statistic over all numeric/datetime columns
+        subset = df.iloc[:, ordered]
+        minimums, maximums = subset.min(), subset.max()
+        numeric = [p for p in ordered if _kind(df.dtypes.iloc[p]) == "numeric"]
+        means = df.iloc[:, numeric].mean() if numeric else pd.Series(dtype=float)
+        for i, position in enumerate(ordered):
+            stats[position] = {"min": _json_value(minimums.iloc[i]), "max": _json_value(maximums.iloc[i])}
+        for i, position in enumerate(numeric):
+            stats[position]["mean"] = _json_value(means.iloc[i])
+
+    columns = []
+    for position, (name, dtype) in enumerate(df.dtypes.items()):
+        series = df.iloc[:, position]
+        distinct, approximate = _distinct(series)
+        column = {
+            "name": str(name),
+            "dtype": str(dtype),
+            "kind": _kind(dtype),
+            "non_null": int(non_null.iloc[position]),
+            "distinct": distinct,
+            "distinct_approx": approximate,
+        }
+        column.update(stats.get(position, {}))
+        if column["kind"] in ("text", "category", "bool") and 0 < distinct <= TOP_VALUES and not approximate:
+            column["values"] = [_json_value(value) for value in series.dropna().unique()[:TOP_VALUES]]
+        columns.append(column)
+
+    return {
+        "rows": len(df),
+        "columns": columns,
+        "sample": df.head(SAMPLE_ROWS).to_string(index=False),
+    }
+
+
+def _short(value) -> str:
+    return f"{value:.6g}" if isinstance(value, float) else str(value)
+
+
+def describe_columns(profile: dict) -> str:
+    """One line per column for the agent prompt: name, type, distinct values and range"""
+    lines = []
+    for column in profile["columns"]:
+        details = [column["kind"]]
+        if column["distinct"]:
+            prefix = "~" if column["distinct_approx"] else ""
+            details.append(f"{prefix}{column['distinct']} distinct")
+        if column.get("min") is not None:
+            details.append(f"{_short(column['min'])} to {_short(column['max'])}")
+        if column.get("values"):
+            details.append("values: " + ", ".join(str(value) for value in column["values"]))
+        lines.append(f"- {column['name']} ({'; '.join(details)})")
+    return "\n".join(lines)
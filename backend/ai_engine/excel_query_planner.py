@@ -0,0 +1,459 @@
+"""
+Excel Query Planner Module
+
+Deterministic fast path for simple questions about a loaded spreadsheet.
+Common question shapes are parsed into a small plan and run directly in
+pandas, skipping the multi-step LLM agent:
+
+- row counts:      "how many rows where region is North"
+- aggregates:      "average price by region", "total quantity where shipped is true"
+- distinct values: "how many unique products", "list all regions"
+- top/bottom N:    "top 5 rows by price", "top 3 regions by total quantity"
+- filtered rows:   "rows where price > 100 and region is East"
+- columns:         "how many columns", "column names"
+
+Filters on null/none/missing match missing cells (isna); empty/blank also
+match empty text. Top N of a repeated entity ("top 3 regions by ...") needs
+the aggregation spelled out ("by total sales", "by average price"),
+otherwise it is left to the agent.
+
+Column names must match a column of the DataFrame (case, spacing and
+underscores are ignored; simple plurals are accepted). Anything the
+planner does not fully understand returns None, and the caller falls back
+to the pandas agent, so the fast path never guesses.
+
+Set EXCEL_FAST_PATH=0 to send every question to the agent.
+"""
+
+import os
+import re
+import pandas as pd
+
+EXCEL_FAST_PATH = os.getenv("EXCEL_FAST_PATH", "1") != "0"
+
+# Leading phrasing that carries no meaning for the plan
+_FILLER = re.compile(
+    r"^(?:(?:please|can you|could you|tell me|show me|show|give me|find|get|calculate|compute|"
+    r"list|display|return|what(?:'s| is| are| was| were)|i want to know)\s+)*(?:the\s+)?"
+)
+# Trailing references to the data itself ("... in the sheet")
+_SUFFIX = re.compile(
+    r"\s+(?:in|from|of|across)\s+(?:the\s+|this\s+|my\s+)?"
+    r"(?:data(?:set)?|sheet|spreadsheet|file|table|excel(?: file)?|workbook)$"
+)
+
+_GROUP = r"(?:\s+(?:by|per|for each|grouped by|broken down by)\s+(?P<group>.+?))?"
+_FILTER = (
+    r"(?:\s+(?:where|with|for which|for|when|whose|if|that have|that has|having|have|has|matching)"
+    r"\s+(?P<filter>.+))?"
+)
+
+AGGREGATIONS = {
+    "sum": "sum", "total": "sum",
+    "average": "mean", "avg": "mean", "mean": "mean",
+    "median": "median",
+    "maximum": "max", "max": "max", "highest": "max", "largest": "max",
+    "minimum": "min", "min": "min", "lowest": "min", "smallest": "min",
+    "standard deviation": "std",
+}
+AGGREGATION_LABELS = {
+    "sum": "Total", "mean": "Average", "median": "Median",
+    "max": "Maximum", "min": "Minimum", "std": "Standard deviation",
+}
+_AGG_PATTERN = "|".join(sorted(map(re.escape, AGGREGATIONS), key=len, reverse=True))
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twenty": 20,
+}
+_N_PATTERN = r"\d+|" + "|".join(NUMBER_WORDS)
+
+_TEMPLATES = [
+    ("column_count", re.compile(r"^(?:how many|number of)\s+columns(?:\s+are there)?$")),
+    ("columns", re.compile(r"^(?:columns|column names|headers|fields)$")),
+    ("count", re.compile(
+        r"^(?:how many|number of|count of|total number of|count)\s+(?:rows|records|entries|lines)"
+        r"(?:\s+(?:are there|do we have))?" + _GROUP + _FILTER + "$"
+    )),
+    ("nunique", re.compile(
+        r"^(?:how many|number of|count of|count)\s+(?:unique|distinct|different)\s+(?P<column>.+?)"
+        r"(?:\s+(?:are there|values))?" + _GROUP + _FILTER + "$"
+    )),
+    ("top", re.compile(
+        r"^(?P<direction>top|bottom|highest|lowest|largest|smallest)\s+(?P<n>" + _N_PATTERN + r")"
+        r"(?:\s+(?P<entity>.+?))?\s+(?:by|based on|ranked by|sorted by|in terms of)\s+"
+        r"(?:(?P<entity_agg>total|sum of|average|avg|mean)\s+)?(?P<column>.+?)"
+        + _FILTER + "$"
+    )),
+    ("aggregate", re.compile(
+        r"^(?P<agg>" + _AGG_PATTERN + r")(?:\s+value)?\s+(?:of\s+)?(?P<column>.+?)" + _GROUP + _FILTER + "$"
+    )),
+    ("distinct", re.compile(
+        r"^(?:unique|distinct|different|all)\s+(?:values\s+(?:of|in|for)\s+)?(?P<column>.+?)"
+        r"(?:\s+values)?" + _FILTER + "$"
+    )),
+    ("rows", re.compile(r"^(?:all\s+)?(?:rows|records|entries)" + _FILTER + "$")),
+]
+
+# Comparison phrases, longest first so "is not" wins over "is"
+_OPERATORS = sorted([
+    ("is not equal to", "!="), ("not equal to", "!="), ("is not", "!="), ("!=", "!="), ("<>", "!="),
+    ("does not contain", "not contains"),
+    ("is greater than or equal to", ">="), ("greater than or equal to", ">="), (">=", ">="),
+    ("is at least", ">="), ("at least", ">="), ("since", ">="),
+    ("is less than or equal to", "<="), ("less than or equal to", "<="), ("<=", "<="),
+    ("is at most", "<="), ("at most", "<="),
+    ("is greater than", ">"), ("greater than", ">"), ("is more than", ">"), ("more than", ">"),
+    ("is above", ">"), ("above", ">"), ("over", ">"), ("exceeds", ">"), ("after", ">"), (">", ">"),
+    ("is less than", "<"), ("less than", "<"), ("is below", "<"), ("below", "<"),
+    ("under", "<"), ("before", "<"), ("<", "<"),
+    ("is between", "between"), ("between", "between"),
+    ("contains", "contains"), ("includes", "contains"),
+    ("is equal to", "=="), ("equal to", "=="), ("equals", "=="), ("==", "=="), ("=", "=="), ("is", "=="),
+], key=lambda item: len(item[0]), reverse=True)
+_OPERATOR_NAMES = dict(_OPERATORS)
+# Filter values meaning "no value": missing cells, and for empty/blank also ""
+_NULL_WORDS = {"null", "none", "missing", "nan", "na", "n/a"}
+_EMPTY_WORDS = {"empty", "blank"}
+_NULL_OPERATORS = {"==": "is null", "!=": "is not null"}
+_EMPTY_OPERATORS = {"==": "is empty", "!=": "is not empty"}
+_CONDITION = re.compile(
+    r"^(?P<column>.+?)\s+(?P<op>" + "|".join(re.escape(phrase) for phrase, _ in _OPERATORS) + r")\s+(?P<value>.+)$"
+)
+
+_ROW_WORDS = ("rows", "records", "entries", "items")
+MAX_LISTED_VALUES = 100
+MAX_SHOWN_ROWS = 50
+
+
+def _norm(text) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(text).lower()).strip()
+
+
+def resolve_column(text, columns):
+    """
+    Map a column reference from a question to the DataFrame column it names.
+
+    Returns:
+        The column label, or None if the text does not name exactly one column
+    """
+    text = re.sub(r"^(?:the\s+)?(?:column\s+|field\s+)?", "", text.strip().strip("'\"`"))
+    text = _norm(re.sub(r"\s+(?:column|field|values?)$", "", text))
+    if not text:
+        return None
+    candidates = [text]
+    if text.endswith("ies"):
+        candidates.append(text[:-3] + "y")
+    if text.endswith("es"):
+        candidates.append(text[:-2])
+    if text.endswith("s"):
+        candidates.append(text[:-1])
+    candidates.append(text + "s")
+
+    by_name = {}
+    for column in columns:
+        by_name.setdefault(_norm(column), column)
+    for candidate in candidates:
+        if candidate in by_name:
+            return by_name[candidate]
+    return None
+
+
+def _parse_value(series, op, raw):
+    """Coerce a filter value to the column's type; raises ValueError if it does not fit"""
+    raw = raw.strip().strip("'\"`")
+    if op == "between":
+        low, _, high = raw.partition(" and ")
+        if not high:
+            raise ValueError(f"between needs two values: {raw}")
+        return (_parse_value(series, "==", low), _parse_value(series, "==", high))
+
+    if pd.api.types.is_bool_dtype(series):
+        if raw in ("true", "yes", "1"):
+            return True
+        if raw in ("false", "no", "0"):
+            return False
+        raise ValueError(f"not a boolean: {raw}")
+    if pd.api.types.is_numeric_dtype(series):
+        return float(re.sub(r"[,$%]", "", raw))
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(raw)
+    if op in (">", ">=", "<", "<="):
+        raise ValueError(f"cannot compare text column with {op}")
+    return raw
+
+
+def _parse_filters(text, columns, df):
+    """
+    Parse "a is x and b > 5" into [(column, op, value), ...].
+
+    Returns:
+        List of conditions, or None if any part is not understood
+    """
+    if re.search(r"\s+or\s+", text):
+        return None
+    # Give symbolic operators surrounding spaces ("price>10" -> "price > 10")
+    text = re.sub(r"\s*(>=|<=|!=|<>|==|=|>|<)\s*", r" \1 ", text).strip()
+
+    parts = re.split(r"\s+and\s+", text)
+    conditions_text = []
+    for part in parts:
+        # Rejoin "between 5" + "10"
+        if conditions_text and re.search(r"\sbetween\s+\S+$", conditions_text[-1]):
+            conditions_text[-1] += " and " + part
+        else:
+            conditions_text.append(part)
+
+    conditions = []
+    for condition in conditions_text:
+        match = _CONDITION.match(condition)
+        if not match:
+            return None
+        column = resolve_column(match.group("column"), columns)
+        if column is None:
+            return None
+        op = _OPERATOR_NAMES[match.group("op")]
+        word = match.group("value").strip().strip("'\"`")
+        if word in _NULL_WORDS | _EMPTY_WORDS:
+            operators = _NULL_OPERATORS if word in _NULL_WORDS else _EMPTY_OPERATORS
+            if op not in operators:
+                return None
+            conditions.append((column, operators[op], None))
+            continue
+        try:
+            value = _parse_value(df[column], op, match.group("value"))
+        except (ValueError, TypeError):
+            return None
+        conditions.append((column, op, value))
+    return conditions
+
+
+def plan_query(query: str, df: pd.DataFrame):
+    """
+    Parse a question into an execution plan for df.
+
+    Args:
+        query: Natural language question
+        df: DataFrame the question is about
+
+    Returns:
+        Plan dict (op, column, group, filters, ...) or None if the question
+        is not one the planner handles
+    """
+    text = query.lower().strip()
+    text = re.sub(r"[?.!]+$", "", text).strip()
+    text = _FILLER.sub("", text, count=1)
+    text = _SUFFIX.sub("", text)
+    columns = list(df.columns)
+
+    for op, template in _TEMPLATES:
+        match = template.match(text)
+        if not match:
+            continue
+        fields = match.groupdict()
+        plan = {"op": op, "filters": []}
+
+        if fields.get("filter"):
+            filters = _parse_filters(fields["filter"], columns, df)
+            if filters is None:
+                return None
+            plan["filters"] = filters
+        elif op == "rows":
+            return None  # listing every row is not an answer
+
+        if fields.get("group"):
+            plan["group"] = resolve_column(fields["group"], columns)
+            if plan["group"] is None:
+                return None
+
+        if op in ("nunique", "distinct", "aggregate", "top"):
+            plan["column"] = resolve_column(fields["column"], columns)
+            if plan["column"] is None:
+                return None
+
+        if op == "aggregate":
+            plan["agg"] = AGGREGATIONS[fields["agg"]]
+            series = df[plan["column"]]
+            numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+            orderable = numeric or pd.api.types.is_datetime64_any_dtype(series)
+            if not (numeric or (plan["agg"] in ("max", "min") and orderable)):
+                return None
+
+        if op == "top":
+            n = fields["n"]
+            plan["n"] = min(int(n) if n.isdigit() else NUMBER_WORDS[n], 1000)
+            plan["ascending"] = fields["direction"] in ("bottom", "lowest", "smallest")
+            if not pd.api.types.is_numeric_dtype(df[plan["column"]]) and \
+                    not pd.api.types.is_datetime64_any_dtype(df[plan["column"]]):
+                return None
+            entity = fields.get("entity")
+            if entity and _norm(entity) not in _ROW_WORDS:
+                plan["entity"] = resolve_column(entity, columns)
+                if plan["entity"] is None:
+                    return None
+            if fields.get("entity_agg"):
+                if not plan.get("entity") or plan["entity"] == plan["column"] or \
+                        not pd.api.types.is_numeric_dtype(df[plan["column"]]):
+                    return None
+                plan["entity_agg"] = AGGREGATIONS[fields["entity_agg"].split()[0]]
+            elif plan.get("entity") and plan["entity"] != plan["column"] and df[plan["entity"]].duplicated().any():
+                # "top 3 regions by price" could rank by the total, the
+                # average or the single highest row; the agent decides
+                return None
+
+        return plan
+    return None
+
+
+def _mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        series = df[column]
+        if op in ("is null", "is not null", "is empty", "is not empty"):
+            condition = series.isna()
+            if op in ("is empty", "is not empty") and not pd.api.types.is_numeric_dtype(series) \
+                    and not pd.api.types.is_datetime64_any_dtype(series):
+                condition |= series.astype(str).str.strip().eq("")
+            mask &= ~condition if op.startswith("is not") else condition
+            continue
+        if op in ("==", "!=", "contains", "not contains") and isinstance(value, str):
+            series = series.astype(str).str.strip().str.lower()
+        if op == "==":
+            condition = series == value
+        elif op == "!=":
+            condition = series != value
+        elif op == "contains":
+            condition = series.str.contains(value, regex=False, na=False)
+        elif op == "not contains":
+            condition = ~series.str.contains(value, regex=False, na=False)
+        elif op == "between":
+            condition = series.between(*value)
+        else:
+            condition = {
+                ">": series.gt, ">=": series.ge, "<": series.lt, "<=": series.le,
+            }[op](value)
+        mask &= condition.fillna(False).astype(bool)
+    return mask
+
+
+def _format_value(value):
+    if hasattr(value, "item"):
+        value = value.item()  # numpy scalar -> Python
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return f"{value:.4f}".rstrip("0").rstrip(".")
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat() if value == value.normalize() else value.isoformat()
+    return str(value)
+
+
+def _to_markdown(frame) -> str:
+    """Markdown table (the agent's output format), plain text if tabulate is missing"""
+    try:
+        return frame.to_markdown()
+    except ImportError:
+        return frame.to_string()
+
+
+def describe_filters(filters) -> str:
+    if not filters:
+        return ""
+    parts = []
+    for column, op, value in filters:
+        if value is None:
+            parts.append(f"{column} {op}")
+        elif op == "between":
+            parts.append(f"{column} between {_format_value(value[0])} and {_format_value(value[1])}")
+        else:
+            shown = repr(value) if isinstance(value, str) else _format_value(value)
+            parts.append(f"{column} {op} {shown}")
+    return " where " + " and ".join(parts)
+
+
+def execute_plan(plan: dict, df: pd.DataFrame) -> str:
+    """
+    Run a plan from plan_query against df.
+
+    Returns:
+        The answer as text; tables are rendered as markdown
+    """
+    op = plan["op"]
+    if op == "column_count":
+        return f"The data has {len(df.columns)} columns."
+    if op == "columns":
+        return "Columns: " + ", ".join(map(str, df.columns))
+
+    where = describe_filters(plan["filters"])
+    if plan["filters"]:
+        df = df[_mask(df, plan["filters"])]
+    group = plan.get("group")
+    column = plan.get("column")
+
+    if op == "count":
+        if group:
+            counts = df.groupby(group, observed=True).size().sort_values(ascending=False).rename("count")
+            return f"Row count by {group}{where}:\n" + _to_markdown(counts.to_frame())
+        return f"Number of rows{where}: {len(df)}"
+
+    if op == "nunique":
+        if group:
+            counts = df.groupby(group, observed=True)[column].nunique().sort_values(ascending=False)
+            return f"Unique {column} by {group}{where}:\n" + _to_markdown(counts.to_frame())
+        return f"Number of unique {column}{where}: {df[column].nunique()}"
+
+    if op == "aggregate":
+        agg = plan["agg"]
+        label = AGGREGATION_LABELS[agg]
+        if group:
+            values = df.groupby(group, observed=True)[column].agg(agg).sort_values(ascending=False)
+            return f"{label} of {column} by {group}{where}:\n" + _to_markdown(values.to_frame())
+        value = df[column].agg(agg)
+        if pd.isna(value):
+            return f"No {column} values{where}."
+        return f"{label} of {column}{where}: {_format_value(value)}"
+
+    if op == "distinct":
+        values = df[column].dropna().unique().tolist()
+        shown = ", ".join(_format_value(value) for value in values[:MAX_LISTED_VALUES])
+        more = f" ... ({len(values)} in total)" if len(values) > MAX_LISTED_VALUES else ""
+        return f"Distinct values of {column}{where} ({len(values)}): {shown}{more}"
+
+    if op == "top":
+        n, ascending, entity = plan["n"], plan["ascending"], plan.get("entity")
+        label = "Bottom" if ascending else "Top"
+        if plan.get("entity_agg"):
+            # "top 3 regions by total sales" ranks the per-entity aggregate
+            agg = plan["entity_agg"]
+            values = df.groupby(entity, observed=True)[column].agg(agg).sort_values(ascending=ascending).head(n)
+            return (f"{label} {n} {entity} by {AGGREGATION_LABELS[agg].lower()} {column}{where}:\n"
+                    + _to_markdown(values.to_frame()))
+        ranked = df.nsmallest(n, column) if ascending else df.nlargest(n, column)
+        if entity and entity != column:
+            ranked = ranked[[entity, column]]
+        return f"{label} {n} rows by {column}{where}:\n" + _to_markdown(ranked)
+
+    if op == "rows":
+        shown = df.head(MAX_SHOWN_ROWS)
+        more = f"\n(showing the first {MAX_SHOWN_ROWS})" if len(df) > MAX_SHOWN_ROWS else ""
+        return f"{len(df)} rows{where}:\n" + _to_markdown(shown) + more
+
+    raise ValueError(f"Unknown plan op: {op}")
+
+
+def answer_query(query: str, df: pd.DataFrame):
+    """
+    Answer a question with the deterministic fast path if possible.
+
+    Returns:
+        Tuple of (answer, plan), or (None, None) when the question should
+        go to the agent
+    """
+    plan = plan_query(query, df)
+    if plan is None:
+        return None, None
+    try:
+        return execute_plan(plan, df), plan
+    except Exception as e:
+        print(f"[WARNING] Fast-path plan {plan['op']} failed, falling back to the agent: {e}")
+        return None, None
@@ -0,0 +1,163 @@
+"""
+Excel Result Cache Module
+
+In-memory cache of Excel query results keyed by (DataFrame content
+fingerprint, normalized query). Dashboards ask the same questions over and
+over; a hit skips the agent loop and, for /api/chat, the summarization call
+as well, since the final chat response is cached alongside the analysis.
+
+Keys use a fingerprint of the data, not the file name, so re-adding a file
+with changed content never serves stale answers; ExcelAgentSystem also
+drops the old fingerprint's entries when a file is replaced.
+
+Entries expire after EXCEL_CACHE_TTL_S seconds; at most
+EXCEL_CACHE_MAX_ENTRIES are kept, least recently used evicted first.
+"""
+
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+EXCEL_CACHE_TTL_S = float(os.getenv("EXCEL_CACHE_TTL_S", "600"))
+EXCEL_CACHE_MAX_ENTRIES = int(os.getenv("EXCEL_CACHE_MAX_ENTRIES", "256"))
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame: column names, dtypes and every value.
+
+    Uses pandas' vectorized row hashing, so fingerprinting a large sheet
+    costs about as much as one pass over it.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode("utf-8"))
+    try:
+        row_hashes = pd.util.hash_pandas_object(df, index=True)
+    except TypeError:
+        # Unhashable cell values (lists, dicts) - hash their text form
+        row_hashes = pd.util.hash_pandas_object(df.astype(str), index=True)
+    digest.update(row_hashes.values.tobytes())
+    return digest.hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the question"""
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?.! ")
+
+
+class ExcelResultCache:
+    """
+    LRU + TTL cache of {analysis, responses} per (fingerprint, normalized query).
+
+    responses maps the prompt context a chat response was generated for
+    (e.g. the listed Excel sources) to that response, so a cached answer is
+    only reused when it would have been generated from the same prompt.
+    """
+
+    def __init__(self, max_entries: int = EXCEL_CACHE_MAX_ENTRIES, ttl: float = EXCEL_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (fingerprint, query) -> entry
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        """Live entry for key, or None; caller holds self._lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_analysis(self, fingerprint: str, query: str):
+        """Cached analysis text for a query on this data, or None"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._lookup((fingerprint, normalize_query(query)))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["analysis"]
+
+    def put_analysis(self, fingerprint: str, query: str, analysis: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            key = (fingerprint, normalize_query(query))
+            self._entries[key] = {
+                "analysis": analysis,
+                "responses": {},
+                "expires_at": time.time() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_response(self, fingerprint: str, query: str, context: str = ""):
+        """Cached final chat response generated for this prompt context, or None"""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._lookup((fingerprint, normalize_query(query)))
+            response = entry["responses"].get(context) if entry else None
+            # Misses are counted by the get_analysis call that follows one
+            if response is not None:
+                self.hits += 1
+            return response
+
+    def put_response(self, fingerprint: str, query: str, response: str, context: str = ""):
+        """Attach a chat response to a cached analysis (ignored if the analysis is not cached)"""
+        with self._lock:
+            entry = self._lookup((fingerprint, normalize_query(query)))
+            if entry is not None:
+                entry["responses"][context] = response
+
+    def invalidate(self, fingerprint: str) -> int:
+        """Drop every entry for this data; returns how many"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == fingerprint]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Cache size and hit rate since the process started"""
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_excel_result_cache = None
+_excel_result_cache_lock = threading.Lock()
+
+
+def get_excel_result_cache() -> ExcelResultCache:
+    """Get or create the shared Excel result cache"""
+    global _excel_result_cache
+    with _excel_result_cache_lock:
+        if _excel_result_cache is None:
+            _excel_result_cache = ExcelResultCache()
+        return _excel_result_cache
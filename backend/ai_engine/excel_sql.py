@@ -0,0 +1,200 @@
+"""
+Excel SQL Module
+
+Registers every loaded workbook as a table in an embedded DuckDB database
+so a single SQL query can join and aggregate across files.
+
+Tables are registered only while a query runs, so the engine keeps no
+frame alive between queries and the frame store's memory budget holds.
+Workbooks in the frame store are registered as their memory-mapped Arrow
+files (zero-copy, the pandas frame is not even built); DuckDB scans the
+pandas str columns of a DataFrame far slower than Arrow strings. Frames
+kept only in memory are registered as DataFrames. Each
+workbook is one table named after its file ("Sales Q1.xlsx" -> sales_q1);
+multi-sheet workbooks keep the _sheet_name column the Excel loader adds.
+
+Only single SELECT statements run. The database has no file system access
+(DuckDB's enable_external_access is off and the configuration is locked),
+so queries can read the registered tables and nothing else. Queries are
+interrupted after EXCEL_SQL_TIMEOUT_S and results capped at
+EXCEL_SQL_MAX_ROWS rows.
+"""
+
+import os
+import re
+import threading
+
+import pandas as pd
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+EXCEL_SQL_TIMEOUT_S = float(os.getenv("EXCEL_SQL_TIMEOUT_S", "30"))
+EXCEL_SQL_MAX_ROWS = int(os.getenv("EXCEL_SQL_MAX_ROWS", "1000"))
+
+_EXCEL_EXTENSION = re.compile(r"\.(xlsx|xlsm|xls)$", re.IGNORECASE)
+
+
+class SQLQueryError(ValueError):
+    """Raised for SQL that is rejected or fails to run"""
+
+
+def table_name(filename: str, taken=()) -> str:
+    """SQL identifier for a workbook: lowercased stem, non-alphanumerics as _"""
+    name = re.sub(r"\W+", "_", _EXCEL_EXTENSION.sub("", filename).lower()).strip("_") or "sheet"
+    if name[0].isdigit():
+        name = f"t_{name}"
+    candidate, suffix = name, 2
+    while candidate in taken:
+        candidate, suffix = f"{name}_{suffix}", suffix + 1
+    return candidate
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class ExcelSQLEngine:
+    """DuckDB connection with one registered table per loaded workbook"""
+
+    def __init__(self, timeout: float = EXCEL_SQL_TIMEOUT_S, max_rows: int = EXCEL_SQL_MAX_ROWS):
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self._conn = duckdb.connect(":memory:", config={"enable_external_access": False})
+        self._conn.execute("SET lock_configuration = true")
+        self._tables = {}  # filename -> {table, fingerprint, rows, columns: [(name, type)]}
+        self._frames = {}  # ExcelFrameStore (or mapping) the tables are read from
+        self._lock = threading.Lock()
+
+    def sync(self, frames, fingerprints: dict):
+        """
+        Describe new or changed workbooks as tables and drop removed ones.
+
+        Args:
+            frames: ExcelFrameStore or any mapping of filename -> DataFrame;
+                queries read the frames from it
+            fingerprints: {filename: content fingerprint}; a table is
+                described again when its file's fingerprint changes
+        """
+        with self._lock:
+            self._frames = frames
+            for filename in [f for f in self._tables if f not in fingerprints]:
+                del self._tables[filename]
+
+            for filename, fingerprint in fingerprints.items():
+                current = self._tables.get(filename)
+                if current and current["fingerprint"] == fingerprint:
+                    continue
+                if current:
+                    name = current["table"]
+                else:
+                    name = table_name(filename, {t["table"] for t in self._tables.values()})
+
+                source = self._source(filename)
+                try:
+                    self._conn.register(name, source)
+                    described = self._conn.execute(f"DESCRIBE {_quote(name)}").fetchall()
+                except duckdb.Error as e:
+                    print(f"[WARNING] Cannot register {filename} as SQL table: {e}")
+                    self._tables.pop(filename, None)
+                    continue
+                finally:
+                    self._conn.unregister(name)
+                self._tables[filename] = {
+                    "table": name,
+                    "fingerprint": fingerprint,
+                    "rows": source.num_rows if hasattr(source, "num_rows") else len(source),
+                    "columns": [(row[0], row[1]) for row in described],
+                }
+
+    def _source(self, filename):
+        """Arrow table from the frame store if it has one, else the DataFrame"""
+        table = self._frames.arrow_table(filename) if hasattr(self._frames, "arrow_table") else None
+        return table if table is not None else self._frames[filename]
+
+    def tables(self) -> dict:
+        """{filename: {table, rows, columns}} of the registered workbooks"""
+        with self._lock:
+            return {
+                filename: {"table": t["table"], "rows": t["rows"], "columns": list(t["columns"])}
+                for filename, t in self._tables.items()
+            }
+
+    def describe(self) -> str:
+        """Table schemas as text, for an LLM prompt"""
+        lines = []
+        for filename, t in self.tables().items():
+            columns = ", ".join(f"{_quote(name)} {dtype}" for name, dtype in t["columns"])
+            lines.append(f"{t['table']} (from {filename}, {t['rows']} rows): {columns}")
+        return "\n".join(lines)
+
+    def execute(self, sql: str):
+        """
+        Run one SELECT statement against the registered tables.
+
+        Returns:
+            Tuple of (DataFrame of at most max_rows rows, truncated flag)
+
+        Raises:
+            SQLQueryError: Not a single SELECT, timed out, or failed
+        """
+        try:
+            statements = duckdb.extract_statements(sql)
+        except duckdb.Error as e:
+            raise SQLQueryError(f"Invalid SQL: {e}") from e
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise SQLQueryError("Only a single SELECT statement is allowed")
+
+        with self._lock:
+            registered = []
+            timer = threading.Timer(self.timeout, self._conn.interrupt)
+            try:
+                for filename, t in self._tables.items():
+                    # Only the tables the query names, so unrelated frames stay unloaded
+                    if re.search(r"\b" + re.escape(t["table"]) + r"\b", sql, re.IGNORECASE):
+                        self._conn.register(t["table"], self._source(filename))
+                        registered.append(t["table"])
+                timer.start()
+                cursor = self._conn.execute(sql)
+                rows = cursor.fetchmany(self.max_rows + 1)
+                columns = [column[0] for column in cursor.description]
+            except duckdb.InterruptException as e:
+                raise SQLQueryError(f"Query timed out after {self.timeout:.0f} s") from e
+            except duckdb.Error as e:
+                raise SQLQueryError(str(e)) from e
+            except KeyError as e:
+                raise SQLQueryError(f"Workbook {e} is no longer loaded") from e
+            finally:
+                timer.cancel()
+                for name in registered:
+                    self._conn.unregister(name)
+
+        truncated = len(rows) > self.max_rows
+        return pd.DataFrame(rows[:self.max_rows], columns=columns), truncated
+
+    def close(self):
+        with self._lock:
+            self._tables.clear()
+            self._frames = {}
+            self._conn.close()
+
+
+def extract_sql(text: str) -> str:
+    """SQL from an LLM reply, without markdown fences or a trailing semicolon"""
+    fenced = re.search(r"```(?:sql)?\s*(.+?)```", text, re.S | re.IGNORECASE)
+    sql = fenced.group(1) if fenced else text
+    return sql.strip().rstrip(";").strip()
+
+
+def format_result(result: pd.DataFrame, truncated: bool = False) -> str:
+    """Markdown table of a query result (plain text if tabulate is missing)"""
+    try:
+        table = result.to_markdown(index=False)
+    except ImportError:
+        table = result.to_string(index=False)
+    if truncated:
+        table += f"\n(first {len(result)} rows shown)"
+    return table
@@ -0,0 +1,294 @@
+"""
+Extraction Budget Module
+
+Runs text extraction in a killable worker process with a per-format time
+and memory budget, so one pathological PDF or oversized image cannot hang
+an upload or Drive sync.
+
+- Time: the worker is killed when its budget expires.
+- Memory: the worker's address space is capped with RLIMIT_AS (POSIX only).
+- Partial results: PDF pages are streamed back as they finish, so a timed-out
+  PDF still yields the pages extracted so far.
+- OCR: the worker sends images (scanned PDF pages, preprocessed photos) back
+  to this process and they are recognized on its long-lived engine pool, so
+  no worker builds its own Tesseract pool or runs OCR under its memory limit.
+
+Every call fills a report dict with the outcome:
+    status: "ok", "timeout", "memory_exceeded" or "crashed"
+    reason: Human readable explanation (None when status is "ok")
+    partial: True when the returned text covers only part of the file
+
+Budgets are configured per format kind (pdf, docx, txt, pptx, excel, image)
+with EXTRACTION_TIMEOUT_<KIND> (seconds) and EXTRACTION_MEMORY_MB_<KIND>.
+Set EXTRACTION_ISOLATION=false to extract in-process without budgets.
+"""
+
+import os
+import time
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from ocr_service import get_ocr_service, register_ocr_service
+from text_extraction import extract_text, detect_kind, EXTRACTORS, _is_path, _is_buffer
+
+EXTRACTION_ISOLATION = os.getenv("EXTRACTION_ISOLATION", "true").lower() in ("1", "true", "yes")
+
+# kind -> (timeout seconds, memory limit MB)
+_DEFAULT_BUDGETS = {
+    "pdf": (300, 2048),
+    "docx": (120, 1024),
+    "txt": (30, 512),
+    "pptx": (120, 1024),
+    "excel": (180, 2048),
+    "image": (90, 1024),
+}
+
+EXTRACTION_BUDGETS = {
+    kind: (
+        float(os.getenv(f"EXTRACTION_TIMEOUT_{kind.upper()}", str(timeout))),
+        int(os.getenv(f"EXTRACTION_MEMORY_MB_{kind.upper()}", str(memory_mb))),
+    )
+    for kind, (timeout, memory_mb) in _DEFAULT_BUDGETS.items()
+}
+
+_context = None
+
+
+def _get_context():
+    """Multiprocessing context for workers: forkserver where available, else spawn"""
+    global _context
+    if _context is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            _context = multiprocessing.get_context("forkserver")
+            # Import the extraction stack once in the fork server instead of
+            # once per worker
+            _context.set_forkserver_preload(["extraction_budget"])
+        else:
+            _context = multiprocessing.get_context("spawn")
+    return _context
+
+
+def _portable_source(source):
+    """Convert a source to something that can be sent to a worker process"""
+    if _is_path(source):
+        return str(source)
+    if _is_buffer(source):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+class _ParentOCRService:
+    """
+    OCR service of an extraction worker: forwards images over the worker's
+    pipe to the parent process's engine pool and resolves the futures as
+    the texts come back. Drop-in for OCRService within the worker.
+    """
+
+    def __init__(self, conn, send_lock, lang, pool_size, available):
+        self.lang = lang
+        self.pool_size = pool_size
+        self.backend = "parent" if available else None
+        self._conn = conn
+        self._send_lock = send_lock
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        threading.Thread(target=self._receive_results, name="ocr-results", daemon=True).start()
+
+    def is_available(self) -> bool:
+        return self.backend is not None
+
+    def submit(self, image, timeout: float = None):
+        """Send an image to the parent's pool. Returns a Future of its text."""
+        future = Future()
+        request_id = next(self._request_ids)
+        with self._pending_lock:
+            self._pending[request_id] = future
+        with self._send_lock:
+            self._conn.send(("ocr", request_id, image, timeout))
+        return future
+
+    def image_to_string(self, image, timeout: float = None) -> str:
+        if self.backend is None:
+            raise RuntimeError("Tesseract OCR not available. Please install tesserocr or pytesseract.")
+        return self.submit(image, timeout).result()
+
+    def _receive_results(self):
+        while True:
+            try:
+                request_id, text, error = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                future = self._pending.pop(request_id)
+            if error is None:
+                future.set_result(text)
+            else:
+                future.set_exception(RuntimeError(error))
+
+        # Parent went away: fail whatever is still waiting
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("OCR connection to the parent process closed"))
+
+    def shutdown(self):
+        pass
+
+
+def _serve_ocr(conn, send_lock, request_id, image, timeout):
+    """Recognize a worker's image on this process's engine pool and send the text back"""
+    def reply(future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        try:
+            with send_lock:
+                conn.send((request_id, None, str(error)) if error else (request_id, future.result(), None))
+        except (OSError, ValueError):
+            # The worker already finished or was killed
+            pass
+
+    future = get_ocr_service().submit(image, timeout)
+    future.add_done_callback(reply)
+    return future
+
+
+def _extraction_worker(conn, source, file_name, mime_type, memory_mb, ocr_settings):
+    """Worker process entry point: extract and send pages / the result over conn"""
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+    send_lock = threading.Lock()
+    register_ocr_service(_ParentOCRService(conn, send_lock, *ocr_settings))
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    try:
+        result = extract_text(
+            source, file_name=file_name, mime_type=mime_type,
+            on_page=lambda page_number, text: send(("page", page_number, text)),
+        )
+        send(("done",) + tuple(result))
+    except MemoryError:
+        send(("memory_exceeded",))
+    finally:
+        conn.close()
+
+
+def extract_text_with_budget(source, file_name="", mime_type=None, report=None):
+    """
+    Extract text like extract_text(), within the time and memory budget of
+    the file's format.
+
+    Args:
+        source: File path, bytes/bytearray/memoryview/mmap, or binary file object
+        file_name: File name used for extension-based dispatch
+        mime_type: Optional MIME type (takes precedence over the extension)
+        report: Optional dict, filled with status, reason, partial, budget
+            and elapsed time
+
+    Returns:
+        Tuple of (extracted_text, file_type, error_message). On timeout the
+        text extracted so far is returned when there is any.
+    """
+    report = report if report is not None else {}
+    if not file_name and _is_path(source):
+        file_name = os.path.basename(str(source))
+    kind = detect_kind(file_name, mime_type)
+
+    report.update({"kind": kind, "status": "ok", "reason": None, "partial": False})
+    if kind is None or not EXTRACTION_ISOLATION:
+        return extract_text(source, file_name=file_name, mime_type=mime_type)
+
+    timeout, memory_mb = EXTRACTION_BUDGETS[kind]
+    report.update({"timeout_s": timeout, "memory_limit_mb": memory_mb})
+
+    ocr_service = get_ocr_service()
+    ocr_settings = (ocr_service.lang, ocr_service.pool_size, ocr_service.is_available())
+
+    context = _get_context()
+    connection, worker_connection = context.Pipe()
+    send_lock = threading.Lock()
+    process = context.Process(
+        target=_extraction_worker,
+        args=(worker_connection, _portable_source(source), file_name, mime_type, memory_mb, ocr_settings),
+        daemon=True,
+    )
+    started = time.monotonic()
+    deadline = started + timeout
+    pages = {}
+    ocr_futures = []
+    result = None
+
+    process.start()
+    worker_connection.close()
+    try:
+        while result is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not connection.poll(remaining):
+                report.update({
+                    "status": "timeout",
+                    "reason": f"{kind} extraction exceeded {timeout:g}s time budget",
+                })
+                break
+            try:
+                message = connection.recv()
+            except EOFError:
+                # Worker died without reporting (e.g. killed by a native
+                # library failing an allocation under the memory limit)
+                process.join(1)
+                report.update({
+                    "status": "crashed",
+                    "reason": f"{kind} extraction worker exited with code {process.exitcode} "
+                              f"(memory limit {memory_mb} MB)",
+                })
+                break
+
+            if message[0] == "page":
+                pages[message[1]] = message[2]
+            elif message[0] == "ocr":
+                ocr_futures.append(_serve_ocr(connection, send_lock, *message[1:]))
+            elif message[0] == "done":
+                result = message[1:]
+            elif message[0] == "memory_exceeded":
+                report.update({
+                    "status": "memory_exceeded",
+                    "reason": f"{kind} extraction exceeded {memory_mb} MB memory budget",
+                })
+                break
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        for future in ocr_futures:
+            future.cancel()
+        with send_lock:
+            connection.close()
+
+    report["elapsed_s"] = time.monotonic() - started
+    report["pages_completed"] = len(pages)
+    report["ocr_images"] = len(ocr_futures)
+
+    if result is not None:
+        return result
+
+    print(f"[WARNING] {file_name}: {report['reason']}")
+    if pages:
+        report["partial"] = True
+        return "\n".join(pages[n] for n in sorted(pages)), EXTRACTORS[kind][1], None
+    return None, None, f"Error extracting from {file_name}: {report['reason']}"
@@ -0,0 +1,288 @@
+"""
+Ingestion Jobs Module
+
+Background job queue for ingestion work (file uploads, Google Drive syncs,
+WhatsApp scrapes). Endpoints enqueue a job and return its id immediately;
+a small worker pool runs the jobs, so ingestion bursts queue up instead of
+tying up the request threads that serve chat.
+
+Each job reports per-stage progress (e.g. extract 12/40, embed done) and
+can be cancelled. Cancellation is cooperative: job functions call
+job.check_cancelled() between units of work, and a queued job that is
+cancelled never starts.
+
+Jobs also keep an ordered event log (status changes, stage progress and
+per-file events such as "extracted" or "embedded" with their timings) that
+the SSE endpoint streams to clients. Per-file timings of finished jobs are
+aggregated per job kind and stage for latency reporting.
+
+The pool size is configurable with INGESTION_WORKERS; finished jobs are
+kept for status polling up to INGESTION_JOB_HISTORY jobs. Each job keeps
+its last INGESTION_JOB_MAX_EVENTS events.
+"""
+
+import os
+import time
+import uuid
+import threading
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_JOB_HISTORY = int(os.getenv("INGESTION_JOB_HISTORY", "200"))
+INGESTION_JOB_MAX_EVENTS = int(os.getenv("INGESTION_JOB_MAX_EVENTS", "5000"))
+LATENCY_SAMPLES = 1000  # recent per-file timings kept per (job kind, stage)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job function when the job has been cancelled"""
+
+
+class IngestionJob:
+    """
+    State of one ingestion job.
+
+    Attributes:
+        id: Job id returned to clients
+        kind: Job type, e.g. "upload", "drive_sync", "whatsapp_scrape"
+        status: One of queued, running, succeeded, failed, cancelled
+        stages: Ordered {stage name: {status, done, total, elapsed_s}}
+        result: Return value of the job function once it succeeded
+        error: Error message once the job failed
+        events: Recent events, each {seq, event, time, ...}, oldest first
+    """
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.stages = OrderedDict()
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._stage_started = {}
+        self.events = deque(maxlen=INGESTION_JOB_MAX_EVENTS)
+        self._next_seq = 1
+        self.file_timings = {}  # file stage -> [seconds, ...]
+        self._emit_locked("status", status=self.status)
+
+    def _emit_locked(self, event: str, **data):
+        """Append an event; caller holds self._lock"""
+        self.events.append({"seq": self._next_seq, "event": event, "time": time.time(), **data})
+        self._next_seq += 1
+
+    def events_since(self, seq: int = 0) -> list:
+        """Events with a sequence number greater than seq"""
+        with self._lock:
+            return [event for event in self.events if event["seq"] > seq]
+
+    # ---- progress reporting (called from the job function) ----
+
+    def start_stage(self, name: str, total: int = None):
+        """Mark a stage as running; total is the number of units if known"""
+        with self._lock:
+            self.stages[name] = {"status": JOB_RUNNING, "done": 0, "total": total, "elapsed_s": 0.0}
+            self._stage_started[name] = time.perf_counter()
+            self._emit_locked("stage", stage=name, **self.stages[name])
+
+    def advance(self, name: str, count: int = 1, total: int = None):
+        """
+        Record progress on a stage, optionally updating its total once known.
+        Raises JobCancelledError if the job was cancelled.
+        """
+        with self._lock:
+            stage = self.stages[name]
+            stage["done"] += count
+            if total is not None:
+                stage["total"] = total
+            stage["elapsed_s"] = time.perf_counter() - self._stage_started[name]
+            self._emit_locked("progress", stage=name, done=stage["done"], total=stage["total"])
+        self.check_cancelled()
+
+    def finish_stage(self, name: str):
+        with self._lock:
+            stage = self.stages[name]
+            stage["status"] = JOB_SUCCEEDED
+            if stage["total"] is not None:
+                stage["done"] = stage["total"]
+            stage["elapsed_s"] = time.perf_counter() - self._stage_started[name]
+            self._emit_locked("stage", stage=name, **stage)
+
+    def file_event(self, file_name: str, stage: str, elapsed_s: float = None, **details):
+        """
+        Record that one file passed a pipeline step (downloaded, extracted,
+        chunked, embedded, indexed), with how long that step took for it.
+        """
+        with self._lock:
+            if elapsed_s is not None:
+                self.file_timings.setdefault(stage, []).append(elapsed_s)
+            self._emit_locked("file", file=file_name, stage=stage, elapsed_s=elapsed_s, **details)
+
+    def check_cancelled(self):
+        """Raise JobCancelledError if cancellation was requested"""
+        if self._cancel_event.is_set():
+            raise JobCancelledError(f"Job {self.id} was cancelled")
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    # ---- lifecycle (called by the queue) ----
+
+    def _set_status(self, status: str, result=None, error=None):
+        with self._lock:
+            self.status = status
+            if status == JOB_RUNNING:
+                self.started_at = time.time()
+            if status in FINISHED_STATES:
+                self.finished_at = time.time()
+                self.result = result
+                self.error = error
+                for stage in self.stages.values():
+                    if stage["status"] == JOB_RUNNING:
+                        stage["status"] = status
+            self._emit_locked("status", status=status, error=error)
+
+    def to_dict(self) -> dict:
+        """JSON-serializable snapshot for the status endpoint"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "cancel_requested": self.cancel_requested,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class IngestionJobQueue:
+    """Worker pool running ingestion jobs, with a registry for status lookups"""
+
+    def __init__(self, workers: int = INGESTION_WORKERS, history: int = INGESTION_JOB_HISTORY):
+        self.history = history
+        self._jobs = OrderedDict()  # job id -> IngestionJob, oldest first
+        self._latency = {}  # (job kind, file stage) -> deque of recent seconds
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest")
+
+    def submit(self, kind: str, func, *args, **kwargs) -> IngestionJob:
+        """
+        Enqueue func(job, *args, **kwargs) as a new job.
+
+        Returns:
+            The queued IngestionJob
+        """
+        job = IngestionJob(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, func, args, kwargs)
+        print(f"[JOBS] Queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job._set_status(JOB_CANCELLED)
+            return
+        job._set_status(JOB_RUNNING)
+        started = time.perf_counter()
+        try:
+            result = func(job, *args, **kwargs)
+        except JobCancelledError:
+            job._set_status(JOB_CANCELLED)
+            print(f"[JOBS] Cancelled {job.kind} job {job.id}")
+        except Exception as e:
+            traceback.print_exc()
+            job._set_status(JOB_FAILED, error=str(e))
+            print(f"[JOBS] {job.kind} job {job.id} failed: {e}")
+        else:
+            job._set_status(JOB_SUCCEEDED, result=result)
+            print(f"[JOBS] Finished {job.kind} job {job.id} in {time.perf_counter() - started:.1f}s")
+        self._record_latency(job)
+
+    def _record_latency(self, job):
+        with self._lock:
+            for stage, timings in job.file_timings.items():
+                samples = self._latency.setdefault((job.kind, stage), deque(maxlen=LATENCY_SAMPLES))
+                samples.extend(timings)
+
+    def latency_stats(self) -> dict:
+        """
+        Per-file latency of each pipeline step, over recent finished jobs.
+
+        Returns:
+            {job kind: {stage: {count, mean_s, p50_s, p95_s, max_s}}}
+        """
+        with self._lock:
+            snapshot = {key: sorted(samples) for key, samples in self._latency.items()}
+        stats = {}
+        for (kind, stage), samples in snapshot.items():
+            stats.setdefault(kind, {})[stage] = {
+                "count": len(samples),
+                "mean_s": sum(samples) / len(samples),
+                "p50_s": samples[len(samples) // 2],
+                "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                "max_s": samples[-1],
+            }
+        return stats
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str):
+        """Return the job with this id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        """All known jobs, newest first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job.
+
+        Returns:
+            False if the job is unknown or already finished, True otherwise
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        job._cancel_event.set()
+        return True
+
+
+# Singleton instance
+_ingestion_queue = None
+_ingestion_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue() -> IngestionJobQueue:
+    """Get or create the shared ingestion job queue"""
+    global _ingestion_queue
+    with _ingestion_queue_lock:
+        if _ingestion_queue is None:
+            _ingestion_queue = IngestionJobQueue()
+        return _ingestion_queue
@@ -12,10 +12,12 @@ import io
 import base64
 import json
 import re
+import time
 from typing import Optional, List, Dict, Any
 
 # Import text extraction functions from text_extraction module
 from text_extraction import extract_text_by_mimetype
+from extraction_budget import extract_text_with_budget
 
 
 class MCPDriveClient:
@@ -197,9 +199,13 @@ class MCPDriveClient:
         Returns:
             Path to the saved file
         """
+        file_stream, file_meta = self.download_file_to_stream(file_id)
+        return self._save_stream(file_stream, file_meta, file_id, save_dir)
+    
+    def _local_file_name(self, file_meta: Dict[str, str], file_id: str) -> str:
+        """Safe local name for a downloaded file, with an extension derived from its MIME type if it has none."""
         from pathlib import Path
         
-        file_stream, file_meta = self.download_file_to_stream(file_id)
         file_name = file_meta.get('name', f'file_{file_id}')
         mime_type = file_meta.get('mimeType', 'application/octet-stream')
         
@@ -224,13 +230,17 @@ class MCPDriveClient:
         if not safe_filename:
             safe_filename = f"file_{file_id}"
         
+        return f"{safe_filename}{file_ext}"
+    
+    def _save_stream(self, file_stream: io.BytesIO, file_meta: Dict[str, str], file_id: str, save_dir: str) -> str:
+        """Write a downloaded file stream to save_dir and return the saved path."""
         # Ensure directory exists
         os.makedirs(save_dir, exist_ok=True)
         
         # Save file
-        save_path = os.path.join(save_dir, f"{safe_filename}{file_ext}")
+        save_path = os.path.join(save_dir, self._local_file_name(file_meta, file_id))
         with open(save_path, 'wb') as f:
-            f.write(file_stream.read())
+            f.write(file_stream.getbuffer())
         
         return save_path
     
@@ -253,37 +263,62 @@ class MCPDriveClient:
         
         return extracted_text, file_meta
     
-    def get_all_files_with_content(self, save_dir: str) -> List[Dict[str, Any]]:
+    def get_all_files_with_content(self, save_dir: str, on_file=None, on_file_stage=None) -> List[Dict[str, Any]]:
         """
         Get all files from Google Drive, download them, and extract text.
         
         This is the main method used by the RAG system to ingest Drive content.
         
         Args:
-            save_dir: Directory to save downloaded files
+            save_dir: Directory to save downloaded spreadsheets in (the only
+                files needed on disk afterwards; the others are extracted
+                from memory)
+            on_file: Optional callback(done, total) called after each file.
+                Exceptions it raises (e.g. job cancellation) stop the sync.
+            on_file_stage: Optional callback(file_name, stage, elapsed_s, **details)
+                called when a file has been downloaded and when it has been extracted
             
         Returns:
-            List of dicts with file info, path, and extracted text
+            List of dicts with file info, local file name, extracted text and,
+            for saved files, path
         """
-        files = self.list_files()
+        files = [f for f in self.list_files() if f['mimeType'] != 'application/vnd.google-apps.folder']
         results = []
         
-        for file in files:
+        for index, file in enumerate(files, start=1):
             file_id = file['id']
             file_name = file['name']
             mime_type = file['mimeType']
             
-            # Skip folders
-            if mime_type == 'application/vnd.google-apps.folder':
-                continue
-            
             try:
-                # Download file to disk
-                save_path = self.download_file_to_path(file_id, save_dir)
+                # Download once into memory; only spreadsheets are written to
+                # disk, because the Excel agent loads them from a path
+                started = time.perf_counter()
+                file_stream, file_meta = self.download_file_to_stream(file_id)
+                local_name = self._local_file_name(file_meta, file_id)
+                save_path = None
+                if local_name.lower().endswith(('.xlsx', '.xls')):
+                    save_path = self._save_stream(file_stream, file_meta, file_id, save_dir)
+                export_mime = file_meta.get('mimeType', mime_type)
+                if on_file_stage is not None:
+                    on_file_stage(file_name, "downloaded", time.perf_counter() - started,
+                                  size_bytes=file_stream.getbuffer().nbytes)
                 
-                # Get file stream for text extraction
-                file_stream, _ = self.download_file_to_stream(file_id)
-                extracted_text = extract_text_by_mimetype(file_stream, mime_type, file_name)
+                # Extract from the downloaded buffer in a budgeted worker
+                # process, so a pathological file cannot stall the whole Drive sync
+                extraction_report = {}
+                content, file_type, extract_error = extract_text_with_budget(
+                    file_stream, file_name=local_name, mime_type=export_mime, report=extraction_report
+                )
+                if on_file_stage is not None:
+                    on_file_stage(file_name, "extracted", extraction_report.get("elapsed_s"),
+                                  status=extraction_report.get("status"))
+                if extract_error:
+                    extracted_text = extract_error
+                elif content and content.strip():
+                    extracted_text = content
+                else:
+                    extracted_text = f"No text content found in {file_name}"
                 
                 # Format size
                 size = file.get('size', '0')
@@ -298,9 +333,13 @@ class MCPDriveClient:
                     'type': mime_type,
                     'size': size_mb,
                     'modified': file.get('modifiedTime'),
+                    'fileName': local_name,
                     'path': save_path,
                     'extractedText': extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text,
                     'fullText': extracted_text,
+                    'content': content if not extract_error else None,
+                    'fileType': file_type,
+                    'extraction': extraction_report,
                 })
                 
             except Exception as e:
@@ -313,6 +352,9 @@ class MCPDriveClient:
                     'extractedText': f"Error processing file: {str(e)}",
                     'error': True
                 })
+            
+            if on_file is not None:
+                on_file(index, len(files))
         
         return results
     
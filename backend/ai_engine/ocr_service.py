@@ -0,0 +1,316 @@
+"""
+OCR Service Module
+
+Provides a shared OCR service backed by a pool of long-lived Tesseract
+engines, used by text extraction (uploads, Drive, scanned PDFs) and the
+WhatsApp scraper.
+
+OCR results are cached on disk keyed by a perceptual hash of the image, so
+the same meme or forwarded screenshot is only OCR'd once (OCRResultCache).
+
+Backends (picked automatically):
+1. tesserocr - Tesseract C API bindings. Each engine loads its language data
+   once and recognizes PIL images directly in memory; per-image timeouts are
+   enforced inside Tesseract.
+2. pytesseract - fallback that runs one tesseract process per image. The
+   process is killed when the per-image timeout expires.
+"""
+
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from data_dir import DATA_DIR
+
+# Prefer the Tesseract API bindings (persistent engines)
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Fall back to the tesseract command line wrapper
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    PYTESSERACT_AVAILABLE = False
+
+OCR_AVAILABLE = TESSEROCR_AVAILABLE or PYTESSERACT_AVAILABLE
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# Persistent OCR results live in the data directory (see data_dir)
+OCR_DATA_DIR = os.getenv("OCR_DATA_DIR", DATA_DIR)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(OCR_DATA_DIR, "ocr_cache.sqlite3"))
+# dHash grid size; 16 gives a 256-bit hash, detailed enough to tell apart
+# screenshots that share a layout but differ in content
+OCR_PHASH_SIZE = int(os.getenv("OCR_PHASH_SIZE", "16"))
+
+
+class OCRTimeoutError(Exception):
+    """Raised when recognizing a single image exceeds the OCR timeout"""
+
+
+class OCRService:
+    """
+    Pool of long-lived OCR engines.
+
+    Engines are created lazily up to pool_size and handed out to one caller
+    at a time. Callers either recognize synchronously with image_to_string()
+    or submit() images to the service's worker threads.
+
+    Attributes:
+        backend: "tesserocr", "pytesseract" or None when OCR is unavailable
+        pool_size: Maximum number of engines / concurrent recognitions
+        lang: Tesseract language(s), e.g. "eng" or "eng+hin"
+        timeout: Per-image timeout in seconds
+    """
+
+    def __init__(self, pool_size: int = OCR_WORKERS, lang: str = OCR_LANG, timeout: float = OCR_TIMEOUT):
+        self.pool_size = max(1, pool_size)
+        self.lang = lang
+        self.timeout = timeout
+        if TESSEROCR_AVAILABLE:
+            self.backend = "tesserocr"
+        elif PYTESSERACT_AVAILABLE:
+            self.backend = "pytesseract"
+        else:
+            self.backend = None
+
+        self._idle_engines = queue.LifoQueue()
+        self._engine_count = 0
+        self._engine_lock = threading.Lock()
+        # Limits concurrent recognitions for the pytesseract backend too
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """Check if an OCR backend is available"""
+        return self.backend is not None
+
+    def _acquire_engine(self):
+        """Borrow an idle engine, creating one if the pool is not full yet"""
+        try:
+            return self._idle_engines.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._engine_lock:
+            if self._engine_count < self.pool_size:
+                self._engine_count += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return tesserocr.PyTessBaseAPI(lang=self.lang)
+            except Exception:
+                with self._engine_lock:
+                    self._engine_count -= 1
+                raise
+        return self._idle_engines.get()
+
+    def _release_engine(self, engine):
+        engine.Clear()
+        self._idle_engines.put(engine)
+
+    def _recognize_tesserocr(self, image, timeout):
+        engine = self._acquire_engine()
+        try:
+            engine.SetImage(image)
+            timeout_ms = int(timeout * 1000) if timeout else 0
+            if not engine.Recognize(timeout=timeout_ms):
+                raise OCRTimeoutError(f"OCR exceeded {timeout}s timeout")
+            return engine.GetUTF8Text()
+        finally:
+            self._release_engine(engine)
+
+    def _recognize_pytesseract(self, image, timeout):
+        try:
+            return pytesseract.image_to_string(image, lang=self.lang, timeout=timeout or 0)
+        except RuntimeError as e:
+            # pytesseract kills the process and raises RuntimeError on timeout
+            if "timeout" in str(e).lower():
+                raise OCRTimeoutError(f"OCR exceeded {timeout}s timeout") from e
+            raise
+
+    def image_to_string(self, image, timeout: float = None) -> str:
+        """
+        Recognize text in a PIL image.
+
+        Args:
+            image: PIL Image (kept in memory, never written to disk by tesserocr)
+            timeout: Per-image timeout in seconds (defaults to the service timeout)
+
+        Returns:
+            Recognized text
+
+        Raises:
+            OCRTimeoutError: If recognition exceeds the timeout
+            RuntimeError: If no OCR backend is available
+        """
+        if self.backend is None:
+            raise RuntimeError("Tesseract OCR not available. Please install tesserocr or pytesseract.")
+        timeout = self.timeout if timeout is None else timeout
+
+        with self._slots:
+            if self.backend == "tesserocr":
+                return self._recognize_tesserocr(image, timeout)
+            return self._recognize_pytesseract(image, timeout)
+
+    def submit(self, image, timeout: float = None):
+        """Recognize an image on the service's worker threads. Returns a Future."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="ocr")
+        return self._executor.submit(self.image_to_string, image, timeout)
+
+    def shutdown(self):
+        """Stop worker threads and release all engines"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        while True:
+            try:
+                engine = self._idle_engines.get_nowait()
+            except queue.Empty:
+                break
+            engine.End()
+            with self._engine_lock:
+                self._engine_count -= 1
+
+
+def perceptual_hash(image, hash_size: int = OCR_PHASH_SIZE) -> str:
+    """
+    Compute a difference hash (dHash) of an image as a hex string.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    re-encoded, resized or recompressed copies hash identically.
+    """
+    grid = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(grid.getdata())
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+class OCRResultCache:
+    """
+    On-disk cache of OCR results keyed by (perceptual hash, language).
+
+    Empty results are cached too, so images without text are not OCR'd again.
+    Hit/miss counters cover the lifetime of the process.
+    """
+
+    def __init__(self, path: str = OCR_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results ("
+                " image_hash TEXT NOT NULL,"
+                " lang TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (image_hash, lang))"
+            )
+
+    def get(self, image_hash: str, lang: str = OCR_LANG):
+        """Return the cached text for an image hash, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM ocr_results WHERE image_hash = ? AND lang = ?",
+                (image_hash, lang),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE ocr_results SET hits = hits + 1 WHERE image_hash = ? AND lang = ?",
+                    (image_hash, lang),
+                )
+            return row[0]
+
+    def put(self, image_hash: str, text: str, lang: str = OCR_LANG):
+        """Store the OCR result for an image hash"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (image_hash, lang, text, created_at) VALUES (?, ?, ?, ?)",
+                (image_hash, lang, text or "", time.time()),
+            )
+
+    def stats(self) -> dict:
+        """Cache size and hit rate since the process started"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> OCRResultCache:
+    """Get or create the shared OCR result cache"""
+    global _ocr_cache
+    with _ocr_cache_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRResultCache()
+        return _ocr_cache
+
+
+# Singleton instances, one per language
+_ocr_services = {}
+_ocr_services_lock = threading.Lock()
+
+
+def get_ocr_service(lang: str = OCR_LANG) -> OCRService:
+    """Get or create the shared OCR service for a language"""
+    with _ocr_services_lock:
+        service = _ocr_services.get(lang)
+        if service is None:
+            service = OCRService(lang=lang)
+            _ocr_services[lang] = service
+        return service
+
+
+def register_ocr_service(service) -> None:
+    """
+    Use service for its language instead of creating an OCRService, e.g. a
+    proxy that forwards images to another process's engine pool.
+    """
+    with _ocr_services_lock:
+        _ocr_services[service.lang] = service
+
+
+@atexit.register
+def _shutdown_ocr_services():
+    for service in list(_ocr_services.values()):
+        service.shutdown()
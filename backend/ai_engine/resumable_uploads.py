@@ -0,0 +1,394 @@
+"""
+Resumable Uploads Module
+
+Chunked upload protocol for large files over unreliable connections:
+
+1. create_session(file_name, size, sha256) reserves a sparse ".part" file
+   and returns an upload id plus the chunk size to use.
+2. Chunks are uploaded by index (in any order, retried as often as needed)
+   and written straight to their offset in the ".part" file.
+3. status() lists the chunks still missing, so an interrupted client
+   resumes from where it stopped instead of starting over.
+4. finalize() checks every chunk arrived, verifies the SHA-256 of the
+   assembled file and moves it into the upload folder for ingestion.
+
+Clients that cannot hash the whole file up front (browsers have no
+streaming SHA-256) may omit it; every chunk must then carry its own
+checksum, and the file hash is computed at finalize.
+
+Session state is kept as JSON next to the ".part" file, so sessions survive
+a backend restart. Sessions untouched for RESUMABLE_UPLOAD_TTL_HOURS are
+removed. RESUMABLE_UPLOAD_DIR sets where partial files live (keep it on the
+same filesystem as the upload folder so finalizing is a rename);
+RESUMABLE_CHUNK_MB sets the default chunk size.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+
+from starlette.concurrency import run_in_threadpool
+
+from upload_storage import UPLOAD_CHUNK_SIZE, UPLOAD_MAX_FILE_BYTES
+
+RESUMABLE_UPLOAD_DIR = os.getenv("RESUMABLE_UPLOAD_DIR", os.path.join("uploads", ".partial"))
+RESUMABLE_CHUNK_BYTES = int(os.getenv("RESUMABLE_CHUNK_MB", "8")) * 1024 * 1024
+RESUMABLE_MIN_CHUNK_BYTES = 256 * 1024
+RESUMABLE_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+RESUMABLE_UPLOAD_TTL = int(os.getenv("RESUMABLE_UPLOAD_TTL_HOURS", "24")) * 3600
+
+
+class UploadSessionNotFoundError(Exception):
+    """Raised for an unknown or expired upload id"""
+
+
+class UploadSessionError(Exception):
+    """Raised when a session request or chunk is invalid (bad size, index or checksum)"""
+
+
+class UploadIncompleteError(Exception):
+    """Raised when finalizing a session that is still missing chunks or is already being finalized"""
+
+
+class UploadSessionStore:
+    """On-disk registry of resumable upload sessions"""
+
+    def __init__(self, session_dir: str = RESUMABLE_UPLOAD_DIR, ttl: int = RESUMABLE_UPLOAD_TTL):
+        self.session_dir = session_dir
+        self.ttl = ttl
+        self._sessions = {}  # upload id -> session dict
+        self._locks = {}  # upload id -> lock guarding that session's metadata
+        self._writing = set()  # (upload id, chunk index) being written right now
+        self._finalizing = set()  # upload ids being verified and moved right now
+        self._lock = threading.Lock()
+        os.makedirs(session_dir, exist_ok=True)
+        self._load_sessions()
+
+    # ---- persistence ----
+
+    def _part_path(self, upload_id):
+        return os.path.join(self.session_dir, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.session_dir, f"{upload_id}.json")
+
+    def _save(self, session):
+        meta_path = self._meta_path(session["upload_id"])
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({**session, "received": sorted(session["received"])}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _load_sessions(self):
+        """Pick up sessions left by a previous run"""
+        for name in os.listdir(self.session_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.session_dir, name)) as f:
+                    session = json.load(f)
+                session["received"] = set(session["received"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARNING] Ignoring unreadable upload session {name}: {e}")
+                continue
+            if os.path.exists(self._part_path(session["upload_id"])):
+                self._sessions[session["upload_id"]] = session
+                self._locks[session["upload_id"]] = threading.Lock()
+        if self._sessions:
+            print(f"[INFO] Restored {len(self._sessions)} resumable upload sessions")
+        self.cleanup_expired()
+
+    def _discard(self, upload_id):
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+            self._locks.pop(upload_id, None)
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def cleanup_expired(self) -> int:
+        """Remove sessions idle for longer than the TTL; returns how many"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [upload_id for upload_id, session in self._sessions.items()
+                       if session["updated_at"] < cutoff and upload_id not in self._finalizing]
+        for upload_id in expired:
+            self._discard(upload_id)
+        if expired:
+            print(f"[INFO] Removed {len(expired)} expired upload sessions")
+        return len(expired)
+
+    def clear(self) -> int:
+        """Discard every session (used by the backend reset); returns how many"""
+        with self._lock:
+            upload_ids = list(self._sessions)
+        for upload_id in upload_ids:
+            self._discard(upload_id)
+        os.makedirs(self.session_dir, exist_ok=True)
+        return len(upload_ids)
+
+    # ---- protocol ----
+
+    def _get(self, upload_id):
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            lock = self._locks.get(upload_id)
+        if session is None:
+            raise UploadSessionNotFoundError(f"Upload {upload_id} not found or expired")
+        return session, lock
+
+    def create_session(self, file_name: str, size: int, sha256: str = None, chunk_size: int = None) -> dict:
+        """
+        Start a resumable upload.
+
+        Args:
+            file_name: Name the finished file is saved under
+            size: Total file size in bytes
+            sha256: Expected SHA-256 (hex) of the complete file; if None,
+                every chunk must be sent with its checksum
+            chunk_size: Requested chunk size in bytes (clamped to the allowed range)
+
+        Returns:
+            Session status dict (see status())
+
+        Raises:
+            UploadSessionError: If the name, size or hash is invalid
+        """
+        file_name = os.path.basename(file_name or "")
+        if not file_name or file_name.startswith("."):
+            raise UploadSessionError("A file name is required")
+        if size <= 0:
+            raise UploadSessionError("File size must be positive")
+        if size > UPLOAD_MAX_FILE_BYTES:
+            raise UploadSessionError(
+                f"{file_name} exceeds the upload limit of {UPLOAD_MAX_FILE_BYTES // (1024 * 1024)} MB"
+            )
+        if sha256 is not None:
+            sha256 = sha256.lower()
+            if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+                raise UploadSessionError("sha256 must be a 64 character hex digest")
+
+        chunk_size = min(max(chunk_size or RESUMABLE_CHUNK_BYTES, RESUMABLE_MIN_CHUNK_BYTES),
+                         RESUMABLE_MAX_CHUNK_BYTES)
+        self.cleanup_expired()
+
+        upload_id = uuid.uuid4().hex
+        now = time.time()
+        session = {
+            "upload_id": upload_id,
+            "file_name": file_name,
+            "size": size,
+            "sha256": sha256,
+            "chunk_size": chunk_size,
+            "total_chunks": -(-size // chunk_size),
+            "received": set(),
+            "created_at": now,
+            "updated_at": now,
+        }
+        # Sparse file; chunks are written in place at their offsets
+        with open(self._part_path(upload_id), "wb") as f:
+            f.truncate(size)
+        self._save(session)
+        with self._lock:
+            self._sessions[upload_id] = session
+            self._locks[upload_id] = threading.Lock()
+        print(f"[INFO] Started resumable upload {upload_id} for {file_name} "
+              f"({size / (1024 * 1024):.1f} MB, {session['total_chunks']} chunks)")
+        return self.status(upload_id)
+
+    def _chunk_length(self, session, index):
+        if not 0 <= index < session["total_chunks"]:
+            raise UploadSessionError(
+                f"Chunk index {index} out of range (0-{session['total_chunks'] - 1})"
+            )
+        return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+    async def write_chunk(self, upload_id: str, index: int, stream, chunk_sha256: str = None) -> dict:
+        """
+        Write one chunk from an async byte stream to its offset in the partial file.
+
+        A chunk can be re-sent any number of times; it only counts as
+        received once its full length (and checksum, if given) arrived.
+        A re-send overwrites the chunk in place, so it counts as missing
+        from the moment it starts until it verifies; a re-send that fails
+        leaves the chunk missing rather than marked received over torn bytes.
+
+        Args:
+            upload_id: Session id
+            index: Zero-based chunk index
+            stream: Async iterator of bytes (e.g. Request.stream())
+            chunk_sha256: SHA-256 (hex) of this chunk; required when the
+                session was created without a file hash
+
+        Returns:
+            Session status dict
+
+        Raises:
+            UploadSessionNotFoundError: If the session does not exist
+            UploadSessionError: If the chunk has the wrong length or checksum,
+                or is already being written by another request
+        """
+        session, lock = self._get(upload_id)
+        expected = self._chunk_length(session, index)
+        if session["sha256"] is None and not chunk_sha256:
+            raise UploadSessionError("This upload has no file hash; each chunk needs a checksum")
+        with self._lock:
+            if upload_id in self._finalizing:
+                raise UploadSessionError(f"Upload {upload_id} is being finalized")
+            if (upload_id, index) in self._writing:
+                raise UploadSessionError(f"Chunk {index} is already being uploaded")
+            self._writing.add((upload_id, index))
+        try:
+            with lock:
+                if index in session["received"]:
+                    session["received"].discard(index)
+                    self._save(session)
+
+            digest = hashlib.sha256()
+            written = 0
+            # File I/O runs in the thread pool so a slow disk does not stall
+            # the event loop; the stream's small pieces are batched into
+            # UPLOAD_CHUNK_SIZE writes to keep the hand-offs few
+            buffer = bytearray()
+            f = await run_in_threadpool(open, self._part_path(upload_id), "r+b")
+            try:
+                await run_in_threadpool(f.seek, index * session["chunk_size"])
+                async for data in stream:
+                    if not data:
+                        continue
+                    written += len(data)
+                    if written > expected:
+                        raise UploadSessionError(f"Chunk {index} is larger than {expected} bytes")
+                    digest.update(data)
+                    buffer += data
+                    if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                        await run_in_threadpool(f.write, bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await run_in_threadpool(f.write, bytes(buffer))
+            finally:
+                await run_in_threadpool(f.close)
+
+            if written != expected:
+                raise UploadSessionError(f"Chunk {index} has {written} bytes, expected {expected}")
+            if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                raise UploadSessionError(f"Chunk {index} checksum mismatch")
+
+            with lock:
+                session["received"].add(index)
+                session["updated_at"] = time.time()
+                self._save(session)
+        finally:
+            with self._lock:
+                self._writing.discard((upload_id, index))
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> dict:
+        """
+        Returns:
+            Dict with upload_id, file_name, size, chunk_size, total_chunks,
+            received_chunks, received_bytes and the missing chunk indexes
+        """
+        session, lock = self._get(upload_id)
+        with lock:
+            received = set(session["received"])
+        missing = [i for i in range(session["total_chunks"]) if i not in received]
+        received_bytes = session["size"] - sum(self._chunk_length(session, i) for i in missing)
+        return {
+            "upload_id": upload_id,
+            "file_name": session["file_name"],
+            "size": session["size"],
+            "chunk_size": session["chunk_size"],
+            "total_chunks": session["total_chunks"],
+            "received_chunks": len(received),
+            "received_bytes": received_bytes,
+            "missing": missing,
+            "expires_at": session["updated_at"] + self.ttl,
+        }
+
+    def finalize(self, upload_id: str, dest_dir: str):
+        """
+        Verify a completed upload and move it into dest_dir.
+
+        Hashing a large file takes a while, so call this from a worker thread.
+        On a hash mismatch the session is discarded and the upload has to be
+        started again. Only one call finalizes a session: while it runs,
+        other finalize calls, chunk writes and aborts of the session are
+        rejected, and once it is done the session no longer exists.
+
+        Returns:
+            Tuple of (dest_path, size_in_bytes, sha256_hex)
+
+        Raises:
+            UploadSessionNotFoundError: If the session does not exist
+            UploadIncompleteError: If chunks are still missing or another call
+                is finalizing the session
+            UploadSessionError: If the assembled file does not match the hash
+        """
+        session, lock = self._get(upload_id)
+        with self._lock:
+            if upload_id not in self._sessions:
+                raise UploadSessionNotFoundError(f"Upload {upload_id} not found or expired")
+            if upload_id in self._finalizing:
+                raise UploadIncompleteError(f"Upload {upload_id} is already being finalized")
+            if any(writing_id == upload_id for writing_id, _ in self._writing):
+                raise UploadIncompleteError(f"Upload {upload_id} still has chunks being written")
+            self._finalizing.add(upload_id)
+        try:
+            return self._finalize(upload_id, session, lock, dest_dir)
+        finally:
+            with self._lock:
+                self._finalizing.discard(upload_id)
+
+    def _finalize(self, upload_id, session, lock, dest_dir):
+        with lock:
+            missing = session["total_chunks"] - len(session["received"])
+        if missing:
+            raise UploadIncompleteError(f"Upload {upload_id} is missing {missing} chunks")
+
+        part_path = self._part_path(upload_id)
+        digest = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            while True:
+                data = f.read(UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                digest.update(data)
+        if session["sha256"] and digest.hexdigest() != session["sha256"]:
+            self._discard(upload_id)
+            raise UploadSessionError(
+                f"{session['file_name']} failed verification: SHA-256 does not match, upload discarded"
+            )
+
+        dest_path = os.path.join(dest_dir, session["file_name"])
+        shutil.move(part_path, dest_path)
+        self._discard(upload_id)
+        print(f"[INFO] Completed resumable upload {upload_id}: {session['file_name']}")
+        return dest_path, session["size"], digest.hexdigest()
+
+    def abort(self, upload_id: str):
+        """Discard a session and its partial file"""
+        self._get(upload_id)
+        with self._lock:
+            if upload_id in self._finalizing:
+                raise UploadSessionError(f"Upload {upload_id} is being finalized")
+            # Unregister before the files go, so a finalize cannot start on them
+            self._sessions.pop(upload_id, None)
+        self._discard(upload_id)
+
+
+# Singleton instance
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_upload_session_store() -> UploadSessionStore:
+    """Get or create the shared resumable upload session store"""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = UploadSessionStore()
+        return _session_store
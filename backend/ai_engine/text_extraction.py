@@ -6,35 +6,66 @@ It is used by Google Drive (MCP), WhatsApp, and file upload features to extract
 text content from downloaded files.
 
 Supported formats:
-- PDF (via pdfplumber with table extraction)
-- DOCX (via python-docx with table extraction)
+- PDF (via pdfplumber with table extraction, OCR fallback for scanned pages)
+- DOCX (streaming XML parsing with table extraction, python-docx fallback)
 - TXT (plain text)
 - PPTX (via python-pptx)
-- XLSX/XLS (via pandas)
-- Images (via Tesseract OCR)
-
-Two types of extractors are provided:
-1. Stream-based extractors (for MCP client and in-memory processing)
-2. File-path based extractors (for RAG system and uploaded files)
+- XLSX/XLS (streamed row by row, see excel_loader.py)
+- Images (via Tesseract OCR, see ocr_service.py)
+
+Every extractor accepts a file path, a bytes-like buffer (bytes, bytearray,
+memoryview, mmap) or a binary file object, and produces the same output for
+all of them (tables included). Buffers are read in place without copying, so
+Drive downloads and uploads never need to be written to disk just to extract.
+Extraction errors are returned as messages, except MemoryError, which is
+re-raised so extraction_budget can report memory budget overruns.
+
+Entry points:
+1. extract_text(source, file_name, mime_type) - registry-based dispatch
+2. extract_text_from_file(path) - for files already on disk (RAG system)
+3. extract_text_by_mimetype(stream, mime_type) - for the MCP client
 """
 
 import io
 import re
 import os
-import PyPDF2
+import mmap
+import zipfile
+import time
+import threading
 import pdfplumber
+import numpy as np
 import pandas as pd
 from docx import Document as DocxDocument
+from lxml import etree
 from pptx import Presentation
-from PIL import Image
+from PIL import Image, ImageChops, ImageFilter, ImageOps
 from pathlib import Path
+from contextlib import contextmanager
+
+# OCR runs through the shared engine pool in ocr_service
+from ocr_service import get_ocr_service, get_ocr_cache, perceptual_hash, OCR_AVAILABLE
+from excel_loader import iter_sheet_rows
+
+TESSERACT_AVAILABLE = OCR_AVAILABLE
+
+# Scanned-page OCR settings. 200 DPI keeps body text legible for Tesseract
+# while rasterizing roughly 2x faster than 300 DPI.
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "10"))
+
+# Image preprocessing settings applied before OCR. Images are rescaled to
+# OCR_TARGET_DPI when they carry DPI metadata, and their long side is kept
+# between OCR_MIN_SIDE and OCR_MAX_SIDE pixels otherwise.
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2500"))
+OCR_MIN_SIDE = int(os.getenv("OCR_MIN_SIDE", "1000"))
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "false").lower() in ("1", "true", "yes")
 
-# Check if Tesseract is available for OCR
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
+# Images scoring below this text likelihood (0..1) are assumed to be photos
+# without text and can skip OCR. See estimate_text_likelihood().
+OCR_TEXT_LIKELIHOOD_THRESHOLD = float(os.getenv("OCR_TEXT_LIKELIHOOD_THRESHOLD", "0.35"))
+TEXT_PROBE_SIZE = (512, 512)
 
 
 # ==================== Helper Functions ====================
@@ -57,223 +88,710 @@ def clean_pdf_text(text):
     return text.strip()
 
 
-# ==================== Stream-based Extractors (for MCP client) ====================
+# ==================== OCR Image Preprocessing ====================
+
+def _ocr_scale_factor(image):
+    """Scale factor that normalizes an image's DPI / pixel size for OCR"""
+    scale = 1.0
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > 1:
+        scale = OCR_TARGET_DPI / float(dpi[0])
+
+    long_side = max(image.size)
+    if long_side * scale > OCR_MAX_SIDE:
+        scale = OCR_MAX_SIDE / long_side
+    elif long_side * scale < OCR_MIN_SIDE:
+        # Upscale small images (thumbnails, screenshots), but not unboundedly
+        scale = min(OCR_MIN_SIDE / long_side, 4.0)
+    return scale
+
+
+def _otsu_threshold(histogram):
+    """Compute Otsu's binarization threshold from a 256-bin grayscale histogram"""
+    total = sum(histogram)
+    if not total:
+        return 128
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0.0
+    weight_background = 0
+    best_threshold = 128
+    best_variance = 0.0
+
+    for threshold, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += threshold * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = threshold
+    return best_threshold
+
+
+def _crop_uniform_borders(image, tolerance=24, margin=10):
+    """Crop borders that have the same color as the top-left corner pixel"""
+    background = Image.new("L", image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background).point(lambda p: 255 if p > tolerance else 0)
+    bbox = diff.getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    bbox = (
+        max(0, left - margin),
+        max(0, top - margin),
+        min(image.width, right + margin),
+        min(image.height, bottom + margin),
+    )
+    if bbox == (0, 0, image.width, image.height):
+        return image
+    return image.crop(bbox)
+
+
+def draft_for_ocr(image):
+    """
+    Let the JPEG decoder downscale a large JPEG while decoding (much faster
+    than resizing). Only takes effect before the pixels are loaded, so call
+    it right after Image.open.
 
-def extract_text_from_pdf_stream(file_stream):
-    """Extract text from PDF files using PyPDF2 (simple extraction)"""
-    try:
-        file_stream.seek(0)
-        pdf_reader = PyPDF2.PdfReader(file_stream)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip() if text.strip() else "No text content found in PDF"
-    except Exception as e:
-        return f"Error extracting PDF: {str(e)}"
+    Returns:
+        Scale factor still to apply to the (drafted) image
+    """
+    scale = _ocr_scale_factor(image)
+    if scale < 1.0 and image.format == "JPEG":
+        target_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        image.draft("L", target_size)
+        scale = target_size[0] / image.width
+    return scale
 
 
-def extract_text_from_docx_stream(file_stream):
-    """Extract text from DOCX files (simple extraction)"""
-    try:
-        file_stream.seek(0)
-        doc = DocxDocument(file_stream)
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        return text.strip() if text.strip() else "No text content found in DOCX"
-    except Exception as e:
-        return f"Error extracting DOCX: {str(e)}"
+def preprocess_image_for_ocr(image, binarize=None, crop_borders=True, scale=None):
+    """
+    Normalize an image before OCR.
 
+    Steps: apply EXIF orientation, convert to grayscale, rescale to the target
+    DPI (downscaling large phone photos, upscaling thumbnails), optionally crop
+    uniform borders and binarize with Otsu's threshold.
 
-def extract_text_from_txt_stream(file_stream):
-    """Extract text from TXT files"""
-    try:
-        file_stream.seek(0)
-        content = file_stream.read()
-        if isinstance(content, bytes):
-            return content.decode('utf-8', errors='ignore')
-        return str(content)
-    except Exception as e:
-        return f"Error extracting TXT: {str(e)}"
+    Args:
+        image: PIL Image (e.g. straight from Image.open)
+        binarize: Convert to black/white (defaults to OCR_BINARIZE)
+        crop_borders: Crop uniform borders around the content
+        scale: Scale factor returned by draft_for_ocr() when the image was
+            already drafted (drafted here otherwise)
 
+    Returns:
+        Preprocessed grayscale PIL Image
+    """
+    if binarize is None:
+        binarize = OCR_BINARIZE
+    if scale is None:
+        scale = draft_for_ocr(image)
 
-def extract_text_from_pptx_stream(file_stream):
-    """Extract text from PowerPoint files"""
-    try:
-        file_stream.seek(0)
-        prs = Presentation(file_stream)
-        text = ""
-        for i, slide in enumerate(prs.slides, 1):
-            text += f"\n[Slide {i}]\n"
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
-        return text.strip() if text.strip() else "No text content found in PPTX"
-    except Exception as e:
-        return f"Error extracting PPTX: {str(e)}"
+    image = ImageOps.exif_transpose(image)
 
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        # Flatten transparency onto white so transparent areas do not turn black
+        image = image.convert("RGBA")
+        flattened = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        flattened.alpha_composite(image)
+        image = flattened
+    if image.mode != "L":
+        image = image.convert("L")
 
-def extract_text_from_xlsx_stream(file_stream):
-    """Extract text from Excel files"""
-    try:
-        file_stream.seek(0)
-        df = pd.read_excel(file_stream, sheet_name=None)
-        text = ""
-        for sheet_name, sheet_data in df.items():
-            text += f"\n[Sheet: {sheet_name}]\n"
-            text += sheet_data.to_string(index=False) + "\n"
-        return text.strip() if text.strip() else "No text content found in XLSX"
-    except Exception as e:
-        return f"Error extracting XLSX: {str(e)}"
+    if abs(scale - 1.0) > 0.05:
+        new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(new_size, Image.LANCZOS)
 
+    if crop_borders:
+        image = _crop_uniform_borders(image)
 
-def extract_text_from_image_stream(file_stream):
-    """Extract text from images using OCR (Tesseract)"""
-    if not TESSERACT_AVAILABLE:
-        return "[OCR] Tesseract OCR not available. Please install pytesseract and tesseract-ocr."
-    try:
-        file_stream.seek(0)
-        image = Image.open(file_stream)
-        text = pytesseract.image_to_string(image)
-        return f"[OCR Extracted]\n{text.strip()}" if text.strip() else "[OCR] No text found in image"
-    except Exception as e:
-        return f"Error extracting image text (OCR): {str(e)}"
+    if binarize:
+        threshold = _otsu_threshold(image.histogram())
+        image = image.point(lambda p: 255 if p > threshold else 0)
 
+    image.info["dpi"] = (OCR_TARGET_DPI, OCR_TARGET_DPI)
+    return image
 
-def extract_text_by_mimetype(file_stream, mime_type, file_name=""):
-    """Route to appropriate stream-based extractor based on MIME type"""
-    extractors = {
-        'application/pdf': extract_text_from_pdf_stream,
-        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': extract_text_from_docx_stream,
-        'text/plain': extract_text_from_txt_stream,
-        'application/vnd.openxmlformats-officedocument.presentationml.presentation': extract_text_from_pptx_stream,
-        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': extract_text_from_xlsx_stream,
-        'application/vnd.ms-excel': extract_text_from_xlsx_stream,
-        'image/jpeg': extract_text_from_image_stream,
-        'image/png': extract_text_from_image_stream,
-        'image/jpg': extract_text_from_image_stream,
-    }
-    
-    extractor = extractors.get(mime_type)
-    if extractor:
-        return extractor(file_stream)
+
+def _line_structure_score(edges, axis):
+    """
+    Score how much edge pixels are arranged in lines separated by gaps, like
+    rows of text. Text gives a strongly varying edge profile (lines vs. empty
+    gaps) while textures and noise give a flat one.
+    """
+    profile = edges.mean(axis=axis)
+    active = np.flatnonzero(profile > 0.005)
+    if active.size < 3:
+        return 0.0
+    # Only look at the span that has content, ignoring empty margins
+    profile = profile[active[0]:active[-1] + 1]
+    variation = profile.std() / profile.mean()
+    return float(min(max((variation - 0.3) / 0.7, 0.0), 1.0))
+
+
+def estimate_text_likelihood(image):
+    """
+    Cheaply estimate whether an image contains text, on a small thumbnail.
+
+    Combines three signals: edge density (text has many sharp strokes),
+    line structure (strokes grouped in rows or columns with gaps between them)
+    and histogram bimodality (dark glyphs on a light background or vice versa).
+
+    Args:
+        image: PIL Image
+
+    Returns:
+        Score between 0 (no text) and 1 (very likely text)
+    """
+    thumb = image.convert("L")
+    thumb.thumbnail(TEXT_PROBE_SIZE)
+    pixels = np.asarray(thumb, dtype=np.float32)
+    if pixels.size == 0 or pixels.std() < 1.0:
+        return 0.0
+
+    edges = np.asarray(thumb.filter(ImageFilter.FIND_EDGES), dtype=np.float32) > 60
+    # FIND_EDGES marks the outermost pixels; ignore them
+    edges = edges[1:-1, 1:-1]
+    density = edges.mean()
+    if density < 0.003:
+        density_score = 0.0
+    elif density <= 0.25:
+        density_score = min(density / 0.04, 1.0)
     else:
-        return f"Unsupported file type: {mime_type}"
+        # Very dense edges are foliage, fabric or noise rather than text
+        density_score = max(0.0, 1.0 - (density - 0.25) / 0.25)
+
+    line_score = max(_line_structure_score(edges, axis=1), _line_structure_score(edges, axis=0))
+
+    # Otsu separability: between-class variance / total variance
+    histogram = thumb.histogram()
+    threshold = _otsu_threshold(histogram)
+    dark = pixels[pixels <= threshold]
+    light = pixels[pixels > threshold]
+    if dark.size and light.size:
+        weight_dark = dark.size / pixels.size
+        between = weight_dark * (1 - weight_dark) * (light.mean() - dark.mean()) ** 2
+        separability = float(between / pixels.var())
+        # Unimodal (photo-like) histograms still reach ~0.65 separability
+        bimodality = min(max((separability - 0.65) / 0.25, 0.0), 1.0)
+    else:
+        bimodality = 0.0
 
+    # Line structure only means something when there are enough strokes
+    line_score *= min(density_score * 2, 1.0)
+    return float(0.3 * density_score + 0.35 * line_score + 0.35 * bimodality)
 
-# ==================== File-path based Extractors (for RAG system) ====================
 
-def extract_pdf_with_tables(file_path):
+def ocr_image_cached(image):
+    """
+    OCR an image through the shared engine pool, reusing cached results.
+
+    Large JPEGs are drafted before hashing, so the hash does not decode the
+    full-size image. The perceptual hash survives resizing, so re-encoded or
+    resized copies of the same image still hit the on-disk OCR cache.
+
+    Returns:
+        Tuple of (text, cache_hit)
+    """
+    ocr_service = get_ocr_service()
+    ocr_cache = get_ocr_cache()
+    scale = draft_for_ocr(image)
+    image_hash = perceptual_hash(image)
+
+    text = ocr_cache.get(image_hash, ocr_service.lang)
+    if text is not None:
+        return text, True
+
+    text = ocr_service.image_to_string(preprocess_image_for_ocr(image, scale=scale))
+    ocr_cache.put(image_hash, text, ocr_service.lang)
+    return text, False
+
+
+# ==================== Extraction Sources ====================
+
+class _BufferReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a bytes-like buffer (bytes, bytearray,
+    memoryview or mmap). Unlike io.BytesIO it never copies the whole buffer.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._pos = position
+        return self._pos
+
+    def readinto(self, buffer):
+        chunk = self._view[self._pos:self._pos + len(buffer)]
+        size = len(chunk)
+        memoryview(buffer).cast("B")[:size] = chunk
+        self._pos += size
+        return size
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = len(self._view)
+        else:
+            end = min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = max(self._pos, end)
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def _is_buffer(source):
+    return isinstance(source, (bytes, bytearray, memoryview, mmap.mmap))
+
+
+@contextmanager
+def _open_source(source):
+    """
+    Normalize an extraction source for libraries that accept a path or a
+    binary file object. Paths are passed through, buffers are wrapped in a
+    zero-copy reader (released on exit so mmaps can be closed), file objects
+    are rewound.
+    """
+    if _is_path(source):
+        yield str(source)
+    elif _is_buffer(source):
+        reader = _BufferReader(source)
+        try:
+            yield reader
+        finally:
+            reader.close()
+    else:
+        source.seek(0)
+        yield source
+
+
+def _source_name(source):
+    if _is_path(source):
+        return os.path.basename(str(source))
+    return getattr(source, "name", None) or "<memory>"
+
+
+@contextmanager
+def map_file(file_path):
+    """
+    Memory-map a file read-only for extraction, e.g.
+    `with map_file(path) as buffer: extract_text(buffer, file_name=path)`.
+    Empty files yield an empty bytes object (mmap cannot map zero bytes).
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+# ==================== Extractors ====================
+
+def _format_pdf_table(table):
+    """Render a pdfplumber table as a tab-separated TABLE block"""
+    rows_text = []
+    for row in table:
+        if row is None:
+            continue
+        cells = [
+            deduplicate_repeated_chars((cell or "").strip())
+            for cell in row
+        ]
+        rows_text.append("\t".join(cells))
+
+    if not rows_text:
+        return None
+    return (
+        "\n----- TABLE -----\n"
+        + "\n".join(rows_text)
+        + "\n----- END TABLE -----\n"
+    )
+
+
+def _extract_native_pdf_page(page):
+    """Extract text and tables from a PDF page that has a text layer"""
+    page_parts = []
+    text = page.extract_text()
+
+    if text:
+        cleaned_text = clean_pdf_text(text)
+        if cleaned_text:
+            page_parts.append(cleaned_text)
+
+    # Extract tables
+    for table in page.extract_tables():
+        if not table:
+            continue
+        table_block = _format_pdf_table(table)
+        if table_block:
+            page_parts.append(table_block)
+
+    return "\n".join(page_parts)
+
+
+def _page_needs_ocr(page):
+    """A page needs OCR when it has (almost) no text layer but does contain images"""
+    return len(page.chars) < PDF_MIN_TEXT_CHARS and bool(page.images)
+
+
+def _rasterize_pdf_page(page, dpi=PDF_OCR_DPI):
+    """Render a PDF page to a grayscale PIL image for OCR"""
+    return page.to_image(resolution=dpi).original.convert("L")
+
+
+def extract_pdf_with_tables(source, stats=None, on_page=None):
     """
     Extract text from PDF files with table extraction using pdfplumber.
     This provides better table handling than PyPDF2.
+
+    Pages without a text layer (scanned pages) are rasterized at PDF_OCR_DPI
+    and OCR'd on the shared OCR engine pool, while pages with a text layer
+    keep the fast pdfplumber path. Page order is preserved.
     
     Args:
-        file_path: Path to the PDF file
+        source: Path, bytes-like buffer or binary file object of the PDF
+        stats: Optional dict, filled with page counts, elapsed time,
+            pages/sec and CPU seconds (including Tesseract subprocesses)
+        on_page: Optional callback(page_number, text) invoked as soon as each
+            page's text is ready (OCR'd pages arrive after native ones)
         
     Returns:
         Extracted text with tables formatted
     """
-    parts = []
+    parts = {}
+    native_pages = 0
+    scanned_pages = 0
+    started = time.perf_counter()
+    cpu_started = os.times()
 
     try:
-        with pdfplumber.open(file_path) as pdf:
+        ocr_service = get_ocr_service()
+        ocr_available = ocr_service.is_available()
+        with _open_source(source) as pdf_input, pdfplumber.open(pdf_input) as pdf:
+            # Bound the number of rasterized pages held in memory at once
+            in_flight = threading.BoundedSemaphore(ocr_service.pool_size * 2)
+            ocr_futures = {}
+
             for page_number, page in enumerate(pdf.pages, start=1):
-                page_parts = []
-                text = page.extract_text()
-                
-                if text:
-                    cleaned_text = clean_pdf_text(text)
-                    if cleaned_text:
-                        page_parts.append(cleaned_text)
-
-                # Extract tables
-                tables = page.extract_tables()
-                for t_index, table in enumerate(tables):
-                    if not table:
-                        continue
-                    rows_text = []
-                    for row in table:
-                        if row is None:
-                            continue
-                        cells = [
-                            deduplicate_repeated_chars((cell or "").strip())
-                            for cell in row
-                        ]
-                        rows_text.append("\t".join(cells))
-
-                    if rows_text:
-                        table_block = (
-                            "\n----- TABLE -----\n"
-                            + "\n".join(rows_text)
-                            + "\n----- END TABLE -----\n"
-                        )
-                        page_parts.append(table_block)
-
-                if page_parts:
-                    parts.append("\n".join(page_parts))
-
-        return "\n".join(parts)
+                if _page_needs_ocr(page):
+                    scanned_pages += 1
+                    if ocr_available:
+                        image = _rasterize_pdf_page(page)
+                        in_flight.acquire()
+                        future = ocr_service.submit(image)
+                        future.add_done_callback(lambda _: in_flight.release())
+                        ocr_futures[page_number] = future
+                else:
+                    native_pages += 1
+                    page_text = _extract_native_pdf_page(page)
+                    if page_text:
+                        parts[page_number] = page_text
+                        if on_page:
+                            on_page(page_number, page_text)
+                page.close()
+
+            for page_number, future in ocr_futures.items():
+                try:
+                    page_text = clean_pdf_text(future.result())
+                except Exception as e:
+                    print(f"[WARNING] OCR failed on PDF page {page_number}: {e}")
+                    continue
+                if page_text:
+                    parts[page_number] = page_text
+                    if on_page:
+                        on_page(page_number, page_text)
+
+        if scanned_pages and not ocr_available:
+            print(f"[WARNING] {scanned_pages} scanned page(s) in {_source_name(source)} "
+                  f"skipped - Tesseract OCR not available")
+
+        elapsed = time.perf_counter() - started
+        cpu_finished = os.times()
+        cpu_seconds = sum(cpu_finished[:4]) - sum(cpu_started[:4])
+        total_pages = native_pages + scanned_pages
+        if scanned_pages:
+            print(f"[PDF] {_source_name(source)}: {total_pages} pages "
+                  f"({native_pages} native, {scanned_pages} scanned) in {elapsed:.2f}s, "
+                  f"{total_pages / elapsed if elapsed else 0:.1f} pages/s, CPU {cpu_seconds:.2f}s")
+        if stats is not None:
+            stats.update({
+                "pages": total_pages,
+                "native_pages": native_pages,
+                "scanned_pages": scanned_pages,
+                "elapsed_s": elapsed,
+                "pages_per_s": total_pages / elapsed if elapsed else 0.0,
+                "cpu_s": cpu_seconds,
+            })
+
+        return "\n".join(parts[n] for n in sorted(parts))
+    except MemoryError:
+        raise
     except Exception as e:
         return f"Error extracting PDF: {str(e)}"
 
 
-def extract_docx_with_tables(file_path):
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+
+def _docx_run_text(run):
+    """Text of a w:r element, translated the same way as python-docx"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _W + "t":
+            parts.append(child.text or "")
+        elif tag in (_W + "tab", _W + "ptab"):
+            parts.append("\t")
+        elif tag == _W + "br":
+            # Only line breaks produce text; page and column breaks do not
+            if child.get(_W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _W + "cr":
+            parts.append("\n")
+        elif tag == _W + "noBreakHyphen":
+            parts.append("-")
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph):
+    """Text of a w:p element (its runs and hyperlinks)"""
+    parts = []
+    for child in paragraph:
+        if child.tag == _W + "r":
+            parts.append(_docx_run_text(child))
+        elif child.tag == _W + "hyperlink":
+            parts.extend(_docx_run_text(run) for run in child if run.tag == _W + "r")
+    return "".join(parts)
+
+
+def _docx_int_property(parent, path, default):
+    if parent is None:
+        return default
+    element = parent.find(path)
+    if element is None:
+        return default
+    return int(element.get(_W + "val", default))
+
+
+def _docx_table_rows(table):
+    """
+    Yield the cell texts of each row of a w:tbl element. Like python-docx,
+    horizontally merged cells repeat once per spanned grid column and
+    vertically merged continuation cells repeat the cell above.
+    """
+    cells_above = {}  # grid offset -> (text, grid span) of the previous row
+    for row in table.iterfind(_W + "tr"):
+        row_cells = []
+        cells_here = {}
+        offset = _docx_int_property(row.find(_W + "trPr"), _W + "gridBefore", 0)
+
+        for cell in row.iterfind(_W + "tc"):
+            cell_properties = cell.find(_W + "tcPr")
+            span = _docx_int_property(cell_properties, _W + "gridSpan", 1)
+            v_merge = cell_properties.find(_W + "vMerge") if cell_properties is not None else None
+
+            if v_merge is not None and v_merge.get(_W + "val", "continue") == "continue" \
+                    and offset in cells_above:
+                text, repeat = cells_above[offset]
+            else:
+                text = "\n".join(
+                    _docx_paragraph_text(p) for p in cell.iterfind(_W + "p")
+                )
+                repeat = span
+            row_cells.extend([text] * repeat)
+            cells_here[offset] = (text, repeat)
+            offset += span
+
+        cells_above = cells_here
+        yield row_cells
+
+
+def _docx_document_part(archive):
+    """Find the main document part name from the package relationships"""
+    try:
+        relationships = etree.fromstring(archive.read("_rels/.rels"))
+        for relationship in relationships:
+            if relationship.get("Type") == _OFFICE_DOCUMENT_REL:
+                return relationship.get("Target").lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+
+def _extract_docx_streaming(source):
+    """
+    Extract DOCX text by iterparsing word/document.xml straight from the zip,
+    emitting paragraphs and tables in document order. Each top-level body
+    element is processed and then discarded, so memory stays flat regardless
+    of document size.
+    """
+    parts = []
+    with _open_source(source) as docx_input, zipfile.ZipFile(docx_input) as archive:
+        with archive.open(_docx_document_part(archive)) as document_xml:
+            depth = 0
+            for event, element in etree.iterparse(document_xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    continue
+                depth -= 1
+                # depth 2 = direct children of w:body (w:document > w:body > child)
+                if depth != 2:
+                    continue
+
+                if element.tag == _W + "p":
+                    paragraph = _docx_paragraph_text(element).strip()
+                    if paragraph:
+                        parts.append(paragraph)
+                elif element.tag == _W + "tbl":
+                    rows_text = [
+                        "\t".join(cell.strip() for cell in row_cells)
+                        for row_cells in _docx_table_rows(element)
+                    ]
+                    table_block = (
+                        "\n----- TABLE -----\n"
+                        + "\n".join(rows_text)
+                        + "\n----- END TABLE -----\n"
+                    )
+                    parts.append(table_block)
+
+                # Free the processed subtree and already-handled siblings
+                element.clear()
+                parent = element.getparent()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    return "\n".join(parts)
+
+
+def _extract_docx_with_python_docx(source):
+    """Extract DOCX text by loading the whole document with python-docx"""
+    with _open_source(source) as docx_input:
+        doc = DocxDocument(docx_input)
+    parts = []
+    table_index = 0
+    tables = doc.tables
+
+    for element in doc.element.body:
+        if element.tag.endswith("p"):
+            paragraph = element.text.strip()
+            if paragraph:
+                parts.append(paragraph)
+        elif element.tag.endswith("tbl"):
+            if table_index >= len(tables):
+                continue
+            table = tables[table_index]
+            table_index += 1
+
+            rows_text = []
+            for row in table.rows:
+                row_cells = [cell.text.strip() for cell in row.cells]
+                rows_text.append("\t".join(row_cells))
+
+            table_block = (
+                "\n----- TABLE -----\n"
+                + "\n".join(rows_text)
+                + "\n----- END TABLE -----\n"
+            )
+            parts.append(table_block)
+
+    return "\n".join(parts)
+
+
+def extract_docx_with_tables(source):
     """
     Extract text from DOCX files with table extraction.
     Preserves document structure including tables.
+
+    Uses the streaming XML extractor; falls back to python-docx if the
+    document cannot be parsed that way.
     
     Args:
-        file_path: Path to the DOCX file
+        source: Path, bytes-like buffer or binary file object of the DOCX
         
     Returns:
         Extracted text with tables formatted
     """
     try:
-        doc = DocxDocument(file_path)
-        parts = []
-        table_index = 0
-        tables = doc.tables
-
-        for element in doc.element.body:
-            if element.tag.endswith("p"):
-                paragraph = element.text.strip()
-                if paragraph:
-                    parts.append(paragraph)
-            elif element.tag.endswith("tbl"):
-                if table_index >= len(tables):
-                    continue
-                table = tables[table_index]
-                table_index += 1
-
-                rows_text = []
-                for row in table.rows:
-                    row_cells = [cell.text.strip() for cell in row.cells]
-                    rows_text.append("\t".join(row_cells))
-
-                table_block = (
-                    "\n----- TABLE -----\n"
-                    + "\n".join(rows_text)
-                    + "\n----- END TABLE -----\n"
-                )
-                parts.append(table_block)
-
-        return "\n".join(parts)
+        return _extract_docx_streaming(source)
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"[WARNING] Streaming DOCX extraction failed ({e}), falling back to python-docx")
+    try:
+        return _extract_docx_with_python_docx(source)
+    except MemoryError:
+        raise
     except Exception as e:
         return f"Error extracting DOCX: {str(e)}"
 
 
-def extract_txt_from_file(file_path):
+def extract_txt_from_file(source):
     """Extract text from plain text files"""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
+        if _is_path(source):
+            with open(source, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read()
+        if _is_buffer(source):
+            # Decodes straight from the buffer, no intermediate bytes copy
+            return str(source, 'utf-8', errors='ignore')
+        source.seek(0)
+        content = source.read()
+        if isinstance(content, bytes):
+            return content.decode('utf-8', errors='ignore')
+        return str(content)
+    except MemoryError:
+        raise
     except Exception as e:
         return f"Error extracting TXT: {str(e)}"
 
 
-def extract_pptx_from_file(file_path):
+def extract_pptx_from_file(source):
     """Extract text from PowerPoint files"""
     try:
-        prs = Presentation(file_path)
+        with _open_source(source) as pptx_input:
+            prs = Presentation(pptx_input)
         text = ""
         for i, slide in enumerate(prs.slides, 1):
             text += f"\n[Slide {i}]\n"
@@ -281,35 +799,141 @@ def extract_pptx_from_file(file_path):
                 if hasattr(shape, "text"):
                     text += shape.text + "\n"
         return text.strip() if text.strip() else "No text content found in PPTX"
+    except MemoryError:
+        raise
     except Exception as e:
         return f"Error extracting PPTX: {str(e)}"
 
 
-def extract_xlsx_from_file(file_path):
-    """Extract text from Excel files"""
+def extract_xlsx_from_file(source):
+    """
+    Extract text from Excel files.
+
+    Rows are streamed sheet by sheet and each sheet is capped at
+    XLSX_TEXT_MAX_ROWS rows, so huge workbooks are never fully loaded just to
+    build RAG text (the Excel agent loads full sheets separately).
+    """
     try:
-        df = pd.read_excel(file_path, sheet_name=None)
         text = ""
-        for sheet_name, sheet_data in df.items():
-            text += f"\n[Sheet: {sheet_name}]\n"
-            text += sheet_data.to_string(index=False) + "\n"
+        with _open_source(source) as xlsx_input:
+            for sheet_name, columns, rows, truncated in iter_sheet_rows(xlsx_input):
+                text += f"\n[Sheet: {sheet_name}]\n"
+                sheet_data = pd.DataFrame(list(rows), columns=columns)
+                text += sheet_data.to_string(index=False) + "\n"
+                if truncated:
+                    text += f"[Sheet truncated after {len(sheet_data)} rows]\n"
         return text.strip() if text.strip() else "No text content found in XLSX"
+    except MemoryError:
+        raise
     except Exception as e:
         return f"Error extracting XLSX: {str(e)}"
 
 
-def extract_image_with_ocr(file_path):
+def extract_image_with_ocr(source):
     """Extract text from images using OCR (Tesseract)"""
-    if not TESSERACT_AVAILABLE:
+    if not get_ocr_service().is_available():
         return None, "Tesseract OCR not available"
     try:
-        img = Image.open(file_path)
-        text = pytesseract.image_to_string(img, lang='eng')
+        with _open_source(source) as image_input, Image.open(image_input) as image:
+            text, _ = ocr_image_cached(image)
         return text.strip() if text.strip() else None, None
+    except MemoryError:
+        raise
     except Exception as e:
         return None, f"Error performing OCR: {str(e)}"
 
 
+def _extract_image_entry(source):
+    text, error = extract_image_with_ocr(source)
+    if error:
+        raise ValueError(error)
+    return text
+
+
+# ==================== Extractor Registry ====================
+
+# kind -> (extractor, file_type reported to callers)
+EXTRACTORS = {
+    "pdf": (extract_pdf_with_tables, "pdf"),
+    "docx": (extract_docx_with_tables, "docx"),
+    "txt": (extract_txt_from_file, "txt"),
+    "pptx": (extract_pptx_from_file, "pptx"),
+    "excel": (extract_xlsx_from_file, "excel"),
+    "image": (_extract_image_entry, "ocr_image"),
+}
+
+SUFFIX_KINDS = {
+    ".pdf": "pdf",
+    ".docx": "docx",
+    ".txt": "txt",
+    ".pptx": "pptx",
+    ".xlsx": "excel",
+    ".xls": "excel",
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".png": "image",
+    ".gif": "image",
+    ".webp": "image",
+    ".bmp": "image",
+    ".tiff": "image",
+}
+
+MIME_KINDS = {
+    'application/pdf': "pdf",
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': "docx",
+    'text/plain': "txt",
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': "pptx",
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': "excel",
+    'application/vnd.ms-excel': "excel",
+    'image/jpeg': "image",
+    'image/png': "image",
+    'image/jpg': "image",
+}
+
+
+def detect_kind(file_name="", mime_type=None):
+    """Return the extractor kind for a file name / MIME type, or None if unsupported"""
+    if mime_type and mime_type in MIME_KINDS:
+        return MIME_KINDS[mime_type]
+    return SUFFIX_KINDS.get(Path(file_name or "").suffix.lower())
+
+
+def extract_text(source, file_name="", mime_type=None, on_page=None):
+    """
+    Extract text from a path, bytes-like buffer, mmap or binary file object.
+
+    The extractor is picked by MIME type when given, else by file extension
+    (file_name defaults to the path for path sources).
+    
+    Args:
+        source: File path, bytes/bytearray/memoryview/mmap, or binary file object
+        file_name: File name used for extension-based dispatch
+        mime_type: Optional MIME type (takes precedence over the extension)
+        on_page: Optional callback(page_number, text) for formats extracted
+            page by page (PDF), used to stream partial results
+        
+    Returns:
+        Tuple of (extracted_text, file_type, error_message)
+    """
+    if not file_name and _is_path(source):
+        file_name = os.path.basename(str(source))
+    kind = detect_kind(file_name, mime_type)
+    if kind is None:
+        return None, None, f"Unsupported file type: {mime_type or Path(file_name).suffix.lower()}"
+
+    extractor, file_type = EXTRACTORS[kind]
+    try:
+        if kind == "pdf" and on_page:
+            return extractor(source, on_page=on_page), file_type, None
+        return extractor(source), file_type, None
+    except MemoryError:
+        raise
+    except Exception as e:
+        if kind == "image":
+            return None, "image", str(e)
+        return None, None, f"Error extracting from {file_name or _source_name(source)}: {str(e)}"
+
+
 def extract_text_from_file(file_path):
     """
     Extract text from a file based on its extension.
@@ -321,41 +945,21 @@ def extract_text_from_file(file_path):
     Returns:
         Tuple of (extracted_text, file_type, error_message)
     """
-    try:
-        file_name = os.path.basename(file_path)
-        suffix = Path(file_name).suffix.lower()
-        
-        if suffix == ".pdf":
-            content = extract_pdf_with_tables(file_path)
-            return content, "pdf", None
-            
-        elif suffix == ".docx":
-            content = extract_docx_with_tables(file_path)
-            return content, "docx", None
-            
-        elif suffix == ".txt":
-            content = extract_txt_from_file(file_path)
-            return content, "txt", None
-            
-        elif suffix == ".pptx":
-            content = extract_pptx_from_file(file_path)
-            return content, "pptx", None
-            
-        elif suffix in (".xlsx", ".xls"):
-            content = extract_xlsx_from_file(file_path)
-            return content, "excel", None
-            
-        elif suffix in (".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp", ".tiff"):
-            text, error = extract_image_with_ocr(file_path)
-            if error:
-                return None, "image", error
-            return text, "ocr_image", None
-            
-        else:
-            return None, None, f"Unsupported file type: {suffix}"
-            
-    except Exception as e:
-        return None, None, f"Error extracting from {file_path}: {str(e)}"
+    return extract_text(file_path)
+
+
+def extract_text_by_mimetype(file_stream, mime_type, file_name=""):
+    """
+    Extract text from an in-memory file based on its MIME type.
+    Returns the same text as extract_text_from_file, or a message string when
+    nothing could be extracted.
+    """
+    content, _, error = extract_text(file_stream, file_name=file_name, mime_type=mime_type)
+    if error:
+        return error
+    if not content or not content.strip():
+        return f"No text content found in {file_name or mime_type}"
+    return content
 
 
 # ==================== Utility Functions ====================
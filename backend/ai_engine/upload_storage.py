@@ -0,0 +1,67 @@
+"""
+Upload Storage Module
+
+Streams uploaded files to disk in fixed-size chunks instead of reading
+them into memory, hashing the content on the fly. Per-file and per-request
+size limits are enforced while streaming, so an oversized upload is cut
+off after at most one chunk past the limit.
+
+Limits are configurable with UPLOAD_MAX_FILE_MB and UPLOAD_MAX_REQUEST_MB;
+UPLOAD_CHUNK_SIZE sets the read size in bytes.
+"""
+
+import os
+import hashlib
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_MB", "500")) * 1024 * 1024
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "2048")) * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the per-file or per-request size limit"""
+
+
+async def save_upload_stream(upload, dest_path, max_bytes=UPLOAD_MAX_FILE_BYTES):
+    """
+    Stream an UploadFile to dest_path chunk by chunk.
+
+    The file is written to a temporary ".part" file and only moved into
+    place once complete, so a rejected or failed upload never leaves a
+    truncated file behind.
+
+    Args:
+        upload: FastAPI/Starlette UploadFile
+        dest_path: Final path of the saved file
+        max_bytes: Maximum number of bytes accepted for this file
+
+    Returns:
+        Tuple of (size_in_bytes, sha256_hex)
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    digest = hashlib.sha256()
+    size = 0
+    part_path = dest_path + ".part"
+
+    try:
+        with open(part_path, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"{upload.filename} exceeds the upload limit of {max_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(part_path, dest_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    return size, digest.hexdigest()
@@ -31,12 +31,16 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 from PIL import Image
 
-# Check if Tesseract is available for OCR
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
+# OCR runs through the shared engine pool in ocr_service
+from ocr_service import get_ocr_service, get_ocr_cache, perceptual_hash, OCR_AVAILABLE
+from text_extraction import (
+    draft_for_ocr,
+    preprocess_image_for_ocr,
+    estimate_text_likelihood,
+    OCR_TEXT_LIKELIHOOD_THRESHOLD,
+)
+
+TESSERACT_AVAILABLE = OCR_AVAILABLE
 
 
 class WhatsAppScraper:
@@ -48,6 +52,7 @@ class WhatsAppScraper:
         connected: Boolean indicating if connected to WhatsApp Web
         download_dir: Directory for downloading PDFs
         images_dir: Directory for downloading images
+        ocr_stats: Counters from the last download_images_and_ocr() run
     """
     
     def __init__(self, download_dir: str, images_dir: str):
@@ -62,6 +67,7 @@ class WhatsAppScraper:
         self.connected = False
         self.download_dir = download_dir
         self.images_dir = images_dir
+        self.ocr_stats = self._new_ocr_stats()
         
         # Ensure directories exist
         os.makedirs(self.download_dir, exist_ok=True)
@@ -1043,15 +1049,39 @@ class WhatsAppScraper:
             print(f"All download methods failed: {e}")
             return False
 
-    def download_images_and_ocr(self):
+    @staticmethod
+    def _new_ocr_stats():
+        return {
+            'images_saved': 0,
+            'ocr_runs': 0,
+            'skipped_low_text_likelihood': 0,
+            'duplicates_skipped': 0,
+            'cache_hits': 0,
+        }
+
+    def download_images_and_ocr(self, seen_texts=None):
         """
         Download images from WhatsApp group and perform OCR.
+        Regular images that are unlikely to contain text (photos of people,
+        products, ...) skip OCR; counters are kept in self.ocr_stats.
+
+        Images are identified by perceptual hash: copies already seen in this
+        scrape are skipped (their text was returned with the first copy), and
+        OCR results are reused from the on-disk cache.
+
+        Args:
+            seen_texts: Optional dict of perceptual hash -> OCR text shared
+                across groups of one scrape; updated in place
+        
         Returns list of dictionaries with image paths and extracted text.
         """
         if not TESSERACT_AVAILABLE:
             print("Warning: Tesseract OCR not available. Images will be downloaded but OCR will be skipped.")
         
         extracted_texts = []
+        self.ocr_stats = self._new_ocr_stats()
+        if seen_texts is None:
+            seen_texts = {}
         
         try:
             print("\n==============================")
@@ -1497,11 +1527,42 @@ class WhatsAppScraper:
                     
                     # Extract text using OCR if image was saved
                     if image_path and os.path.exists(image_path):
+                        self.ocr_stats['images_saved'] += 1
                         try:
-                            print("  Running OCR...")
                             if TESSERACT_AVAILABLE:
                                 img = Image.open(image_path)
-                                text = pytesseract.image_to_string(img, lang='eng')
+                                ocr_service = get_ocr_service()
+                                ocr_cache = get_ocr_cache()
+                                
+                                scale = draft_for_ocr(img)
+                                image_hash = perceptual_hash(img)
+                                text = seen_texts.get(image_hash)
+                                if text is not None:
+                                    # Its text was already returned with the first copy
+                                    self.ocr_stats['duplicates_skipped'] += 1
+                                    print("  ⏭ Duplicate image, text already extracted")
+                                    continue
+                                else:
+                                    text = ocr_cache.get(image_hash, ocr_service.lang)
+                                    if text is not None:
+                                        self.ocr_stats['cache_hits'] += 1
+                                        print("  ✓ OCR result from cache")
+                                    else:
+                                        # Documents are sent on purpose; only regular photos are prefiltered.
+                                        # Skips are not cached: the same picture sent as a document, or
+                                        # another threshold, must still get OCR
+                                        if item['type'] == 'image':
+                                            score = estimate_text_likelihood(img)
+                                            if score < OCR_TEXT_LIKELIHOOD_THRESHOLD:
+                                                self.ocr_stats['skipped_low_text_likelihood'] += 1
+                                                print(f"  ⏭ OCR skipped (text likelihood {score:.2f})")
+                                                continue
+                                        
+                                        print("  Running OCR...")
+                                        self.ocr_stats['ocr_runs'] += 1
+                                        text = ocr_service.image_to_string(preprocess_image_for_ocr(img, scale=scale))
+                                        ocr_cache.put(image_hash, text, ocr_service.lang)
+                                    seen_texts[image_hash] = text
                                 
                                 if text.strip():
                                     preview = text.strip()[:150].replace('\n', ' ')
@@ -1538,6 +1599,10 @@ class WhatsAppScraper:
             print(f"Items with extracted text: {len(extracted_texts)}")
             print(f"  - From Documents: {sum(1 for x in extracted_texts if x['type']=='document')}")
             print(f"  - From Images: {sum(1 for x in extracted_texts if x['type']=='image')}")
+            print(f"OCR runs: {self.ocr_stats['ocr_runs']}, "
+                  f"cache hits: {self.ocr_stats['cache_hits']}, "
+                  f"duplicates skipped: {self.ocr_stats['duplicates_skipped']}, "
+                  f"skipped (no text likely): {self.ocr_stats['skipped_low_text_likelihood']}")
             print(f"{'='*60}")
             
             return extracted_texts
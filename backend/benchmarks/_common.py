@@ -0,0 +1,33 @@
+"""
+Shared helpers for the backend benchmark scripts.
+
+Benchmarks import the ai_engine modules the same way run.py does, by putting
+the ai_engine directory on sys.path.
+"""
+import os
+import sys
+import json
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_ENGINE_DIR = os.path.join(BACKEND_DIR, "ai_engine")
+
+if AI_ENGINE_DIR not in sys.path:
+    sys.path.insert(0, AI_ENGINE_DIR)
+
+# OCR results, converted frames and Excel plans go to throwaway directories unless a
+# benchmark sets them, so runs neither read nor leave behind the backend's
+# persistent data
+os.environ.setdefault("OCR_CACHE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench_ocr_cache_"), "ocr_cache.sqlite3"))
+os.environ.setdefault("FRAME_STORE_DIR", tempfile.mkdtemp(prefix="bench_excel_frames_"))
+os.environ.setdefault("EXCEL_PLAN_CACHE_PATH",
+                      os.path.join(tempfile.mkdtemp(prefix="bench_plan_cache_"), "excel_plan_cache.sqlite3"))
+
+
+def write_report(report, output_path=None):
+    """Print a benchmark report as JSON and optionally save it to a file"""
+    text = json.dumps(report, indent=2, sort_keys=True, default=str)
+    print(text)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(text + "\n")
@@ -0,0 +1,106 @@
+"""
+Benchmark DOCX extraction: streaming XML parser vs. python-docx.
+
+Each method runs in a fresh interpreter so peak memory (max RSS) is measured
+independently. Outputs of both methods are compared for equality.
+
+Usage:
+    python benchmarks/bench_docx.py report.docx [more.docx ...] [--repeat 3]
+    python benchmarks/bench_docx.py --generate 20000 --tables 200   # synthetic large DOCX
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import resource
+import subprocess
+import tempfile
+
+from _common import write_report
+
+METHODS = {
+    "streaming": "_extract_docx_streaming",
+    "python_docx": "_extract_docx_with_python_docx",
+}
+
+
+def run_child(method, docx_path):
+    """Extract in this process and print time, peak RSS and output digest as JSON"""
+    import text_extraction
+
+    extractor = getattr(text_extraction, METHODS[method])
+    rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    text = extractor(docx_path)
+    elapsed = time.perf_counter() - started
+    rss_after_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": rss_after_kb / 1024,
+        "peak_rss_growth_mb": (rss_after_kb - rss_before_kb) / 1024,
+        "chars": len(text),
+        "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    }))
+
+
+def generate_docx(path, paragraphs, tables):
+    """Write a synthetic DOCX with the given number of paragraphs and 10x6 tables"""
+    from docx import Document
+
+    doc = Document()
+    table_every = max(1, paragraphs // max(1, tables)) if tables else None
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Paragraph {i}: quarterly revenue grew across all regions, driven by new accounts.")
+        if table_every and i % table_every == 0:
+            table = doc.add_table(rows=10, cols=6)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"R{r}C{c} {i}"
+    doc.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("docx", nargs="*", help="DOCX files to extract")
+    parser.add_argument("--generate", type=int, metavar="PARAGRAPHS", help="Generate a synthetic DOCX")
+    parser.add_argument("--tables", type=int, default=100, help="Tables in the generated DOCX")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per method (fastest is reported)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", choices=METHODS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.docx[0])
+        return
+
+    paths = list(args.docx)
+    if args.generate:
+        path = os.path.join(tempfile.mkdtemp(), f"synthetic_{args.generate}.docx")
+        generate_docx(path, args.generate, args.tables)
+        paths.append(path)
+    if not paths:
+        parser.error("pass DOCX files or --generate")
+
+    documents = []
+    for path in paths:
+        entry = {"file": os.path.basename(path), "size_mb": os.path.getsize(path) / (1024 * 1024)}
+        for method in METHODS:
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", method, path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            entry[method] = min(runs, key=lambda run: run["seconds"])
+        entry["identical_output"] = entry["streaming"]["sha256"] == entry["python_docx"]["sha256"]
+        entry["speedup"] = entry["python_docx"]["seconds"] / entry["streaming"]["seconds"]
+        documents.append(entry)
+
+    write_report({"documents": documents}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark concurrent Excel workbook uploads.
+
+Uploads a set of generated workbooks at the same time (one thread per
+upload, like concurrent ingestion jobs) and reports total wall time and
+per-upload latency for three loading strategies:
+
+- global_lock:  every load holds one module-wide lock while parsing
+                in-thread (the previous add_excel_file)
+- file_locks:   per-file locks, parsing in the uploading thread
+                (EXCEL_PARSE_WORKERS=0)
+- process_pool: per-file locks, parsing in the Excel parse pool
+
+All three parse, optimize dtypes and convert into a frame store the way
+ExcelAgentSystem.add_excel_file does (LangChain is not needed: agents are
+built lazily on the first query). Each strategy runs in a fresh
+interpreter. Parallel parsing needs several cores; on one core the pool
+can only overlap waiting, not parsing.
+
+Usage:
+    python benchmarks/bench_excel_concurrent.py --workbooks 8 --rows 20000
+    python benchmarks/bench_excel_concurrent.py --workers 4 --output concurrent.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import threading
+import subprocess
+
+from _common import write_report
+from bench_xlsx import generate_xlsx
+
+MODES = ["global_lock", "file_locks", "process_pool"]
+
+
+def run_child(mode, paths, workers):
+    """Upload every workbook concurrently with one strategy; print timings as JSON"""
+    os.environ["EXCEL_PARSE_WORKERS"] = "0" if mode != "process_pool" else str(workers)
+    from excel_frame_store import ExcelFrameStore, workbook_hash
+    from excel_parse_pool import parse_in_pool
+
+    store = ExcelFrameStore(tempfile.mkdtemp(prefix="bench_concurrent_"))
+    global_lock = threading.Lock()
+    file_locks = {path: threading.Lock() for path in paths}
+    latencies = {}
+
+    def load(path):
+        started = time.perf_counter()
+        lock = global_lock if mode == "global_lock" else file_locks[path]
+        with lock:
+            content_hash = workbook_hash(path)
+            parsed = parse_in_pool(os.path.basename(path), path, content_hash, store.store_dir)
+            if parsed["stored"]:
+                store.adopt(os.path.basename(path), content_hash)
+            else:
+                store.put(os.path.basename(path), parsed["df"], content_hash)
+        latencies[path] = time.perf_counter() - started
+
+    if mode == "process_pool":
+        # Start every worker before timing, as a running backend would have
+        warmups = [
+            threading.Thread(target=parse_in_pool, args=("warmup.xlsx", paths[0], f"warmup{i}", store.store_dir))
+            for i in range(workers)
+        ]
+        for thread in warmups:
+            thread.start()
+        for thread in warmups:
+            thread.join()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=load, args=(path,)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    values = sorted(latencies.values())
+    print(json.dumps({
+        "wall_s": wall,
+        "loaded": len(store),
+        "latency_p50_s": statistics.median(values),
+        "latency_max_s": values[-1],
+        "first_done_s": values[0],
+    }))
+    shutil.rmtree(store.store_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workbooks", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows per generated workbook")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Parse pool processes for the process_pool strategy")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.paths, args.workers)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="bench_uploads_")
+    try:
+        paths = []
+        for i in range(args.workbooks):
+            path = os.path.join(work_dir, f"upload_{i}.xlsx")
+            generate_xlsx(path, args.rows + i, 1)
+            paths.append(path)
+        print(f"[BENCH] Generated {len(paths)} workbooks of ~{args.rows} rows", flush=True)
+
+        modes = {}
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode,
+                 "--workers", str(args.workers), *paths],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            modes[mode] = json.loads(output.strip().splitlines()[-1])
+            print(f"[BENCH] {mode:12s} wall {modes[mode]['wall_s']:6.2f} s   "
+                  f"first upload done {modes[mode]['first_done_s']:6.2f} s   "
+                  f"p50 {modes[mode]['latency_p50_s']:6.2f} s", flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    write_report({
+        "meta": {
+            "workbooks": args.workbooks,
+            "rows_per_workbook": args.rows,
+            "workers": args.workers,
+            "cpu_count": os.cpu_count(),
+        },
+        "modes": modes,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Benchmark Excel question answering: deterministic fast path vs pandas agent.
+
+Runs a set of typical aggregate/filter/group-by/top-N questions against a
+synthetic DataFrame, once through excel_query_planner (pure pandas) and
+once through the pandas dataframe agent driven by a local stub LLM. The
+stub replies with a scripted ReAct exchange (one python_repl_ast action,
+then the final answer) after a fixed delay that stands in for the network
+round trip to the hosted model, so the agent numbers are a lower bound:
+real runs often take more steps.
+
+Every fast-path answer is checked against the output of the agent's code:
+the numbers the agent prints must all appear in the fast-path answer
+(results_match in the report). Questions the planner leaves to the agent
+report fast_path_op null.
+
+When langchain-experimental is not installed, the agent loop is emulated
+(same LLM calls and the same code executed against df) and the report says
+so in meta.agent_impl.
+
+Usage:
+    python benchmarks/bench_excel_query.py --rows 200000 --llm-latency 0.8
+    python benchmarks/bench_excel_query.py --llm-latency 0 --output query.json
+"""
+import io
+import re
+import time
+import argparse
+import importlib.util
+import statistics
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from _common import write_report
+from excel_query_planner import answer_query
+
+# (question, code the stub LLM "writes" for the agent)
+QUERIES = [
+    ("How many rows are there?", "print(len(df))"),
+    ("How many rows where region is North?", "print((df['region'] == 'North').sum())"),
+    ("What is the average price?", "print(df['price'].mean())"),
+    ("Total quantity by region", "print(df.groupby('region')['quantity'].sum().sort_values(ascending=False))"),
+    ("Average price where quantity is greater than 25",
+     "print(df[df['quantity'] > 25]['price'].mean())"),
+    ("How many unique products?", "print(df['product'].nunique())"),
+    ("Top 5 products by total quantity",
+     "print(df.groupby('product')['quantity'].sum().sort_values(ascending=False).head(5))"),
+    ("Top 3 regions by average price",
+     "print(df.groupby('region')['price'].mean().sort_values(ascending=False).head(3))"),
+    ("Top 5 products by price", "print(df.groupby('product')['price'].max().sort_values(ascending=False).head(5))"),
+    ("Maximum price where shipped is true", "print(df[df['shipped']]['price'].max())"),
+    ("How many rows where coupon is not null?", "print(df['coupon'].notna().sum())"),
+    ("How many rows where coupon is empty?", "print((df['coupon'].isna() | (df['coupon'] == '')).sum())"),
+]
+
+PRODUCTS = [f"product_{i}" for i in range(200)]
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "product": rng.choice(PRODUCTS, rows),
+        "quantity": rng.integers(1, 50, rows),
+        "price": rng.uniform(1, 500, rows).round(2),
+        "order_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), "D"),
+        "shipped": rng.random(rows) < 0.5,
+        # Mostly missing, some empty strings
+        "coupon": pd.Series(rng.choice(["SAVE10", "FREESHIP", "", None], rows, p=[0.2, 0.1, 0.1, 0.6]),
+                            dtype="str"),
+    })
+
+
+def _stub_responses(code):
+    return [
+        f"Thought: I need to compute this from df.\nAction: python_repl_ast\nAction Input: {code}",
+        "Thought: I now know the final answer\nFinal Answer: (see the tool output above)",
+    ]
+
+
+def _make_langchain_agent(df, responses, latency):
+    from langchain_core.language_models.fake import FakeListLLM
+    from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+
+    class SlowFakeLLM(FakeListLLM):
+        def _call(self, *args, **kwargs):
+            time.sleep(latency)
+            return super()._call(*args, **kwargs)
+
+    return create_pandas_dataframe_agent(
+        SlowFakeLLM(responses=responses), df, allow_dangerous_code=True,
+        handle_parsing_errors=True, max_iterations=10, verbose=False,
+    )
+
+
+def _run_emulated_agent(df, responses, latency):
+    """ReAct loop without LangChain: one delayed LLM call per response, executing each action"""
+    observation = ""
+    for response in responses:
+        time.sleep(latency)
+        action = re.search(r"Action Input:\s*(.+)", response, re.S)
+        if action is None:
+            return observation
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            exec(action.group(1), {"df": df, "pd": pd, "np": np})
+        observation = output.getvalue()
+    return observation
+
+
+def _agent_impl():
+    if all(importlib.util.find_spec(name) is not None for name in ("langchain_experimental", "langchain_core")):
+        return "langchain"
+    return "emulated"
+
+
+def _numbers(text):
+    # Standalone numbers only: not the 64 of int64 or the 12 of product_12
+    return {round(float(n), 2) for n in re.findall(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])", text)}
+
+
+def _answers_match(answer, code, df):
+    """Whether every number the agent's code prints appears in the fast-path answer"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exec(code, {"df": df, "pd": pd, "np": np})
+    return _numbers(output.getvalue()) <= _numbers(answer)
+
+
+def _time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def run_benchmark(args):
+    df = make_frame(args.rows, args.seed)
+    impl = _agent_impl()
+    results = []
+
+    for question, code in QUERIES:
+        answer, plan = answer_query(question, df)
+        fast_s = _time(lambda: answer_query(question, df), args.repeat)
+
+        def agent_call():
+            responses = _stub_responses(code)
+            if impl == "langchain":
+                _make_langchain_agent(df, responses, args.llm_latency).run(question)
+            else:
+                _run_emulated_agent(df, responses, args.llm_latency)
+
+        agent_s = _time(agent_call, args.agent_repeat)
+        results.append({
+            "question": question,
+            "fast_path_op": plan["op"] if plan else None,
+            "fast_path_ms": fast_s * 1000,
+            "agent_ms": agent_s * 1000,
+            "speedup": agent_s / fast_s if fast_s else None,
+            "results_match": _answers_match(answer, code, df) if plan else None,
+            "answer": answer,
+        })
+        print(f"[BENCH] {question:50s} fast {fast_s * 1000:8.2f} ms   agent {agent_s * 1000:8.1f} ms",
+              flush=True)
+
+    handled = [r for r in results if r["fast_path_op"]]
+    return {
+        "meta": {
+            "rows": args.rows,
+            "llm_latency_s": args.llm_latency,
+            "llm_calls_per_agent_query": 2,
+            "agent_impl": impl,
+            "repeat": args.repeat,
+            "agent_repeat": args.agent_repeat,
+        },
+        "summary": {
+            "queries": len(results),
+            "fast_path_handled": len(handled),
+            "all_results_match": all(r["results_match"] for r in handled),
+            "median_fast_path_ms": statistics.median(r["fast_path_ms"] for r in handled) if handled else None,
+            "median_agent_ms": statistics.median(r["agent_ms"] for r in results),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Rows in the synthetic DataFrame")
+    parser.add_argument("--llm-latency", type=float, default=0.8,
+                        help="Seconds the stub LLM waits per call (simulated round trip)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fast path runs per question (median is reported)")
+    parser.add_argument("--agent-repeat", type=int, default=1, help="Agent runs per question")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    write_report(run_benchmark(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
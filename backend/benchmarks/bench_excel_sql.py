@@ -0,0 +1,170 @@
+"""
+Benchmark aggregation queries: pandas vs DuckDB over the loaded workbooks.
+
+Builds a synthetic orders table (default 1M rows) plus a small products
+table standing in for a second workbook, stores both in ExcelFrameStore
+dtype-optimized, as the backend does, and times each query two ways:
+
+- pandas:  the equivalent pandas code on the DataFrames as built
+- duckdb:  the SQL through ExcelSQLEngine synced from the frame store
+
+Results are compared so a mismatch shows up in the report.
+
+Usage:
+    python benchmarks/bench_excel_sql.py --rows 1000000
+    python benchmarks/bench_excel_sql.py --rows 200000 --repeat 3 --output sql.json
+"""
+import time
+import shutil
+import argparse
+import statistics
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from _common import write_report
+from excel_dtypes import optimize_dtypes
+from excel_frame_store import ExcelFrameStore
+from excel_sql import ExcelSQLEngine
+
+PRODUCTS = 2000
+
+QUERIES = [
+    (
+        "sum_by_region",
+        'SELECT region, SUM(quantity * price) AS revenue FROM orders GROUP BY region ORDER BY revenue DESC',
+        lambda o, p: (o.assign(revenue=o["quantity"] * o["price"])
+                      .groupby("region", observed=True)["revenue"].sum().sort_values(ascending=False)),
+    ),
+    (
+        "filtered_avg",
+        'SELECT AVG(price) FROM orders WHERE quantity > 25 AND shipped',
+        lambda o, p: o.loc[(o["quantity"] > 25) & o["shipped"], "price"].mean(),
+    ),
+    (
+        "count_distinct",
+        'SELECT COUNT(DISTINCT product) FROM orders WHERE region = \'North\'',
+        lambda o, p: o.loc[o["region"] == "North", "product"].nunique(),
+    ),
+    (
+        "monthly_totals",
+        'SELECT date_trunc(\'month\', order_date) AS month, SUM(quantity) AS qty FROM orders GROUP BY 1 ORDER BY 1',
+        lambda o, p: o.groupby(o["order_date"].dt.to_period("M"))["quantity"].sum(),
+    ),
+    (
+        "top10_products",
+        'SELECT product, SUM(quantity) AS qty FROM orders GROUP BY product ORDER BY qty DESC, product LIMIT 10',
+        lambda o, p: o.groupby("product", observed=True)["quantity"].sum().sort_values(ascending=False).head(10),
+    ),
+    (
+        "join_category_revenue",
+        'SELECT p.category, SUM(o.quantity * o.price) AS revenue FROM orders o '
+        'JOIN products p ON o.product = p.product GROUP BY p.category ORDER BY revenue DESC',
+        lambda o, p: (o.merge(p, on="product").assign(revenue=lambda f: f["quantity"] * f["price"])
+                      .groupby("category", observed=True)["revenue"].sum().sort_values(ascending=False)),
+    ),
+]
+
+
+def make_frames(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"product_{i}" for i in range(PRODUCTS)])
+    orders = pd.DataFrame({
+        "order_id": np.arange(rows),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "product": names[rng.integers(0, PRODUCTS, rows)],
+        "quantity": rng.integers(1, 50, rows),
+        "price": rng.uniform(1, 500, rows).round(2),
+        "order_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), "D"),
+        "shipped": rng.random(rows) < 0.5,
+    })
+    products = pd.DataFrame({
+        "product": names,
+        "category": rng.choice([f"category_{i}" for i in range(20)], PRODUCTS),
+    })
+    return orders, products
+
+
+def _scalar(result):
+    """First numeric value of a result, for a cross-check between engines"""
+    if isinstance(result, pd.DataFrame):
+        numeric = result.select_dtypes("number")
+        return float(numeric.iloc[0, -1]) if len(numeric) else None
+    if isinstance(result, pd.Series):
+        return float(result.iloc[0])
+    return float(result)
+
+
+def _time(func, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def run_benchmark(args):
+    orders, products = make_frames(args.rows, args.seed)
+    store_dir = tempfile.mkdtemp(prefix="bench_sql_")
+    try:
+        store = ExcelFrameStore(store_dir)
+        for name, df in (("orders", orders), ("products", products)):
+            optimized, report = optimize_dtypes(df)
+            store.put(f"{name}.xlsx", optimized, name, metadata={"dtype_report": report})
+        fingerprints = {name: store.info(name)["fingerprint"] for name in store}
+
+        engine = ExcelSQLEngine()
+        started = time.perf_counter()
+        engine.sync(store, fingerprints)
+        register_s = time.perf_counter() - started
+
+        results = []
+        for name, sql, pandas_func in QUERIES:
+            pandas_s, expected = _time(lambda: pandas_func(orders, products), args.repeat)
+            duckdb_s, (duckdb_result, _) = _time(lambda: engine.execute(sql), args.repeat)
+            expected, got = _scalar(expected), _scalar(duckdb_result)
+            results.append({
+                "query": name,
+                "pandas_ms": pandas_s * 1000,
+                "duckdb_ms": duckdb_s * 1000,
+                "speedup_vs_pandas": pandas_s / duckdb_s if duckdb_s else None,
+                "results_match": expected is not None and got is not None
+                and abs(expected - got) <= 1e-6 * max(1.0, abs(expected)),
+            })
+            print(f"[BENCH] {name:24s} pandas {pandas_s * 1000:8.1f} ms   duckdb {duckdb_s * 1000:8.1f} ms",
+                  flush=True)
+        engine.close()
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "rows": args.rows,
+            "products": PRODUCTS,
+            "repeat": args.repeat,
+            "register_ms": register_s * 1000,
+        },
+        "summary": {
+            "median_pandas_ms": statistics.median(r["pandas_ms"] for r in results),
+            "median_duckdb_ms": statistics.median(r["duckdb_ms"] for r in results),
+            "all_results_match": all(r["results_match"] for r in results),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Rows in the orders table")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query and engine (median is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    write_report(run_benchmark(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
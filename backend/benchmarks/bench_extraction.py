@@ -0,0 +1,177 @@
+"""
+Benchmark every extractor in text_extraction.py on a synthetic corpus.
+
+Generates a deterministic corpus (see corpus.py), extracts each document in
+a fresh interpreter and reports throughput, peak memory and output size.
+Reports are JSON, so runs on different commits can be diffed or compared.
+
+Usage:
+    python benchmarks/bench_extraction.py --scale 2 --output before.json
+    python benchmarks/bench_extraction.py --scale 2 --output after.json --compare before.json
+    python benchmarks/bench_extraction.py --compare before.json after.json   # compare only
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from _common import BACKEND_DIR, write_report
+from corpus import GENERATORS, generate_corpus
+
+
+def run_child(path):
+    """Extract one document in this process and print measurements as JSON"""
+    from text_extraction import extract_text
+
+    rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    cpu_started = os.times()
+    content, file_type, error = extract_text(path)
+    elapsed = time.perf_counter() - started
+    cpu_finished = os.times()
+    rss_after_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    content = content or ""
+    print(json.dumps({
+        "seconds": elapsed,
+        "cpu_seconds": sum(cpu_finished[:4]) - sum(cpu_started[:4]),
+        "peak_rss_mb": rss_after_kb / 1024,
+        "peak_rss_growth_mb": (rss_after_kb - rss_before_kb) / 1024,
+        "output_chars": len(content),
+        "output_sha256": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "file_type": file_type,
+        "error": error,
+    }))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    from ocr_service import OCR_AVAILABLE
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="extraction_corpus_")
+    documents = generate_corpus(corpus_dir, args.scale, args.kinds, args.seed)
+
+    results = {}
+    for document in documents:
+        runs = []
+        for _ in range(args.repeat):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", document["path"]],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        best = min(runs, key=lambda run: run["seconds"])
+        seconds = best["seconds"] or 1e-9
+        results[document["kind"]] = {
+            **best,
+            "units": document["units"],
+            "size_bytes": document["size_bytes"],
+            "mb_per_s": document["size_bytes"] / (1024 * 1024) / seconds,
+            "units_per_s": document["units"] / seconds,
+        }
+        print(f"[BENCH] {document['kind']:12s} {seconds:8.3f}s {best['peak_rss_mb']:8.1f} MB "
+              f"{best['output_chars']:>9d} chars" + (f"  ({best['error']})" if best["error"] else ""),
+              file=sys.stderr)
+
+    return {
+        "meta": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ocr_available": OCR_AVAILABLE,
+            "scale": args.scale,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_reports(baseline, current, threshold):
+    """
+    Compare two reports kind by kind.
+
+    Returns:
+        Dict with per-kind ratios, whether the output changed, and the kinds
+        that got slower (or used more memory) than threshold allows
+    """
+    comparison = {}
+    regressions = []
+    for kind, now in current["results"].items():
+        before = baseline["results"].get(kind)
+        if before is None:
+            continue
+        time_ratio = now["seconds"] / before["seconds"] if before["seconds"] else None
+        memory_ratio = now["peak_rss_mb"] / before["peak_rss_mb"] if before["peak_rss_mb"] else None
+        comparison[kind] = {
+            "time_ratio": time_ratio,
+            "peak_rss_ratio": memory_ratio,
+            "output_chars_delta": now["output_chars"] - before["output_chars"],
+            "output_changed": now["output_sha256"] != before["output_sha256"],
+        }
+        if (time_ratio and time_ratio > 1 + threshold) or (memory_ratio and memory_ratio > 1 + threshold):
+            regressions.append(kind)
+    return {
+        "baseline_commit": baseline["meta"].get("git_commit"),
+        "current_commit": current["meta"].get("git_commit"),
+        "threshold": threshold,
+        "kinds": comparison,
+        "regressions": regressions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="Corpus size multiplier")
+    parser.add_argument("--kinds", nargs="+", choices=GENERATORS, help="Document kinds (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document (fastest is reported)")
+    parser.add_argument("--corpus-dir", help="Keep the generated corpus in this directory")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT",
+                        help="Baseline report, optionally followed by a second report to compare without running")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown / memory growth counted as a regression")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline report and at most one current report")
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1]) as f:
+            report = json.load(f)
+    else:
+        report = run_benchmark(args)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        report["comparison"] = compare_reports(baseline, report, args.threshold)
+
+    write_report(report, args.output)
+    if args.compare and report["comparison"]["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
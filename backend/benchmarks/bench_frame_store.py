@@ -0,0 +1,158 @@
+"""
+Benchmark Excel frame storage: in-memory dict vs the Arrow frame store.
+
+Generates a set of workbooks and loads all of them the way ExcelAgentSystem
+does, then answers a round of queries that touches every frame several
+times. Three modes, each in a fresh interpreter so memory is isolated:
+
+- in_memory:  parse every workbook and keep all DataFrames in a dict
+              (the previous behaviour)
+- store_cold: parse every workbook and put it in ExcelFrameStore, which
+              converts it to an Arrow file and keeps at most --budget-mb of
+              frames loaded
+- store_warm: workbooks were converted before (e.g. re-upload or restart),
+              so frames are adopted without parsing and memory-mapped on
+              first access
+
+Reported per mode: load seconds, query-round seconds, peak RSS and RSS after
+the query round.
+
+Usage:
+    python benchmarks/bench_frame_store.py --workbooks 12 --rows 50000
+    python benchmarks/bench_frame_store.py --budget-mb 64 --output frames.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import importlib
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from _common import write_report
+from bench_xlsx import generate_xlsx
+
+MODES = ["in_memory", "store_cold", "store_warm"]
+
+
+def _current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _parse(path):
+    import pandas as pd
+    from excel_loader import read_excel_sheets
+
+    sheets = read_excel_sheets(path)
+    if len(sheets) == 1:
+        return next(iter(sheets.values()))
+    frames = []
+    for sheet_name, sheet_df in sheets.items():
+        sheet_df = sheet_df.copy()
+        sheet_df["_sheet_name"] = sheet_name
+        frames.append(sheet_df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_child(mode, paths, store_dir, budget_mb, rounds):
+    """Load and query every workbook in one mode; print timings and memory as JSON"""
+    importlib.import_module("pandas")  # keep import time out of the measurement
+    from excel_frame_store import ExcelFrameStore, workbook_hash
+
+    if mode == "in_memory":
+        frames = {}
+    else:
+        frames = ExcelFrameStore(store_dir, budget_mb * 1024 * 1024)
+
+    started = time.perf_counter()
+    for path in paths:
+        name = os.path.basename(path)
+        if mode == "in_memory":
+            frames[name] = _parse(path)
+        elif mode == "store_cold" or not frames.adopt(name, workbook_hash(path)):
+            frames.put(name, _parse(path), workbook_hash(path))
+    load_s = time.perf_counter() - started
+    rss_after_load = _current_rss_mb()
+
+    started = time.perf_counter()
+    checksum = 0.0
+    for _ in range(rounds):
+        for name in list(frames):
+            df = frames[name]
+            checksum += float(df["price"].sum()) + int((df["region"] == "North").sum())
+    query_s = time.perf_counter() - started
+
+    result = {
+        "load_s": load_s,
+        "query_round_s": query_s / rounds,
+        "rss_after_load_mb": rss_after_load,
+        "rss_after_queries_mb": _current_rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "checksum": checksum,
+    }
+    if mode != "in_memory":
+        result["store"] = frames.stats()
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workbooks", type=int, default=12, help="Number of generated workbooks")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows per generated workbook")
+    parser.add_argument("--budget-mb", type=int, default=128, help="Frame store memory budget")
+    parser.add_argument("--rounds", type=int, default=3, help="Query rounds over every frame")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--store-dir", help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.paths, args.store_dir, args.budget_mb, args.rounds)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="bench_frames_")
+    store_dir = os.path.join(work_dir, "frames")
+    try:
+        paths = []
+        for i in range(args.workbooks):
+            path = os.path.join(work_dir, f"workbook_{i}.xlsx")
+            generate_xlsx(path, args.rows + i, 1)  # distinct content per workbook
+            paths.append(path)
+        print(f"[BENCH] Generated {len(paths)} workbooks of ~{args.rows} rows", flush=True)
+
+        modes = {}
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, "--store-dir", store_dir,
+                 "--budget-mb", str(args.budget_mb), "--rounds", str(args.rounds), *paths],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            modes[mode] = json.loads(output.strip().splitlines()[-1])
+            print(f"[BENCH] {mode:10s} load {modes[mode]['load_s']:7.2f} s   "
+                  f"peak RSS {modes[mode]['peak_rss_mb']:7.1f} MB", flush=True)
+
+        arrow_mb = sum(os.path.getsize(os.path.join(store_dir, f)) for f in os.listdir(store_dir)) / (1024 * 1024)
+        report = {
+            "meta": {
+                "workbooks": args.workbooks,
+                "rows_per_workbook": args.rows,
+                "xlsx_total_mb": sum(os.path.getsize(p) for p in paths) / (1024 * 1024),
+                "arrow_total_mb": arrow_mb,
+                "budget_mb": args.budget_mb,
+                "rounds": args.rounds,
+            },
+            "modes": modes,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
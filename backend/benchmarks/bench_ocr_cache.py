@@ -0,0 +1,58 @@
+"""
+Benchmark the perceptual-hash OCR cache with repeated scrapes.
+
+Simulates scraping the same set of images several times (e.g. the downloaded
+WhatsApp images of a few groups) and reports duplicates, cache hit rate and
+OCR time for each pass.
+
+Usage:
+    python benchmarks/bench_ocr_cache.py whatsapp_images/*.png [--passes 3] [--cache /tmp/ocr_cache.sqlite3]
+"""
+import os
+import time
+import argparse
+import tempfile
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("images", nargs="+", help="Image files, as they would be downloaded by one scrape")
+parser.add_argument("--passes", type=int, default=3, help="Number of repeated scrapes")
+parser.add_argument("--cache", help="OCR cache file (defaults to a fresh temporary file)")
+parser.add_argument("--output", help="Also write the JSON report to this file")
+args = parser.parse_args()
+
+os.environ["OCR_CACHE_PATH"] = args.cache or os.path.join(tempfile.mkdtemp(), "ocr_cache.sqlite3")
+
+from _common import write_report
+from PIL import Image
+from ocr_service import get_ocr_cache, perceptual_hash
+from text_extraction import ocr_image_cached
+
+ocr_cache = get_ocr_cache()
+passes = []
+
+for pass_number in range(1, args.passes + 1):
+    seen_hashes = set()
+    duplicates = 0
+    hits = 0
+    started = time.perf_counter()
+    for image_path in args.images:
+        with Image.open(image_path) as image:
+            image_hash = perceptual_hash(image)
+            if image_hash in seen_hashes:
+                duplicates += 1
+                continue
+            seen_hashes.add(image_hash)
+            _, cache_hit = ocr_image_cached(image)
+            hits += cache_hit
+    elapsed = time.perf_counter() - started
+    lookups = len(args.images) - duplicates
+    passes.append({
+        "pass": pass_number,
+        "images": len(args.images),
+        "duplicates_skipped": duplicates,
+        "cache_hits": hits,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "seconds": elapsed,
+    })
+
+write_report({"cache": ocr_cache.stats(), "passes": passes}, args.output)
@@ -0,0 +1,52 @@
+"""
+Benchmark OCR image preprocessing.
+
+Runs OCR on each image raw, preprocessed, and preprocessed + binarized, and
+reports time per image (preprocessing included) and characters recovered.
+
+Usage:
+    python benchmarks/bench_ocr_preprocess.py image1.jpg image2.png ... [--output report.json]
+"""
+import re
+import time
+import argparse
+
+from _common import write_report
+from PIL import Image
+from ocr_service import get_ocr_service
+from text_extraction import preprocess_image_for_ocr
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("images", nargs="+", help="Image files to OCR")
+parser.add_argument("--output", help="Also write the JSON report to this file")
+args = parser.parse_args()
+
+VARIANTS = {
+    "raw": lambda image: image,
+    "preprocessed": lambda image: preprocess_image_for_ocr(image, binarize=False),
+    "preprocessed_binarized": lambda image: preprocess_image_for_ocr(image, binarize=True),
+}
+
+ocr_service = get_ocr_service()
+images = []
+totals = {name: {"seconds": 0.0, "chars": 0} for name in VARIANTS}
+
+for image_path in args.images:
+    entry = {"file": image_path}
+    for name, prepare in VARIANTS.items():
+        started = time.perf_counter()
+        with Image.open(image_path) as image:
+            prepared = prepare(image)
+            text = ocr_service.image_to_string(prepared)
+        elapsed = time.perf_counter() - started
+        # Count only word characters so whitespace noise does not inflate results
+        chars = len(re.findall(r"\w", text))
+        entry[name] = {"seconds": elapsed, "chars": chars, "size": list(prepared.size)}
+        totals[name]["seconds"] += elapsed
+        totals[name]["chars"] += chars
+    images.append(entry)
+
+for name, total in totals.items():
+    total["seconds_per_image"] = total["seconds"] / len(images)
+
+write_report({"backend": ocr_service.backend, "images": images, "totals": totals}, args.output)
@@ -0,0 +1,140 @@
+"""
+Benchmark PDF extraction on mixed scanned/native documents.
+
+Reports pages/sec and CPU seconds (including Tesseract subprocesses) per
+document for extract_pdf_with_tables, in-process and through
+extract_text_with_budget (worker process with time/memory budget, OCR on
+this process's engine pool), so the cost of the budget shows up as the
+difference in pages/sec.
+
+Without PDF arguments a scanned PDF is generated (see corpus.py). When
+Tesseract is not installed, --ocr-latency stands in for it with a service
+that takes that many seconds per page on the same pool of worker threads
+and recognizes nothing; the report says so in ocr_backend.
+
+Usage:
+    python benchmarks/bench_pdf_ocr.py file1.pdf file2.pdf [--dpi 200] [--workers 4]
+    python benchmarks/bench_pdf_ocr.py --pages 16 --ocr-latency 0.5 --output pdf_ocr.json
+"""
+import os
+import time
+import random
+import argparse
+import statistics
+import tempfile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF files to extract (default: a generated scanned PDF)")
+    parser.add_argument("--pages", type=int, default=16, help="Pages of the generated scanned PDF")
+    parser.add_argument("--dpi", type=int, help="Override PDF_OCR_DPI")
+    parser.add_argument("--workers", type=int, help="Override OCR_WORKERS")
+    parser.add_argument("--ocr-latency", type=float, default=0.5,
+                        help="Seconds per page of the stand-in OCR service used when Tesseract is not installed")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document and mode (median is reported)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args()
+
+
+def _median_run(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _ocr_works(service):
+    from PIL import Image
+
+    try:
+        service.image_to_string(Image.new("L", (64, 64), 255))
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    args = parse_args()
+
+    # Settings are read at import time, so set them before importing
+    if args.dpi:
+        os.environ["PDF_OCR_DPI"] = str(args.dpi)
+    if args.workers:
+        os.environ["OCR_WORKERS"] = str(args.workers)
+
+    from _common import write_report
+    from corpus import generate_pdf_scanned
+    import text_extraction
+    from ocr_service import OCRService, get_ocr_service, register_ocr_service
+    from extraction_budget import extract_text_with_budget
+
+    class LatencyOCRService(OCRService):
+        """Stand-in for Tesseract: a fixed time per image, no recognized text"""
+
+        def __init__(self, latency):
+            super().__init__()
+            self.backend = "simulated"
+            self.latency = latency
+
+        def image_to_string(self, image, timeout=None):
+            with self._slots:
+                time.sleep(self.latency)
+            return ""
+
+    if not _ocr_works(get_ocr_service()):
+        register_ocr_service(LatencyOCRService(args.ocr_latency))
+    ocr_service = get_ocr_service()
+
+    pdf_paths = args.pdfs
+    if not pdf_paths:
+        pdf_paths = [os.path.join(tempfile.mkdtemp(prefix="bench_pdf_ocr_"), "scanned.pdf")]
+        generate_pdf_scanned(pdf_paths[0], args.pages, random.Random(0))
+
+    # Start the worker fork server outside the timed runs
+    extract_text_with_budget(pdf_paths[0])
+
+    documents = []
+    for pdf_path in pdf_paths:
+        stats = {}
+        text = text_extraction.extract_pdf_with_tables(pdf_path, stats=stats)
+        in_process_s = _median_run(lambda: text_extraction.extract_pdf_with_tables(pdf_path), args.repeat)
+
+        report = {}
+        budget_text, _, error = extract_text_with_budget(pdf_path, report=report)
+        budget_s = _median_run(lambda: extract_text_with_budget(pdf_path), args.repeat)
+
+        pages = stats.get("pages", 0)
+        stats.update({
+            "file": os.path.basename(pdf_path),
+            "chars": len(text),
+            "in_process_pages_per_s": pages / in_process_s if in_process_s else 0.0,
+            "budget_pages_per_s": pages / budget_s if budget_s else 0.0,
+            "budget_overhead_pct": (budget_s / in_process_s - 1) * 100 if in_process_s else None,
+            "budget_status": report.get("status"),
+            "budget_ocr_images": report.get("ocr_images"),
+            "budget_results_match": error is None and (budget_text or "") == text,
+        })
+        print(f"[BENCH] {stats['file']}: {pages} pages, in-process {stats['in_process_pages_per_s']:.2f} pages/s, "
+              f"budget {stats['budget_pages_per_s']:.2f} pages/s", flush=True)
+        documents.append(stats)
+
+    total_pages = sum(d.get("pages", 0) for d in documents)
+    total_elapsed = sum(d.get("elapsed_s", 0.0) for d in documents)
+    write_report({
+        "dpi": text_extraction.PDF_OCR_DPI,
+        "workers": ocr_service.pool_size,
+        "ocr_backend": ocr_service.backend,
+        "ocr_latency_s": args.ocr_latency if ocr_service.backend == "simulated" else None,
+        "tesseract_available": text_extraction.TESSERACT_AVAILABLE,
+        "documents": documents,
+        "total_pages": total_pages,
+        "pages_per_s": total_pages / total_elapsed if total_elapsed else 0.0,
+        "cpu_s": sum(d.get("cpu_s", 0.0) for d in documents),
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark upload handling memory: whole-file reads vs chunked streaming.
+
+Simulates N concurrent uploads of the same large file (as Starlette hands
+them to the endpoint, already spooled to disk) and saves them either the
+old way (await file.read() then write) or with upload_storage's chunked
+save_upload_stream(). Each mode runs in a fresh interpreter so peak memory
+(max RSS) is isolated.
+
+Usage:
+    python benchmarks/bench_upload.py --size-mb 200 --concurrency 4
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import importlib
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from _common import write_report
+
+MODES = ("read_all", "streamed")
+
+
+async def _save_read_all(upload, dest_path):
+    content = await upload.read()
+    with open(dest_path, "wb") as f:
+        f.write(content)
+    return len(content)
+
+
+async def _save_streamed(upload, dest_path):
+    from upload_storage import save_upload_stream
+
+    size, _ = await save_upload_stream(upload, dest_path, max_bytes=float("inf"))
+    return size
+
+
+def run_child(mode, source_path, concurrency, output_dir):
+    """Save `concurrency` uploads concurrently and print time and peak RSS as JSON"""
+    from starlette.datastructures import UploadFile
+    importlib.import_module("upload_storage")  # keep import cost out of the measurement
+
+    save = _save_read_all if mode == "read_all" else _save_streamed
+    uploads = [
+        UploadFile(file=open(source_path, "rb"), filename=f"upload_{i}.bin")
+        for i in range(concurrency)
+    ]
+
+    async def main():
+        return await asyncio.gather(*(
+            save(upload, os.path.join(output_dir, f"{mode}_{i}.bin"))
+            for i, upload in enumerate(uploads)
+        ))
+
+    rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    sizes = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    rss_after_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "seconds": elapsed,
+        "bytes_saved": sum(sizes),
+        "mb_per_s": sum(sizes) / (1024 * 1024) / elapsed,
+        "peak_rss_mb": rss_after_kb / 1024,
+        "peak_rss_growth_mb": (rss_after_kb - rss_before_kb) / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=200, help="Size of each upload")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent uploads")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", nargs=4, metavar=("MODE", "SOURCE", "CONCURRENCY", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, source_path, concurrency, output_dir = args.child
+        run_child(mode, source_path, int(concurrency), output_dir)
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_path = os.path.join(work_dir, "source.bin")
+        with open(source_path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        results = {}
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child",
+                 mode, source_path, str(args.concurrency), work_dir],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+            for name in os.listdir(work_dir):
+                if name.startswith(mode):
+                    os.remove(os.path.join(work_dir, name))
+
+    write_report({
+        "size_mb": args.size_mb,
+        "concurrency": args.concurrency,
+        "results": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
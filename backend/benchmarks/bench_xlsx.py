@@ -0,0 +1,138 @@
+"""
+Benchmark spreadsheet loading: text extraction and Excel agent loading.
+
+Compares the old full-load path (pd.read_excel of every sheet, rendered in
+full with to_string) against the streaming, row-capped text extractor, and
+the agent loader with each available pandas engine. Each measurement runs
+in a fresh interpreter so peak memory (max RSS) is isolated.
+
+Usage:
+    python benchmarks/bench_xlsx.py --generate 200000 --sheets 2
+    python benchmarks/bench_xlsx.py big.xlsx --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import datetime
+import importlib.util
+import subprocess
+import tempfile
+
+from _common import write_report
+
+
+def _text_full_load(path):
+    import pandas as pd
+
+    text = ""
+    for sheet_name, sheet_data in pd.read_excel(path, sheet_name=None).items():
+        text += f"\n[Sheet: {sheet_name}]\n" + sheet_data.to_string(index=False) + "\n"
+    return len(text)
+
+
+def _text_streaming(path):
+    from text_extraction import extract_xlsx_from_file
+
+    return len(extract_xlsx_from_file(path))
+
+
+def _agent_loader(engine):
+    def load(path):
+        import pandas as pd
+
+        sheets = pd.read_excel(path, sheet_name=None, engine=engine)
+        return sum(len(df) for df in sheets.values())
+    return load
+
+
+MEASUREMENTS = {
+    "text_full_load": _text_full_load,
+    "text_streaming": _text_streaming,
+    "agent_openpyxl": _agent_loader("openpyxl"),
+    "agent_calamine": _agent_loader("calamine"),
+}
+
+
+def run_child(name, path):
+    """Run one measurement in this process and print time and peak RSS as JSON"""
+    # Keep import time out of the measurement
+    for module in ("pandas", "text_extraction"):
+        importlib.import_module(module)
+
+    started = time.perf_counter()
+    size = MEASUREMENTS[name](path)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "output_size": size,
+    }))
+
+
+def generate_xlsx(path, rows, sheets):
+    """Write a typed workbook (int, float, text, date, bool columns) with openpyxl write-only mode"""
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    start = datetime.date(2024, 1, 1)
+    regions = ["North", "South", "East", "West"]
+    for sheet in range(sheets):
+        worksheet = workbook.create_sheet(f"Sheet{sheet + 1}")
+        worksheet.append(["order_id", "region", "product", "quantity", "price", "order_date", "shipped"])
+        for i in range(rows):
+            worksheet.append([
+                i, regions[i % 4], f"Product {i % 500}", i % 17 + 1,
+                round(9.99 + (i % 100) * 0.5, 2), start + datetime.timedelta(days=i % 365), i % 3 == 0,
+            ])
+    workbook.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("xlsx", nargs="*", help="Workbooks to load")
+    parser.add_argument("--generate", type=int, metavar="ROWS", help="Generate a workbook with ROWS rows per sheet")
+    parser.add_argument("--sheets", type=int, default=1, help="Sheets in the generated workbook")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement (fastest is reported)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--child", choices=MEASUREMENTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.xlsx[0])
+        return
+
+    paths = list(args.xlsx)
+    if args.generate:
+        path = os.path.join(tempfile.mkdtemp(), f"synthetic_{args.generate}x{args.sheets}.xlsx")
+        generate_xlsx(path, args.generate, args.sheets)
+        paths.append(path)
+    if not paths:
+        parser.error("pass workbooks or --generate")
+
+    if importlib.util.find_spec("python_calamine") is not None:
+        names = list(MEASUREMENTS)
+    else:
+        names = [name for name in MEASUREMENTS if name != "agent_calamine"]
+
+    workbooks = []
+    for path in paths:
+        entry = {"file": os.path.basename(path), "size_mb": os.path.getsize(path) / (1024 * 1024)}
+        for name in names:
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", name, path],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            entry[name] = min(runs, key=lambda run: run["seconds"])
+        workbooks.append(entry)
+
+    write_report({"xlsx_text_max_rows": int(os.getenv("XLSX_TEXT_MAX_ROWS", "5000")), "workbooks": workbooks}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Synthetic document corpus for the extraction benchmarks.
+
+Generates deterministic documents of every format text_extraction.py
+supports, using only libraries already in requirements.txt (PDFs are
+written by hand, so no PDF toolkit is needed):
+
+    pdf_text     - PDF with a text layer, several paragraphs per page
+    pdf_tables   - PDF with ruled tables pdfplumber detects as tables
+    pdf_scanned  - image-only PDF pages (exercises the OCR path)
+    docx         - paragraphs with a table every few paragraphs
+    pptx         - slides with a title and bullet text
+    xlsx         - typed rows (int, text, float, date, bool)
+    image_png    - rendered text on a white background
+    image_jpeg   - rendered text on a noisy photo-like background
+
+Usage:
+    python benchmarks/corpus.py /tmp/corpus --scale 4
+"""
+import os
+import random
+import argparse
+import datetime
+
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS = (
+    "revenue forecast quarterly region customer invoice shipment growth margin "
+    "inventory supplier contract budget analysis report summary target account "
+    "payment order product service market sales cost profit delivery schedule"
+).split()
+
+# Items generated per unit of scale
+BASE_SIZES = {
+    "pdf_text": 20,        # pages
+    "pdf_tables": 10,      # pages
+    "pdf_scanned": 2,      # pages
+    "docx": 500,           # paragraphs
+    "pptx": 20,            # slides
+    "xlsx": 10000,         # rows
+    "image_png": 1,        # images
+    "image_jpeg": 1,       # images
+}
+
+SUFFIXES = {
+    "pdf_text": ".pdf",
+    "pdf_tables": ".pdf",
+    "pdf_scanned": ".pdf",
+    "docx": ".docx",
+    "pptx": ".pptx",
+    "xlsx": ".xlsx",
+    "image_png": ".png",
+    "image_jpeg": ".jpg",
+}
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _write_pdf(path, page_streams):
+    """Write a PDF whose pages draw the given content streams with Helvetica"""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for stream in page_streams:
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        data += f"{offset:010d} 00000 n \n".encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _text_lines_stream(lines, x=72, top=720, leading=14):
+    parts = [f"BT /F1 11 Tf {leading} TL {x} {top} Td"]
+    parts.extend(f"({_pdf_escape(line)}) '" for line in lines)
+    parts.append("ET")
+    return "\n".join(parts)
+
+
+def generate_pdf_text(path, pages, rng):
+    streams = []
+    for page in range(pages):
+        lines = [f"Section {page + 1}"] + [_sentence(rng, 10) for _ in range(40)]
+        streams.append(_text_lines_stream(lines))
+    _write_pdf(path, streams)
+
+
+def generate_pdf_tables(path, pages, rng, rows=12, cols=5):
+    streams = []
+    cell_w, cell_h, left, top = 100, 22, 56, 700
+    for page in range(pages):
+        ops = [_text_lines_stream([f"Table page {page + 1}"], top=740)]
+        # Ruling lines
+        ops.append("0.5 w")
+        for r in range(rows + 1):
+            y = top - r * cell_h
+            ops.append(f"{left} {y} m {left + cols * cell_w} {y} l S")
+        for c in range(cols + 1):
+            x = left + c * cell_w
+            ops.append(f"{x} {top} m {x} {top - rows * cell_h} l S")
+        # Cell text
+        for r in range(rows):
+            for c in range(cols):
+                text = f"R{r}C{c}" if r == 0 else f"{rng.choice(WORDS)} {rng.randint(1, 999)}"
+                ops.append(
+                    f"BT /F1 9 Tf {left + c * cell_w + 4} {top - (r + 1) * cell_h + 7} Td "
+                    f"({_pdf_escape(text)}) Tj ET"
+                )
+        streams.append("\n".join(ops))
+    _write_pdf(path, streams)
+
+
+def _render_text_image(rng, size=(1700, 2200), lines=45, noisy=False):
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    if noisy:
+        for _ in range(size[0] * size[1] // 400):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            draw.point((x, y), fill=rng.randint(150, 230))
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:  # Pillow < 10.1 has a single fixed-size default font
+        font = ImageFont.load_default()
+    for line in range(lines):
+        draw.text((100, 100 + line * 45), _sentence(rng, 8), fill=0, font=font)
+    return image
+
+
+def generate_pdf_scanned(path, pages, rng):
+    images = [_render_text_image(rng) for _ in range(pages)]
+    images[0].save(path, "PDF", resolution=200, save_all=True, append_images=images[1:])
+
+
+def generate_docx(path, paragraphs, rng):
+    from docx import Document
+
+    doc = Document()
+    for i in range(paragraphs):
+        doc.add_paragraph(_sentence(rng, 20))
+        if i % 50 == 49:
+            table = doc.add_table(rows=8, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"{rng.choice(WORDS)} {rng.randint(1, 999)}"
+    doc.save(path)
+
+
+def generate_pptx(path, slides, rng):
+    from pptx import Presentation
+
+    prs = Presentation()
+    layout = prs.slide_layouts[1]  # title and content
+    for i in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}: {rng.choice(WORDS).title()}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng, 8)
+        for _ in range(4):
+            body.add_paragraph().text = _sentence(rng, 8)
+    prs.save(path)
+
+
+def generate_xlsx(path, rows, rng):
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Data")
+    worksheet.append(["id", "region", "product", "quantity", "price", "order_date", "shipped"])
+    start = datetime.date(2024, 1, 1)
+    for i in range(rows):
+        worksheet.append([
+            i, rng.choice(["North", "South", "East", "West"]), rng.choice(WORDS),
+            rng.randint(1, 50), round(rng.uniform(1, 500), 2),
+            start + datetime.timedelta(days=rng.randrange(365)), rng.random() < 0.5,
+        ])
+    workbook.save(path)
+
+
+def generate_image_png(path, count, rng):
+    _render_text_image(rng, size=(1200, 900 * count), lines=18 * count).save(path, "PNG")
+
+
+def generate_image_jpeg(path, count, rng):
+    _render_text_image(rng, size=(1200, 900 * count), lines=18 * count, noisy=True).save(path, "JPEG", quality=85)
+
+
+GENERATORS = {
+    "pdf_text": generate_pdf_text,
+    "pdf_tables": generate_pdf_tables,
+    "pdf_scanned": generate_pdf_scanned,
+    "docx": generate_docx,
+    "pptx": generate_pptx,
+    "xlsx": generate_xlsx,
+    "image_png": generate_image_png,
+    "image_jpeg": generate_image_jpeg,
+}
+
+
+def generate_corpus(output_dir, scale=1, kinds=None, seed=0):
+    """
+    Generate one document per kind into output_dir.
+
+    Args:
+        output_dir: Directory to write the documents to (created if missing)
+        scale: Multiplier applied to BASE_SIZES
+        kinds: Kinds to generate (defaults to all)
+        seed: Random seed; the same seed and scale give identical documents
+
+    Returns:
+        List of dicts with kind, path, units (pages/rows/...) and size_bytes
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    documents = []
+    for kind in kinds or GENERATORS:
+        units = max(1, int(BASE_SIZES[kind] * scale))
+        path = os.path.join(output_dir, f"{kind}_{units}{SUFFIXES[kind]}")
+        GENERATORS[kind](path, units, random.Random(f"{seed}:{kind}"))
+        documents.append({
+            "kind": kind,
+            "path": path,
+            "units": units,
+            "size_bytes": os.path.getsize(path),
+        })
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir", help="Directory to write the corpus to")
+    parser.add_argument("--scale", type=float, default=1, help="Size multiplier")
+    parser.add_argument("--kinds", nargs="+", choices=GENERATORS, help="Kinds to generate (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for document in generate_corpus(args.output_dir, args.scale, args.kinds, args.seed):
+        print(f"{document['kind']:12s} {document['units']:>7d} units {document['size_bytes'] / 1024:>10.1f} KB  {document['path']}")
+
+
+if __name__ == "__main__":
+    main()
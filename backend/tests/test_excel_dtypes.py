@@ -0,0 +1,68 @@
+"""Tests for the Excel dtype optimization pass (excel_dtypes)."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+AI_ENGINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ai_engine")
+if AI_ENGINE_DIR not in sys.path:
+    sys.path.insert(0, AI_ENGINE_DIR)
+
+from excel_dtypes import optimize_dtypes, restore_dtypes  # noqa: E402
+from excel_frame_store import ExcelFrameStore  # noqa: E402
+
+
+def make_frame(rows=50000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "region": rng.choice(["North", "South", "East", "West", None], rows),
+        "quantity": rng.integers(1, 50, rows),
+        "price": rng.uniform(1, 500, rows).round(2),
+        "day": pd.Series(rng.choice(["2024-01-05", "2024-02-10", "2024-03-15"], rows), dtype="str"),
+        "note": pd.Series(rng.choice(["a", "b", None], rows), dtype=object),
+        "order_id": np.arange(rows) * 10 ** 6,
+    })
+
+
+def test_optimize_dtypes_reduces_memory():
+    df = make_frame()
+    optimized, report = optimize_dtypes(df)
+
+    before = df.memory_usage(index=True, deep=True).sum()
+    after = optimized.memory_usage(index=True, deep=True).sum()
+    assert after < before / 2
+    assert report["bytes_before"] == before
+    assert report["bytes_after"] == after
+    assert isinstance(optimized["region"].dtype, pd.CategoricalDtype)
+    assert optimized["quantity"].dtype == np.int32
+    assert pd.api.types.is_datetime64_any_dtype(optimized["day"])
+    # Too large for int32 arithmetic, and float64 stays exact
+    assert optimized["order_id"].dtype == np.int64
+    assert optimized["price"].dtype == np.float64
+
+
+def test_restore_dtypes_gives_back_the_loaded_frame():
+    df = make_frame()
+    optimized, report = optimize_dtypes(df)
+
+    restored = restore_dtypes(optimized, report)
+    pd.testing.assert_frame_equal(restored, df)
+    assert restored["note"][df["note"].isna()].map(lambda value: value is None).all()
+
+
+def test_frame_store_keeps_optimized_frame(tmp_path):
+    df = make_frame()
+    optimized, report = optimize_dtypes(df)
+    store = ExcelFrameStore(str(tmp_path))
+    store.put("orders.xlsx", optimized, "orders", metadata={"dtype_report": report})
+
+    reloaded = ExcelFrameStore(str(tmp_path))
+    assert reloaded.adopt("orders.xlsx", "orders")
+    loaded = reloaded["orders.xlsx"]
+    assert loaded.memory_usage(index=True, deep=True).sum() < df.memory_usage(index=True, deep=True).sum() / 2
+
+    pd.testing.assert_frame_equal(reloaded.original("orders.xlsx"), df)
+    copy = reloaded.writable_copy("orders.xlsx")
+    pd.testing.assert_frame_equal(copy, df)
+    copy.loc[0, "region"] = "Nowhere"
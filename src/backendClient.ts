@@ -21,6 +21,122 @@ export interface BackendEmail {
   messageId?: string
 }
 
+export type IngestionJobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled'
+
+export interface IngestionJobStage {
+  status: IngestionJobStatus
+  done: number
+  total: number | null
+  elapsed_s: number
+}
+
+export interface IngestionJob<T = any> {
+  id: string
+  kind: string
+  status: IngestionJobStatus
+  cancel_requested: boolean
+  stages: Record<string, IngestionJobStage>
+  result: T | null
+  error: string | null
+  created_at: number
+  started_at: number | null
+  finished_at: number | null
+}
+
+// ========== Ingestion Jobs ==========
+
+const JOB_POLL_INTERVAL_MS = 1000
+const FINISHED_JOB_STATES: IngestionJobStatus[] = ['succeeded', 'failed', 'cancelled']
+
+export async function getIngestionJob(jobId: string): Promise<IngestionJob> {
+  const res = await fetch(`${BACKEND_BASE_URL}/api/jobs/${jobId}`)
+  const data = await res.json().catch(() => null)
+
+  if (!res.ok) {
+    const message = data?.detail || data?.error || `Job status request failed with status ${res.status}`
+    throw new Error(message)
+  }
+
+  return data as IngestionJob
+}
+
+export async function cancelIngestionJob(jobId: string): Promise<void> {
+  const res = await fetch(`${BACKEND_BASE_URL}/api/jobs/${jobId}/cancel`, {
+    method: 'POST',
+  })
+  if (!res.ok) {
+    console.warn('Job cancel failed', await res.text().catch(() => ''))
+  }
+}
+
+export interface IngestionJobEvent {
+  seq: number
+  event: 'status' | 'stage' | 'progress' | 'file'
+  time: number
+  // "file" events: file name, pipeline step (downloaded, extracted, chunked, embedded, indexed) and its duration
+  file?: string
+  stage?: string
+  elapsed_s?: number | null
+  [key: string]: any
+}
+
+const JOB_EVENT_TYPES = ['status', 'stage', 'progress', 'file']
+
+/**
+ * Follow an ingestion job over server-sent events until it finishes.
+ * The browser reconnects on dropped connections and resumes after the last event.
+ */
+function streamIngestionJob<T = any>(
+  jobId: string,
+  onEvent?: (event: IngestionJobEvent) => void,
+): Promise<IngestionJob<T>> {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`${BACKEND_BASE_URL}/api/jobs/${jobId}/events`)
+    const forward = (message: MessageEvent) => onEvent?.(JSON.parse(message.data))
+    JOB_EVENT_TYPES.forEach((type) => source.addEventListener(type, forward as EventListener))
+    source.addEventListener('end', (message) => {
+      source.close()
+      resolve(JSON.parse((message as MessageEvent).data))
+    })
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        reject(new Error(`Event stream for job ${jobId} closed`))
+      }
+    }
+  })
+}
+
+/**
+ * Wait for an ingestion job to finish, following its event stream
+ * (falls back to polling). onProgress gets job snapshots while polling and
+ * the final job; onEvent gets each streamed event.
+ * Resolves with the finished job (check `status` for failed/cancelled).
+ */
+export async function waitForIngestionJob<T = any>(
+  jobId: string,
+  onProgress?: (job: IngestionJob<T>) => void,
+  onEvent?: (event: IngestionJobEvent) => void,
+): Promise<IngestionJob<T>> {
+  if (typeof EventSource !== 'undefined') {
+    try {
+      const job = await streamIngestionJob<T>(jobId, onEvent)
+      onProgress?.(job)
+      return job
+    } catch (err) {
+      console.warn('Job event stream failed, polling instead', err)
+    }
+  }
+
+  for (;;) {
+    const job = (await getIngestionJob(jobId)) as IngestionJob<T>
+    onProgress?.(job)
+    if (FINISHED_JOB_STATES.includes(job.status)) {
+      return job
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+  }
+}
+
 // ========== Core Chat ==========
 
 export async function backendChat(query: string): Promise<BackendChatResponse> {
@@ -61,22 +177,153 @@ export async function fetchBackendEmails(): Promise<BackendEmail[]> {
   return Array.isArray(data.emails) ? (data.emails as BackendEmail[]) : []
 }
 
-export async function uploadKnowledgeFiles(files: File[]): Promise<void> {
-  if (!files.length) return
+// Files at least this large are sent in resumable chunks
+const RESUMABLE_UPLOAD_THRESHOLD = 32 * 1024 * 1024
+const RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+const CHUNK_MAX_ATTEMPTS = 5
 
-  const form = new FormData()
-  files.forEach((file) => {
-    form.append('files', file)
-  })
+async function sha256Hex(data: ArrayBuffer): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', data)
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('')
+}
 
-  const res = await fetch(`${BACKEND_BASE_URL}/api/upload`, {
-    method: 'POST',
-    body: form,
-  })
+interface UploadSession {
+  upload_id: string
+  chunk_size: number
+  missing: number[]
+}
+
+/** Chunks the backend still needs for an upload, or null if it no longer knows the upload id */
+async function fetchUploadSession(uploadId: string): Promise<UploadSession | null> {
+  const res = await fetch(`${BACKEND_BASE_URL}/api/uploads/${uploadId}`)
+  if (res.status === 404) return null
+  if (!res.ok) throw new Error(`Upload status failed with status ${res.status}`)
+  return (await res.json()) as UploadSession
+}
+
+/**
+ * Upload one large file in numbered chunks, retrying failed chunks with
+ * backoff. Chunks the backend already has (e.g. from an interrupted
+ * attempt with the same upload id) are skipped; after a failed attempt the
+ * backend is asked again which chunks it has, so a chunk that arrived
+ * although its response was lost is not sent twice. Resolves with the
+ * ingestion job id.
+ */
+export async function uploadFileResumable(file: File, uploadId?: string): Promise<string> {
+  let session = uploadId ? await fetchUploadSession(uploadId) : null
+  if (!session) {
+    const res = await fetch(`${BACKEND_BASE_URL}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, chunk_size: RESUMABLE_CHUNK_SIZE }),
+    })
+    const data = await res.json().catch(() => null)
+    if (!res.ok) {
+      throw new Error(data?.detail || `Upload start failed with status ${res.status}`)
+    }
+    session = data as UploadSession
+  }
+  const { upload_id, chunk_size } = session
+  let missing = session.missing
+
+  // Failed attempts since the last chunk that went through
+  let attempt = 0
+  while (missing.length) {
+    const index = missing[0]
+    const chunk = await file.slice(index * chunk_size, (index + 1) * chunk_size).arrayBuffer()
+    const checksum = await sha256Hex(chunk)
+    let failure: string
+    try {
+      const res = await fetch(`${BACKEND_BASE_URL}/api/uploads/${upload_id}/chunks/${index}`, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-Sha256': checksum },
+        body: chunk,
+      })
+      if (res.ok) {
+        missing = ((await res.json()) as UploadSession).missing
+        attempt = 0
+        continue
+      }
+      if (res.status === 404) throw new Error(`Upload ${upload_id} expired`)
+      failure = await res.text()
+    } catch (err) {
+      if ((err as Error).message.includes('expired')) throw err
+      failure = (err as Error).message
+    }
+    if (++attempt >= CHUNK_MAX_ATTEMPTS) throw new Error(`Chunk ${index} failed: ${failure}`)
+    await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt))
+
+    // Resume from what the backend actually has, not from what this attempt saw;
+    // if the backend is unreachable, retry the same chunk
+    let status: UploadSession | null
+    try {
+      status = await fetchUploadSession(upload_id)
+    } catch {
+      continue
+    }
+    if (!status) throw new Error(`Upload ${upload_id} expired`)
+    missing = status.missing
+  }
 
-  // Best-effort; log but don't throw to avoid breaking UI
+  const res = await fetch(`${BACKEND_BASE_URL}/api/uploads/${upload_id}/complete`, { method: 'POST' })
+  const data = await res.json().catch(() => null)
   if (!res.ok) {
-    console.warn('File upload failed', await res.text())
+    throw new Error(data?.detail || `Upload completion failed with status ${res.status}`)
+  }
+  return data.job_id as string
+}
+
+export async function uploadKnowledgeFiles(
+  files: File[],
+  onProgress?: (job: IngestionJob) => void,
+): Promise<void> {
+  if (!files.length) return
+
+  const jobIds: string[] = []
+  const largeFiles = files.filter((file) => file.size >= RESUMABLE_UPLOAD_THRESHOLD)
+  const smallFiles = files.filter((file) => file.size < RESUMABLE_UPLOAD_THRESHOLD)
+
+  for (const file of largeFiles) {
+    try {
+      jobIds.push(await uploadFileResumable(file))
+    } catch (err) {
+      // Best-effort; log but don't throw to avoid breaking UI
+      console.warn(`Resumable upload of ${file.name} failed`, err)
+    }
+  }
+
+  if (smallFiles.length) {
+    const form = new FormData()
+    smallFiles.forEach((file) => {
+      form.append('files', file)
+    })
+
+    const res = await fetch(`${BACKEND_BASE_URL}/api/upload`, {
+      method: 'POST',
+      body: form,
+    })
+
+    // Best-effort; log but don't throw to avoid breaking UI
+    if (!res.ok) {
+      console.warn('File upload failed', await res.text())
+    } else {
+      const data = await res.json().catch(() => null)
+      if (data?.job_id) jobIds.push(data.job_id)
+    }
+  }
+
+  // Files are ingested by background jobs; wait until they are searchable
+  for (const jobId of jobIds) {
+    try {
+      const job = await waitForIngestionJob(jobId, onProgress)
+      if (job.status !== 'succeeded') {
+        console.warn(`File ingestion ${job.status}`, job.error)
+      }
+    } catch (err) {
+      console.warn('Failed to track file ingestion', err)
+    }
   }
 }
 
@@ -169,14 +416,21 @@ export async function syncGoogleDriveAndEmail(
       }),
     })
 
-    const data: GoogleDriveFilesResponse | null = await res.json().catch(() => null)
+    const data = await res.json().catch(() => null)
 
-    if (!res.ok) {
+    if (!res.ok || !data?.job_id) {
       console.warn('Google Drive sync failed', data)
       return null
     }
 
-    return data
+    // The sync runs as a background job; its result is the sync summary
+    const job = await waitForIngestionJob<GoogleDriveFilesResponse>(data.job_id)
+    if (job.status !== 'succeeded') {
+      console.warn(`Google Drive sync ${job.status}`, job.error)
+      return null
+    }
+
+    return job.result
   } catch (err) {
     console.error('Failed to sync Google Drive & Gmail:', err)
     return null
@@ -246,7 +500,13 @@ export async function scrapeWhatsAppGroups(groups: string[]): Promise<void> {
       console.warn('WhatsApp scrape failed', res.status, text)
     } else {
       const data = await res.json().catch(() => null)
-      console.log('WhatsApp scrape result:', data)
+      if (!data?.job_id) return
+      const job = await waitForIngestionJob(data.job_id)
+      if (job.status === 'succeeded') {
+        console.log('WhatsApp scrape result:', job.result)
+      } else {
+        console.warn(`WhatsApp scrape ${job.status}`, job.error)
+      }
     }
   } catch (err) {
     console.error('Error scraping WhatsApp groups:', err)
@@ -176,7 +176,7 @@ const ChatInput = ({ onSend, activeProjectName, onSavePrompt }: ChatInputProps)
           ref={fileInputRef}
           type="file"
           multiple
-          accept=".pdf,.docx,.doc,.xlsx,.xls,.txt,.csv,.png,.jpg,.jpeg,.gif,.webp"
+          accept=".pdf,.docx,.doc,.xlsx,.xls,.txt,.csv,.png,.jpg,.jpeg,.gif,.webp,.zip"
           className="hidden"
           onChange={handleFileChange}
         />